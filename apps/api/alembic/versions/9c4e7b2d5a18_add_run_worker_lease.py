@@ -0,0 +1,29 @@
+"""add run worker lease
+
+Revision ID: 9c4e7b2d5a18
+Revises: 7d9e2c1a4b31
+Create Date: 2026-02-12 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "9c4e7b2d5a18"
+down_revision = "7d9e2c1a4b31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("runs", sa.Column("claimed_by", sa.String(), nullable=True))
+    op.add_column("runs", sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("ix_runs_status_created_at", "runs", ["status", "created_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_runs_status_created_at", table_name="runs")
+    op.drop_column("runs", "heartbeat_at")
+    op.drop_column("runs", "claimed_by")
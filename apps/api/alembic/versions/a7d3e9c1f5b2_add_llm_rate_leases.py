@@ -0,0 +1,36 @@
+"""add llm rate leases
+
+Revision ID: a7d3e9c1f5b2
+Revises: f3c9a1d7b2e8
+Create Date: 2026-02-20 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "a7d3e9c1f5b2"
+down_revision = "f3c9a1d7b2e8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_rate_leases",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("user_key", sa.String(), nullable=False),
+        sa.Column("tokens", sa.Integer(), nullable=False),
+        sa.Column("acquired_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("released_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_llm_rate_leases_acquired_at", "llm_rate_leases", ["acquired_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_llm_rate_leases_acquired_at", table_name="llm_rate_leases")
+    op.drop_table("llm_rate_leases")
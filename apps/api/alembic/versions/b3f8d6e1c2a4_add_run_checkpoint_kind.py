@@ -0,0 +1,29 @@
+"""add run checkpoint kind
+
+Revision ID: b3f8d6e1c2a4
+Revises: 9c4e7b2d5a18
+Create Date: 2026-02-14 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "b3f8d6e1c2a4"
+down_revision = "9c4e7b2d5a18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows are full snapshots.
+    op.add_column(
+        "run_checkpoints",
+        sa.Column("kind", sa.String(), nullable=False, server_default="full"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("run_checkpoints", "kind")
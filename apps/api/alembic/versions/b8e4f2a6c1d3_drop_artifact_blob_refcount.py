@@ -0,0 +1,32 @@
+"""drop artifact blob refcount
+
+Revision ID: b8e4f2a6c1d3
+Revises: a7d3e9c1f5b2
+Create Date: 2026-02-21 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "b8e4f2a6c1d3"
+down_revision = "a7d3e9c1f5b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Blobs are collected once no run_artifacts row references them; the counter was redundant.
+    with op.batch_alter_table("artifact_blobs") as batch:
+        batch.drop_column("refcount")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("artifact_blobs") as batch:
+        batch.add_column(sa.Column("refcount", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE artifact_blobs SET refcount = "
+        "(SELECT count(*) FROM run_artifacts WHERE run_artifacts.blob_sha256 = artifact_blobs.sha256)"
+    )
@@ -0,0 +1,48 @@
+"""add artifact blobs
+
+Revision ID: d1a7c9e4f3b6
+Revises: b3f8d6e1c2a4
+Create Date: 2026-02-16 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "d1a7c9e4f3b6"
+down_revision = "b3f8d6e1c2a4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "artifact_blobs",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("refcount", sa.Integer(), nullable=False),
+        sa.Column("content", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("sha256"),
+    )
+    # Existing artifacts keep their inline content_text/content_json and are read as before.
+    with op.batch_alter_table("run_artifacts") as batch:
+        batch.add_column(sa.Column("blob_sha256", sa.String(length=64), nullable=True))
+        batch.add_column(sa.Column("blob_format", sa.String(), nullable=True))
+        batch.add_column(sa.Column("size_bytes", sa.Integer(), nullable=True))
+        batch.create_foreign_key(
+            "fk_run_artifacts_blob_sha256", "artifact_blobs", ["blob_sha256"], ["sha256"]
+        )
+        batch.create_index("ix_run_artifacts_blob_sha256", ["blob_sha256"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("run_artifacts") as batch:
+        batch.drop_index("ix_run_artifacts_blob_sha256")
+        batch.drop_constraint("fk_run_artifacts_blob_sha256", type_="foreignkey")
+        batch.drop_column("size_bytes")
+        batch.drop_column("blob_format")
+        batch.drop_column("blob_sha256")
+    op.drop_table("artifact_blobs")
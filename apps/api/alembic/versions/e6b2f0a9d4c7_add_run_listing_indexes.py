@@ -0,0 +1,39 @@
+"""add run listing indexes
+
+Revision ID: e6b2f0a9d4c7
+Revises: d1a7c9e4f3b6
+Create Date: 2026-02-18 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "e6b2f0a9d4c7"
+down_revision = "d1a7c9e4f3b6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Trailing `id` matches the keyset tie-breaker so listings need no extra sort step.
+    op.create_index("ix_runs_user_id_created_at", "runs", ["user_id", "created_at", "id"], unique=False)
+    op.create_index(
+        "ix_runs_user_id_project_id_created_at",
+        "runs",
+        ["user_id", "project_id", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_run_artifacts_run_id_created_at", "run_artifacts", ["run_id", "created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_run_checkpoints_run_id_node_seq", "run_checkpoints", ["run_id", "node", "seq"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_run_checkpoints_run_id_node_seq", table_name="run_checkpoints")
+    op.drop_index("ix_run_artifacts_run_id_created_at", table_name="run_artifacts")
+    op.drop_index("ix_runs_user_id_project_id_created_at", table_name="runs")
+    op.drop_index("ix_runs_user_id_created_at", table_name="runs")
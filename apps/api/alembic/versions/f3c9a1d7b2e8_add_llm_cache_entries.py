@@ -0,0 +1,38 @@
+"""add llm cache entries
+
+Revision ID: f3c9a1d7b2e8
+Revises: e6b2f0a9d4c7
+Create Date: 2026-02-19 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "f3c9a1d7b2e8"
+down_revision = "e6b2f0a9d4c7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_cache_entries",
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("response_text", sa.Text(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index("ix_llm_cache_entries_last_used_at", "llm_cache_entries", ["last_used_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_llm_cache_entries_last_used_at", table_name="llm_cache_entries")
+    op.drop_table("llm_cache_entries")
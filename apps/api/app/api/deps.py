@@ -5,12 +5,13 @@ from uuid import UUID
 
 from fastapi import Cookie, Depends, HTTPException, status
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app.core.config import get_settings
 from app.db.models.session import Session as DbSession
 from app.db.models.user import User
 from app.db.session import get_db
+from app.services.session_cache import SessionSnapshot, get_session_cache
 
 settings = get_settings()
 
@@ -28,8 +29,17 @@ def get_current_user(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized") from e
 
     now = datetime.now(tz=UTC)
+    cache = get_session_cache()
+    cached = cache.get(sid)
+    if cached is not None and cached.expires_at > now:
+        # Attach a User identity without a SELECT; columns not in the snapshot lazy-load on access.
+        user = User(id=cached.user_id, email=cached.email, username=cached.username)
+        make_transient_to_detached(user)
+        db.add(user)
+        return user
+
     stmt = (
-        select(User)
+        select(User, DbSession.expires_at)
         .join(DbSession, DbSession.user_id == User.id)
         .where(
             DbSession.id == sid,
@@ -37,8 +47,12 @@ def get_current_user(
             DbSession.expires_at > now,
         )
     )
-    user = db.execute(stmt).scalar_one_or_none()
-    if not user:
+    row = db.execute(stmt).one_or_none()
+    if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
 
+    user, expires_at = row
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=UTC)
+    cache.set(sid, SessionSnapshot(user_id=user.id, email=user.email, username=user.username, expires_at=expires_at))
     return user
@@ -1,3 +1,3 @@
-from app.api.routes import auth, health, projects, runs
+from app.api.routes import auth, health, metrics, projects, runs
 
-__all__ = ["auth", "health", "projects", "runs"]
+__all__ = ["auth", "health", "metrics", "projects", "runs"]
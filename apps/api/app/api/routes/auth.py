@@ -6,6 +6,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from authlib.integrations.base_client.errors import MismatchingStateError, OAuthError
 
 from app.api.deps import get_current_user
@@ -53,24 +54,24 @@ def _clear_session_cookie(response: Response) -> None:
 
 
 @router.post("/signup", response_model=AuthResponse)
-def signup(payload: SignupRequest, response: Response, db: Session = Depends(get_db)) -> AuthResponse:
+async def signup(payload: SignupRequest, response: Response, db: Session = Depends(get_db)) -> AuthResponse:
     auth = AuthService()
-    result = auth.signup_with_password(
+    result = await auth.signup_with_password(
         db,
         username=payload.username,
         email=str(payload.email),
         password=payload.password,
     )
-    db.commit()
+    await run_in_threadpool(db.commit)
     _set_session_cookie(response, result.session.id)
     return AuthResponse(user=_user_public(result.user))
 
 
 @router.post("/login", response_model=AuthResponse)
-def login(payload: LoginRequest, response: Response, db: Session = Depends(get_db)) -> AuthResponse:
+async def login(payload: LoginRequest, response: Response, db: Session = Depends(get_db)) -> AuthResponse:
     auth = AuthService()
-    result = auth.login_with_password(db, email=str(payload.email), password=payload.password)
-    db.commit()
+    result = await auth.login_with_password(db, email=str(payload.email), password=payload.password)
+    await run_in_threadpool(db.commit)
     _set_session_cookie(response, result.session.id)
     return AuthResponse(user=_user_public(result.user))
 
@@ -252,12 +253,12 @@ def password_reset_request(
 
 
 @router.post("/password-reset/confirm", response_model=PasswordResetConfirmResponse)
-def password_reset_confirm(
+async def password_reset_confirm(
     payload: PasswordResetConfirmRequest,
     db: Session = Depends(get_db),
 ) -> PasswordResetConfirmResponse:
     settings = get_settings()
     auth = AuthService(settings=settings)
-    auth.reset_password_with_token(db, token=payload.token, new_password=payload.new_password)
-    db.commit()
+    await auth.reset_password_with_token(db, token=payload.token, new_password=payload.new_password)
+    await run_in_threadpool(db.commit)
     return PasswordResetConfirmResponse(ok=True)
@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
+from app.services.security import get_password_hasher
+
 router = APIRouter()
 
 
 @router.get("/health")
 def health() -> dict:
-    return {"ok": True}
-
+    return {"ok": True, "password_hasher": get_password_hasher().stats()}
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+# Importing registers the workflow / LLM / run histograms, so they're listed before the first run.
+import app.services.tracing  # noqa: F401
+from app.services.metrics import METRICS
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """This process's metrics in the Prometheus text exposition format."""
+
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -2,23 +2,25 @@ from __future__ import annotations
 
 import json
 import re
-import io
 import time
-import zipfile
+from collections.abc import Iterator
+from datetime import datetime
 from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from fastapi.responses import Response, StreamingResponse
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session, load_only
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import get_current_user
+from app.core.config import get_settings
 from app.db.models.run import Run
 from app.db.models.run_artifact import RunArtifact
 from app.db.models.run_checkpoint import RunCheckpoint
 from app.db.models.run_event import RunEvent
 from app.db.models.user import User
-from app.db.session import SessionLocal, get_db
+from app.db.session import SessionLocal, engine, get_db
 from app.langgraph.executor import execute_run
 from app.schemas.runs import (
     ArtifactDetail,
@@ -31,13 +33,40 @@ from app.schemas.runs import (
     RunList,
     RunPublic,
 )
+from app.services.event_bus import EVENT_BUS, event_payload
+from app.services.run_control import RUN_CONTROLS
 from app.services.run_service import RunService
+from app.services.zip_stream import ZipStream
 
 router = APIRouter()
 
 ALLOWED_RUN_MODES = {"engineer", "team"}
 _FILENAME_SAFE = re.compile(r"[^a-zA-Z0-9._-]+")
 _TERMINAL_STATUSES = {"succeeded", "failed", "canceled"}
+# Event types after which a run's stream is complete, mapped to the run's final status.
+_TERMINAL_EVENT_TYPES = {
+    "run.succeeded": "succeeded",
+    "run.failed": "failed",
+    "run.canceled": "canceled",
+    "run.canceled.requested": "canceled",
+}
+_STREAM_KEEPALIVE_SECONDS = 5.0
+_STREAM_RECHECK_SECONDS = 60.0
+_ZIP_BATCH_SIZE = 50
+# Listing endpoints return everything unless a `limit` is given (capped at this).
+_MAX_PAGE_SIZE = 1000
+_RUN_PUBLIC_COLUMNS = (
+    Run.id,
+    Run.user_id,
+    Run.status,
+    Run.mode,
+    Run.roles,
+    Run.project_id,
+    Run.input,
+    Run.created_at,
+    Run.started_at,
+    Run.finished_at,
+)
 
 
 def _run_public(r: Run) -> RunPublic:
@@ -59,6 +88,14 @@ def _assert_owner(run: Run, user: User) -> None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
 
+def _dispatch_run(bg: BackgroundTasks, run_id: UUID) -> None:
+    # With RUN_DISPATCH=queue the run stays `queued` until a worker process (`python -m app.worker`)
+    # claims it; otherwise it executes in this process after the response is sent.
+    if get_settings().run_dispatch == "queue":
+        return
+    bg.add_task(execute_run, run_id)
+
+
 @router.post("", response_model=RunDetail, status_code=201)
 def create_run(
     payload: CreateRunRequest,
@@ -90,9 +127,9 @@ def create_run(
         project_id=project_id,
         user_rules=payload.user_rules,
     )
-    # Commit before queuing the background task so the task can read the Run in a new DB session.
+    # Commit before dispatching so the executor can read the Run in a new DB session.
     db.commit()
-    bg.add_task(execute_run, run.id)
+    _dispatch_run(bg, run.id)
     return RunDetail(**_run_public(run).model_dump(), output_text=run.output_text, error=run.error)
 
 
@@ -149,12 +186,14 @@ def rerun_from_checkpoint(
     if not cp:
         raise HTTPException(status_code=400, detail="No checkpoint found to rerun from")
 
-    seed_state = cp.state if isinstance(cp.state, dict) else {}
+    svc = RunService()
+    # Checkpoints may be stored as diffs; rebuild the full state of the chosen one.
+    materialized = svc.checkpoint_states(db, run_id, after_seq=cp.seq - 1, limit=1)
+    seed_state = materialized[0][1] if materialized and materialized[0][0].seq == cp.seq else {}
     seed_goto = (goto or node or cp.node or "").strip()
     if not seed_goto:
         raise HTTPException(status_code=400, detail="Invalid goto/node")
 
-    svc = RunService()
     new_run = svc.create_run(
         db,
         user_id=user.id,
@@ -175,26 +214,40 @@ def rerun_from_checkpoint(
         data={"parent_run_id": str(src.id), "checkpoint_seq": cp.seq, "checkpoint_node": cp.node, "goto": seed_goto},
     )
     db.commit()
-    bg.add_task(execute_run, new_run.id)
+    _dispatch_run(bg, new_run.id)
     return RunDetail(**_run_public(new_run).model_dump(), output_text=new_run.output_text, error=new_run.error)
 
 
 @router.get("", response_model=RunList)
 def list_runs(
     project_id: str | None = None,
+    before_created_at: datetime | None = None,
+    before_id: UUID | None = None,
+    limit: int | None = Query(default=None, ge=1, le=_MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ) -> RunList:
-    stmt = select(Run).where(Run.user_id == user.id)
+    """Runs newest first. With `limit`, pass the returned `next_before_*` cursor for older pages."""
+
+    stmt = select(Run).where(Run.user_id == user.id).options(load_only(*_RUN_PUBLIC_COLUMNS))
     if project_id:
         try:
             pid = UUID(project_id)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid project_id") from None
         stmt = stmt.where(Run.project_id == pid)
-    stmt = stmt.order_by(Run.created_at.desc())
+    if before_created_at is not None:
+        if before_id is not None:
+            stmt = stmt.where(tuple_(Run.created_at, Run.id) < (before_created_at, before_id))
+        else:
+            stmt = stmt.where(Run.created_at < before_created_at)
+    stmt = stmt.order_by(Run.created_at.desc(), Run.id.desc()).limit(limit)
     runs = db.execute(stmt).scalars().all()
-    return RunList(runs=[_run_public(r) for r in runs])
+    page = RunList(runs=[_run_public(r) for r in runs])
+    if limit is not None and len(runs) == limit:
+        page.next_before_created_at = runs[-1].created_at
+        page.next_before_id = str(runs[-1].id)
+    return page
 
 
 @router.get("/{run_id}", response_model=RunDetail)
@@ -207,12 +260,25 @@ def get_run(run_id: UUID, db: Session = Depends(get_db), user: User = Depends(ge
 
 
 @router.get("/{run_id}/events", response_model=RunEvents)
-def get_events(run_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)) -> RunEvents:
+def get_events(
+    run_id: UUID,
+    after_seq: int = 0,
+    limit: int | None = Query(default=None, ge=1, le=_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> RunEvents:
+    """Events with `seq > after_seq`, oldest first (poll with the last seen seq to fetch only new ones)."""
+
     run = db.get(Run, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Not found")
     _assert_owner(run, user)
-    stmt = select(RunEvent).where(RunEvent.run_id == run_id).order_by(RunEvent.seq.asc())
+    stmt = (
+        select(RunEvent)
+        .where(RunEvent.run_id == run_id, RunEvent.seq > after_seq)
+        .order_by(RunEvent.seq.asc())
+        .limit(limit)
+    )
     events = db.execute(stmt).scalars().all()
     return RunEvents(
         events=[
@@ -224,38 +290,70 @@ def get_events(run_id: UUID, db: Session = Depends(get_db), user: User = Depends
                 "created_at": e.created_at,
             }
             for e in events
-        ]
+        ],
+        next_after_seq=events[-1].seq if limit is not None and len(events) == limit else None,
     )
 
 
 @router.get("/{run_id}/checkpoints", response_model=RunCheckpoints)
 def get_checkpoints(
-    run_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+    run_id: UUID,
+    after_seq: int = 0,
+    limit: int | None = Query(default=None, ge=1, le=_MAX_PAGE_SIZE),
+    include_state: bool = True,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
 ) -> RunCheckpoints:
+    """Checkpoints with `seq > after_seq`. `include_state=false` returns metadata only."""
+
     run = db.get(Run, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Not found")
     _assert_owner(run, user)
-    stmt = select(RunCheckpoint).where(RunCheckpoint.run_id == run_id).order_by(RunCheckpoint.seq.asc())
-    cps = db.execute(stmt).scalars().all()
-    return RunCheckpoints(
-        checkpoints=[
-            RunCheckpointPublic(seq=c.seq, node=c.node, state=c.state, created_at=c.created_at) for c in cps
+    if include_state:
+        cps = [
+            RunCheckpointPublic(seq=c.seq, node=c.node, state=state, created_at=c.created_at)
+            for c, state in RunService().checkpoint_states(db, run_id, after_seq=after_seq, limit=limit)
         ]
+    else:
+        stmt = (
+            select(RunCheckpoint.seq, RunCheckpoint.node, RunCheckpoint.created_at)
+            .where(RunCheckpoint.run_id == run_id, RunCheckpoint.seq > after_seq)
+            .order_by(RunCheckpoint.seq.asc())
+            .limit(limit)
+        )
+        cps = [RunCheckpointPublic(seq=c.seq, node=c.node, created_at=c.created_at) for c in db.execute(stmt)]
+    return RunCheckpoints(
+        checkpoints=cps,
+        next_after_seq=cps[-1].seq if limit is not None and len(cps) == limit else None,
     )
 
 
 @router.get("/{run_id}/artifacts", response_model=RunArtifacts)
 def get_artifacts(
-    run_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+    run_id: UUID,
+    after_created_at: datetime | None = None,
+    after_id: UUID | None = None,
+    limit: int | None = Query(default=None, ge=1, le=_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
 ) -> RunArtifacts:
     run = db.get(Run, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Not found")
     _assert_owner(run, user)
-    stmt = select(RunArtifact).where(RunArtifact.run_id == run_id).order_by(RunArtifact.created_at.asc())
-    arts = db.execute(stmt).scalars().all()
-    return RunArtifacts(
+    # Metadata columns only: listing never loads artifact bodies.
+    stmt = select(RunArtifact.id, RunArtifact.name, RunArtifact.mime_type, RunArtifact.created_at).where(
+        RunArtifact.run_id == run_id
+    )
+    if after_created_at is not None:
+        if after_id is not None:
+            stmt = stmt.where(tuple_(RunArtifact.created_at, RunArtifact.id) > (after_created_at, after_id))
+        else:
+            stmt = stmt.where(RunArtifact.created_at > after_created_at)
+    stmt = stmt.order_by(RunArtifact.created_at.asc(), RunArtifact.id.asc()).limit(limit)
+    arts = db.execute(stmt).all()
+    page = RunArtifacts(
         artifacts=[
             {
                 "id": str(a.id),
@@ -266,6 +364,10 @@ def get_artifacts(
             for a in arts
         ]
     )
+    if limit is not None and len(arts) == limit:
+        page.next_after_created_at = arts[-1].created_at
+        page.next_after_id = str(arts[-1].id)
+    return page
 
 
 @router.get("/{run_id}/artifacts/{artifact_id}", response_model=ArtifactDetail)
@@ -284,13 +386,14 @@ def get_artifact(
     if not art or art.run_id != run_id:
         raise HTTPException(status_code=404, detail="Not found")
 
+    [(content_json, content_text)] = RunService().artifact_contents(db, [art])
     return ArtifactDetail(
         id=str(art.id),
         name=art.name,
         mime_type=art.mime_type,
         created_at=art.created_at,
-        content_json=art.content_json,
-        content_text=art.content_text,
+        content_json=content_json,
+        content_text=content_text,
     )
 
 
@@ -314,10 +417,11 @@ def download_artifact(
     if not filename:
         filename = "artifact"
 
-    if art.content_text is not None:
-        body = art.content_text.encode("utf-8")
-    elif art.content_json is not None:
-        body = json.dumps(art.content_json, ensure_ascii=False, indent=2).encode("utf-8")
+    [(content_json, content_text)] = RunService().artifact_contents(db, [art])
+    if content_text is not None:
+        body = content_text.encode("utf-8")
+    elif content_json is not None:
+        body = json.dumps(content_json, ensure_ascii=False, indent=2).encode("utf-8")
         if not filename.endswith(".json") and art.mime_type == "application/json":
             filename += ".json"
     else:
@@ -343,105 +447,145 @@ def download_workspace_zip(
         raise HTTPException(status_code=404, detail="Not found")
     _assert_owner(run, user)
 
-    stmt = select(RunArtifact).where(RunArtifact.run_id == run_id).order_by(RunArtifact.created_at.asc())
-    arts = db.execute(stmt).scalars().all()
+    # Helpful metadata for local run reproduction.
+    meta = {
+        "id": str(run.id),
+        "status": run.status,
+        "mode": run.mode,
+        "roles": run.roles,
+        "project_id": str(run.project_id) if run.project_id else None,
+        "input": run.input,
+        "created_at": run.created_at.isoformat() if run.created_at else None,
+    }
+    # Artifacts are read in batches on short-lived sessions while the response streams.
+    db.close()
 
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for a in arts:
-            name = (a.name or "").strip().replace("\\", "/").lstrip("/")
+    filename = f"run-{run_id}.zip"
+    return StreamingResponse(
+        _iter_workspace_zip(run_id, meta),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename=\"{filename}\"'},
+    )
+
+
+def _iter_workspace_zip(run_id: UUID, meta: dict) -> Iterator[bytes]:
+    """Zip archive of a run's artifacts, produced incrementally (one artifact batch in memory)."""
+
+    svc = RunService()
+    zs = ZipStream()
+    after: tuple[datetime, UUID] | None = None
+    while True:
+        with SessionLocal() as sdb:
+            stmt = select(RunArtifact).where(RunArtifact.run_id == run_id)
+            if after is not None:
+                stmt = stmt.where(tuple_(RunArtifact.created_at, RunArtifact.id) > after)
+            stmt = stmt.order_by(RunArtifact.created_at.asc(), RunArtifact.id.asc()).limit(_ZIP_BATCH_SIZE)
+            arts = sdb.execute(stmt).scalars().all()
+            if not arts:
+                break
+            after = (arts[-1].created_at, arts[-1].id)
+            batch = [(a.name, *content) for a, content in zip(arts, svc.artifact_contents(sdb, arts), strict=True)]
+        for raw_name, content_json, content_text in batch:
+            name = (raw_name or "").strip().replace("\\", "/").lstrip("/")
             if not name:
                 continue
-            if a.content_text is not None:
-                zf.writestr(name, a.content_text)
-            elif a.content_json is not None:
-                zf.writestr(name, json.dumps(a.content_json, ensure_ascii=False, indent=2))
+            if content_text is not None:
+                yield from zs.add(name, content_text)
+            elif content_json is not None:
+                yield from zs.add(name, json.dumps(content_json, ensure_ascii=False, indent=2))
             else:
-                zf.writestr(name, "")
-
-        # Helpful metadata for local run reproduction.
-        zf.writestr(
-            "run_meta.json",
-            json.dumps(
-                {
-                    "id": str(run.id),
-                    "status": run.status,
-                    "mode": run.mode,
-                    "roles": run.roles,
-                    "project_id": str(run.project_id) if run.project_id else None,
-                    "input": run.input,
-                    "created_at": run.created_at.isoformat() if run.created_at else None,
-                },
-                ensure_ascii=False,
-                indent=2,
-            ),
+                yield from zs.add(name, "")
+        if len(arts) < _ZIP_BATCH_SIZE:
+            break
+
+    yield from zs.add("run_meta.json", json.dumps(meta, ensure_ascii=False, indent=2))
+    yield from zs.finish()
+
+
+def _stream_catch_up(run_id: UUID, after_seq: int) -> tuple[list[dict], str | None]:
+    """Events with `seq > after_seq` plus the run's current status (one short-lived session)."""
+
+    with SessionLocal() as sdb:
+        stmt = (
+            select(RunEvent)
+            .where(RunEvent.run_id == run_id, RunEvent.seq > after_seq)
+            .order_by(RunEvent.seq.asc())
         )
+        events = [event_payload(e) for e in sdb.execute(stmt).scalars().all()]
+        r = sdb.get(Run, run_id)
+        return events, (r.status if r else None)
 
-    body = buf.getvalue()
-    filename = f"run-{run_id}.zip"
-    return Response(
-        content=body,
-        media_type="application/zip",
-        headers={"Content-Disposition": f'attachment; filename=\"{filename}\"'},
-    )
+
+def _bus_sees_all_events() -> bool:
+    # The local bus receives every event if runs execute in this process, or via LISTEN/NOTIFY on
+    # Postgres. Only SQLite + separate worker processes needs periodic DB catch-up.
+    settings = get_settings()
+    return settings.run_dispatch != "queue" or engine.dialect.name == "postgresql"
 
 
 @router.get("/{run_id}/stream")
-def stream_events(
+async def stream_events(
     run_id: UUID,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     """Stream run events via Server-Sent Events (SSE).
 
-    This is intentionally simple: it tails the DB in a loop and emits new events.
+    Live events are pushed from the in-process event bus; the DB is only read to catch up (on
+    connect, on a seq gap, and as a periodic safety net while idle).
     """
 
-    run = db.get(Run, run_id)
+    run = await run_in_threadpool(db.get, Run, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Not found")
     _assert_owner(run, user)
+    # Don't pin a pooled connection for the lifetime of the stream.
+    await run_in_threadpool(db.close)
 
     def sse(event: str, data: dict) -> str:
         return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    terminal = _TERMINAL_STATUSES
+    recheck_s = _STREAM_RECHECK_SECONDS if _bus_sees_all_events() else _STREAM_KEEPALIVE_SECONDS
 
-    def gen():
+    async def gen():
+        # Subscribe before the initial catch-up so nothing committed in between is missed.
+        sub = EVENT_BUS.subscribe(run_id)
         last_seq = 0
-        idle = 0
-        while True:
-            with SessionLocal() as sdb:
-                stmt = (
-                    select(RunEvent)
-                    .where(RunEvent.run_id == run_id, RunEvent.seq > last_seq)
-                    .order_by(RunEvent.seq.asc())
-                )
-                events = sdb.execute(stmt).scalars().all()
+        try:
+            events, status_now = await run_in_threadpool(_stream_catch_up, run_id, last_seq)
+            last_check = time.monotonic()
+            while True:
                 for e in events:
-                    last_seq = e.seq
-                    idle = 0
-                    yield sse(
-                        "run_event",
-                        {
-                            "seq": e.seq,
-                            "type": e.type,
-                            "message": e.message,
-                            "data": e.data,
-                            "created_at": e.created_at.isoformat(),
-                        },
-                    )
-
-                r = sdb.get(Run, run_id)
-                if r and r.status in terminal:
-                    yield sse("done", {"status": r.status})
-                    break
-
-            if idle % 10 == 0:
-                # Keep connection alive through proxies.
-                yield ": ping\n\n"
-            idle += 1
-            time.sleep(0.5)
+                    if e["seq"] <= last_seq:
+                        continue
+                    last_seq = e["seq"]
+                    yield sse("run_event", e)
+                    terminal = _TERMINAL_EVENT_TYPES.get(e["type"])
+                    if terminal:
+                        yield sse("done", {"status": terminal})
+                        return
+                EVENT_BUS.note_seq(run_id, last_seq)
+                if status_now in _TERMINAL_STATUSES:
+                    yield sse("done", {"status": status_now})
+                    return
+
+                ev = await sub.get(timeout=_STREAM_KEEPALIVE_SECONDS)
+                status_now = None
+                if ev is None:
+                    # Keep connection alive through proxies.
+                    yield ": ping\n\n"
+                    events = []
+                    if time.monotonic() - last_check >= recheck_s:
+                        events, status_now = await run_in_threadpool(_stream_catch_up, run_id, last_seq)
+                        last_check = time.monotonic()
+                elif ev["seq"] > last_seq + 1:
+                    # Missed something (dropped by a full queue or written by another writer): replay.
+                    events, status_now = await run_in_threadpool(_stream_catch_up, run_id, last_seq)
+                    last_check = time.monotonic()
+                else:
+                    events = [ev]
+        finally:
+            sub.close()
 
     return StreamingResponse(
         gen(),
@@ -468,6 +612,7 @@ def cancel_run(
     svc = RunService()
     svc.set_status(db, run, "canceled")
     svc.add_event(db, run_id, type="run.canceled.requested", message="Cancel requested", data={})
+    RUN_CONTROLS.signal_on_commit(db, run_id, "canceled")
     db.commit()
     return RunDetail(**_run_public(run).model_dump(), output_text=run.output_text, error=run.error)
 
@@ -490,6 +635,7 @@ def pause_run(
     run.status = "paused"
     svc.add_event(db, run_id, type="run.pause.requested", message="Pause requested", data={})
     db.add(run)
+    RUN_CONTROLS.signal_on_commit(db, run_id, "paused")
     db.commit()
     return RunDetail(**_run_public(run).model_dump(), output_text=run.output_text, error=run.error)
 
@@ -512,5 +658,6 @@ def resume_run(
     run.status = "running"
     svc.add_event(db, run_id, type="run.resume.requested", message="Resume requested", data={})
     db.add(run)
+    RUN_CONTROLS.signal_on_commit(db, run_id, "running")
     db.commit()
     return RunDetail(**_run_public(run).model_dump(), output_text=run.output_text, error=run.error)
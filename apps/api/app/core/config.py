@@ -1,11 +1,20 @@
 from __future__ import annotations
 
-from functools import lru_cache
+import logging
+import signal
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+
+logger = logging.getLogger(__name__)
 
 
 class Settings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     # App
     env: str = "dev"  # dev|test|prod
     test_mode: bool = False
@@ -20,6 +29,18 @@ class Settings(BaseModel):
     session_cookie_name: str = "atoms_session"
     session_max_age_seconds: int = 60 * 60 * 24 * 7  # 7 days
     oauth_session_secret: str = "dev-oauth-session-secret-change-me"
+    # Validated sessions are cached so authenticated requests skip the session/user lookup.
+    # "memory" is per process (a revocation reaches other replicas only after the TTL); "redis"
+    # shares the cache and its invalidations across replicas; "none" disables it.
+    session_cache_backend: str = "memory"
+    session_cache_ttl_seconds: float = 30.0
+    session_cache_max_entries: int = 10_000
+    session_cache_redis_url: str | None = None
+    # bcrypt cost for new hashes; older (cheaper) hashes are upgraded on the next login.
+    bcrypt_rounds: int = 12
+    # Hashing runs on its own pool so login bursts don't starve other requests.
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
 
     # OAuth (prod mode)
     github_client_id: str | None = None
@@ -31,32 +52,133 @@ class Settings(BaseModel):
     deepseek_api_key: str | None = None
     deepseek_api_base: str | None = None
     deepseek_model: str | None = None
+    # More OpenAI-compatible providers next to "deepseek" (DEEPSEEK_*), as JSON:
+    # {"fast": {"api_base": "https://a" | ["https://a", "https://b"], "api_key": "...", "model": "..."}}.
+    # Calls go to the lowest-latency healthy endpoint of a provider.
+    llm_providers: dict[str, dict[str, Any]] = {}
+    # Provider chain per workflow node or role ("default" for the rest), failing over left to right:
+    # "default=deepseek,seo_expert=fast|deepseek,data_analyst=fast|deepseek".
+    llm_routes: dict[str, list[str]] = {}
+    # Shared LLM HTTP client (keep-alive pool reused across calls and runs).
+    llm_http2: bool = True
+    # Read timeout (also write/pool); a down endpoint fails on the much shorter connect timeout.
+    llm_timeout_seconds: float = 60.0
+    llm_connect_timeout_seconds: float = 5.0
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_keepalive_expiry_seconds: float = 30.0
+    # Transient failures (timeouts, 429, 5xx) are retried with jittered exponential backoff,
+    # honouring `Retry-After`. After `llm_breaker_failures` consecutive failures a provider's circuit
+    # opens and calls fall back immediately for `llm_breaker_reset_seconds`, then one probe is let through.
+    llm_max_retries: int = 2
+    llm_retry_base_seconds: float = 0.5
+    llm_retry_max_seconds: float = 10.0
+    llm_breaker_failures: int = 5
+    llm_breaker_reset_seconds: float = 30.0
+    # Outbound requests of all runs share these limits (0 disables one); requests beyond them queue,
+    # round-robin across users, for up to `llm_queue_timeout_seconds` before falling back.
+    # "db" also enforces them across API/worker processes via the `llm_rate_leases` table.
+    llm_max_concurrency: int = 16
+    llm_tokens_per_minute: int = 0
+    llm_queue_timeout_seconds: float = 300.0
+    llm_limiter_backend: str = "memory"
+    # Opt-in response cache keyed by (model, temperature, normalized messages): "off", "memory"
+    # (per-process LRU) or "db" (LRU in front of the `llm_cache_entries` table).
+    llm_cache: str = "off"
+    llm_cache_ttl_seconds: float = 60 * 60 * 24
+    llm_cache_max_entries: int = 1000
+    llm_cache_max_rows: int = 100_000
+    # Response bytes each tier may hold (the memory tier per process, the table in total).
+    llm_cache_max_bytes: int = 64 * 1024 * 1024
+
+    # Team mode scheduling: "sequential" (role_order) or "parallel" (dependency DAG, concurrent
+    # LLM calls for independent roles, at most `team_max_concurrency` at a time per run).
+    team_schedule: str = "sequential"
+    team_max_concurrency: int = 4
+    # Cross-role context in team prompts is capped per role (estimated tokens): the latest
+    # `team_context_recent_outputs` outputs are kept, older ones are cut to a short summary.
+    team_context_max_tokens: int = 3000
+    team_context_role_max_tokens: dict[str, int] = {"engineer": 10_000, "team_finalize": 4000}
+    team_context_recent_outputs: int = 2
+    team_context_summary_tokens: int = 200
+
+    # Run event writer: buffered events are flushed at least this often (ms) or once a batch fills up.
+    run_event_flush_ms: int = 100
+    run_event_batch_size: int = 64
+
+    # Checkpoints are stored as diffs against the previous one, with a full snapshot every N.
+    checkpoint_full_every: int = 10
+
+    # Artifact bodies are deduplicated by content hash; "db" keeps them in `artifact_blobs`,
+    # "fs" writes them under `artifact_blob_dir` (e.g. a shared volume).
+    artifact_blob_backend: str = "db"
+    artifact_blob_dir: str = "./data/artifact-blobs"
+
+    # Run execution: "background" runs in the API process (dev/tests); "queue" leaves runs queued
+    # for `python -m app.worker` processes, which can be scaled independently of the API.
+    run_dispatch: str = "background"
+    run_worker_concurrency: int = 4
+    run_worker_poll_ms: int = 1000
+    run_worker_lease_seconds: int = 60
+    # Run a worker's runs as coroutines on one event loop (async LLM client) instead of one thread
+    # per run; `run_worker_concurrency` can then be much higher.
+    run_worker_async: bool = False
+
+
+# `.env` values we copied into `os.environ`, so a reload can update or drop them.
+_dotenv_applied: dict[str, str] = {}
+_dotenv_lock = threading.Lock()
+
+
+def _dotenv_path() -> str:
+    try:
+        from dotenv import find_dotenv
+    except Exception:
+        return ""
+    return find_dotenv(filename=".env", raise_error_if_not_found=False)
 
 
-@lru_cache(maxsize=1)
-def _load_dotenv_once() -> None:
+def _load_dotenv() -> None:
     """Load repo/root `.env` for local dev convenience.
 
-    Keep `override=False` so explicitly exported env vars always win.
-    Tests should set env vars explicitly (see `apps/api/tests/conftest.py`).
+    Explicitly exported env vars always win; values that came from `.env` follow the file, so
+    `reload_settings()` picks up edits to it. Tests should set env vars explicitly (see
+    `apps/api/tests/conftest.py`).
     """
 
+    import os
+
     try:
-        from dotenv import find_dotenv, load_dotenv
+        from dotenv import dotenv_values
     except Exception:
         return
 
-    env_path = find_dotenv(filename=".env", raise_error_if_not_found=False)
-    if env_path:
-        load_dotenv(env_path, override=False)
+    with _dotenv_lock:
+        env_path = _dotenv_path()
+        values = {k: v for k, v in dotenv_values(env_path).items() if v is not None} if env_path else {}
+        for key in list(_dotenv_applied):
+            if os.environ.get(key) != _dotenv_applied.pop(key):
+                continue  # exported (or changed) by someone else since: theirs now
+            if key in values:
+                os.environ[key] = values[key]
+                _dotenv_applied[key] = values[key]
+            else:
+                del os.environ[key]
+        for key, value in values.items():
+            if key not in os.environ:
+                os.environ[key] = value
+                _dotenv_applied[key] = value
 
 
-def get_settings() -> Settings:
+def load_settings() -> Settings:
+    """Build `Settings` from the environment. Use `get_settings()` for the cached instance."""
+
     # Minimal explicit env loader (keeps tests deterministic and easy to override).
     # If/when settings grow, consider migrating to `pydantic-settings`.
+    import json
     import os
 
-    _load_dotenv_once()
+    _load_dotenv()
 
     def b(name: str, default: bool) -> bool:
         v = os.getenv(name)
@@ -64,6 +186,33 @@ def get_settings() -> Settings:
             return default
         return v.lower() in {"1", "true", "yes", "on"}
 
+    def json_map(name: str) -> dict[str, Any]:
+        raw = (os.getenv(name) or "").strip()
+        if not raw:
+            return {}
+        value = json.loads(raw)
+        if not isinstance(value, dict):
+            raise ValueError(f"{name} must be a JSON object")
+        return value
+
+    def list_map(name: str) -> dict[str, list[str]]:
+        # "key=a|b,key=c"
+        out: dict[str, list[str]] = {}
+        for item in (os.getenv(name) or "").split(","):
+            key, sep, value = item.partition("=")
+            if sep and key.strip():
+                out[key.strip()] = [v.strip() for v in value.split("|") if v.strip()]
+        return out
+
+    def int_map(name: str, default: dict[str, int]) -> dict[str, int]:
+        # "key=value,key=value"; listed keys override the defaults.
+        out = dict(default)
+        for item in (os.getenv(name) or "").split(","):
+            key, sep, value = item.partition("=")
+            if sep and key.strip():
+                out[key.strip()] = int(value)
+        return out
+
     return Settings(
         env=os.getenv("ENV", "dev"),
         test_mode=b("TEST_MODE", False),
@@ -75,6 +224,13 @@ def get_settings() -> Settings:
         session_cookie_name=os.getenv("SESSION_COOKIE_NAME", "atoms_session"),
         session_max_age_seconds=int(os.getenv("SESSION_MAX_AGE_SECONDS", str(60 * 60 * 24 * 7))),
         oauth_session_secret=os.getenv("OAUTH_SESSION_SECRET", "dev-oauth-session-secret-change-me"),
+        session_cache_backend=os.getenv("SESSION_CACHE_BACKEND", "memory").strip().lower(),
+        session_cache_ttl_seconds=float(os.getenv("SESSION_CACHE_TTL_SECONDS", "30")),
+        session_cache_max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000")),
+        session_cache_redis_url=os.getenv("SESSION_CACHE_REDIS_URL"),
+        bcrypt_rounds=int(os.getenv("BCRYPT_ROUNDS", "12")),
+        password_hash_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+        password_hash_max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
         github_client_id=os.getenv("GITHUB_CLIENT_ID"),
         github_client_secret=os.getenv("GITHUB_CLIENT_SECRET"),
         google_client_id=os.getenv("GOOGLE_CLIENT_ID"),
@@ -82,4 +238,126 @@ def get_settings() -> Settings:
         deepseek_api_key=os.getenv("DEEPSEEK_API_KEY"),
         deepseek_api_base=os.getenv("DEEPSEEK_API_BASE"),
         deepseek_model=os.getenv("DEEPSEEK_MODEL"),
+        llm_providers=json_map("LLM_PROVIDERS"),
+        llm_routes=list_map("LLM_ROUTES"),
+        llm_http2=b("LLM_HTTP2", True),
+        llm_timeout_seconds=float(os.getenv("LLM_TIMEOUT_SECONDS", "60")),
+        llm_connect_timeout_seconds=float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5")),
+        llm_max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+        llm_max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10")),
+        llm_keepalive_expiry_seconds=float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "30")),
+        llm_max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        llm_retry_base_seconds=float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5")),
+        llm_retry_max_seconds=float(os.getenv("LLM_RETRY_MAX_SECONDS", "10")),
+        llm_breaker_failures=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        llm_breaker_reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+        llm_max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+        llm_tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "0")),
+        llm_queue_timeout_seconds=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "300")),
+        llm_limiter_backend=os.getenv("LLM_LIMITER_BACKEND", "memory").strip().lower(),
+        llm_cache=os.getenv("LLM_CACHE", "off").strip().lower(),
+        llm_cache_ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(60 * 60 * 24))),
+        llm_cache_max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+        llm_cache_max_rows=int(os.getenv("LLM_CACHE_MAX_ROWS", "100000")),
+        llm_cache_max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        team_schedule=os.getenv("TEAM_SCHEDULE", "sequential").strip().lower(),
+        team_max_concurrency=int(os.getenv("TEAM_MAX_CONCURRENCY", "4")),
+        team_context_max_tokens=int(os.getenv("TEAM_CONTEXT_MAX_TOKENS", "3000")),
+        team_context_role_max_tokens=int_map(
+            "TEAM_CONTEXT_ROLE_MAX_TOKENS", {"engineer": 10_000, "team_finalize": 4000}
+        ),
+        team_context_recent_outputs=int(os.getenv("TEAM_CONTEXT_RECENT_OUTPUTS", "2")),
+        team_context_summary_tokens=int(os.getenv("TEAM_CONTEXT_SUMMARY_TOKENS", "200")),
+        run_event_flush_ms=int(os.getenv("RUN_EVENT_FLUSH_MS", "100")),
+        run_event_batch_size=int(os.getenv("RUN_EVENT_BATCH_SIZE", "64")),
+        checkpoint_full_every=int(os.getenv("CHECKPOINT_FULL_EVERY", "10")),
+        artifact_blob_backend=os.getenv("ARTIFACT_BLOB_BACKEND", "db").strip().lower(),
+        artifact_blob_dir=os.getenv("ARTIFACT_BLOB_DIR", "./data/artifact-blobs"),
+        run_dispatch=os.getenv("RUN_DISPATCH", "background").strip().lower(),
+        run_worker_concurrency=int(os.getenv("RUN_WORKER_CONCURRENCY", "4")),
+        run_worker_poll_ms=int(os.getenv("RUN_WORKER_POLL_MS", "1000")),
+        run_worker_lease_seconds=int(os.getenv("RUN_WORKER_LEASE_SECONDS", "60")),
+        run_worker_async=b("RUN_WORKER_ASYNC", False),
     )
+
+
+_settings: Settings | None = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """The process-wide settings, read from the environment once.
+
+    Values captured at import time (DB engine, cookie name of the auth dependency) only change on
+    restart; everything that calls `get_settings()` at use time picks up `reload_settings()`.
+    """
+
+    settings = _settings
+    if settings is None:
+        with _settings_lock:
+            settings = _settings
+            if settings is None:
+                settings = _set_settings(load_settings())
+    return settings
+
+
+def _set_settings(settings: Settings) -> Settings:
+    global _settings
+    _settings = settings
+    return settings
+
+
+def reload_settings() -> Settings:
+    """Re-read the environment and swap in the new settings atomically."""
+
+    settings = load_settings()
+    with _settings_lock:
+        _set_settings(settings)
+    logger.info("Settings reloaded")
+    return settings
+
+
+@contextmanager
+def override_settings(**changes: Any) -> Iterator[Settings]:
+    """Temporarily replace fields of the cached settings (tests)."""
+
+    previous = get_settings()
+    with _settings_lock:
+        settings = _set_settings(previous.model_copy(update=changes))
+    try:
+        yield settings
+    finally:
+        with _settings_lock:
+            _set_settings(previous)
+
+
+_reload_requested = threading.Event()
+_reload_thread: threading.Thread | None = None
+
+
+def _reload_on_request() -> None:
+    while True:
+        _reload_requested.wait()
+        _reload_requested.clear()
+        try:
+            reload_settings()
+        except Exception:
+            # Keep the current settings; a bad edit (e.g. invalid LLM_PROVIDERS JSON) is logged.
+            logger.exception("Settings reload failed; keeping the current settings")
+
+
+def install_reload_signal_handler() -> bool:
+    """Reload settings on SIGHUP. Only possible from the main thread on platforms with SIGHUP.
+
+    The handler only flags the request: a signal lands between any two bytecodes of the main
+    thread, which may be holding `_settings_lock`, so the reload itself runs on its own thread.
+    """
+
+    global _reload_thread
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    if _reload_thread is None:
+        _reload_thread = threading.Thread(target=_reload_on_request, name="settings-reload", daemon=True)
+        _reload_thread.start()
+    signal.signal(signal.SIGHUP, lambda _signum, _frame: _reload_requested.set())
+    return True
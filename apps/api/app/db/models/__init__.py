@@ -1,3 +1,6 @@
+from app.db.models.artifact_blob import ArtifactBlob
+from app.db.models.llm_cache_entry import LLMCacheEntry
+from app.db.models.llm_rate_lease import LLMRateLease
 from app.db.models.oauth_account import OAuthAccount
 from app.db.models.password_reset_token import PasswordResetToken
 from app.db.models.project import Project
@@ -9,7 +12,10 @@ from app.db.models.session import Session as DbSession
 from app.db.models.user import User
 
 __all__ = [
+    "ArtifactBlob",
     "DbSession",
+    "LLMCacheEntry",
+    "LLMRateLease",
     "OAuthAccount",
     "PasswordResetToken",
     "Project",
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ArtifactBlob(Base):
+    """Content-addressed artifact body, shared by every `RunArtifact` with the same content.
+
+    Garbage collectable once no `run_artifacts` row references it (see `BlobStore.collect_garbage`).
+    """
+
+    __tablename__ = "artifact_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Body for the "db" backend; NULL when the body lives in an external (filesystem) backend.
+    content: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(tz=UTC), nullable=False
+    )
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class LLMRateLease(Base):
+    """One outbound LLM request admitted by the cross-process limiter (see `app.llm.limiter`).
+
+    Unreleased, unexpired rows are the requests in flight; rows acquired within the last minute
+    make up the tokens-per-minute budget already spent.
+    """
+
+    __tablename__ = "llm_rate_leases"
+    __table_args__ = (Index("ix_llm_rate_leases_acquired_at", "acquired_at"),)
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    user_key: Mapped[str] = mapped_column(String, nullable=False, default="")
+    tokens: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    acquired_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(tz=UTC), nullable=False
+    )
+    # A lease whose process died stops counting as in flight after this.
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    released_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
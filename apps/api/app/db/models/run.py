@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, ForeignKey, String, Text, Uuid
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, String, Text, Uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -12,6 +12,13 @@ from app.db.models._mixins import TimestampMixin
 
 class Run(Base, TimestampMixin):
     __tablename__ = "runs"
+    __table_args__ = (
+        # Workers scan for the oldest claimable run (see `RunService.claim_next_run`).
+        Index("ix_runs_status_created_at", "status", "created_at"),
+        # Run listings (per user, optionally per project) in keyset order: created_at DESC, id DESC.
+        Index("ix_runs_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_runs_user_id_project_id_created_at", "user_id", "project_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -32,6 +39,10 @@ class Run(Base, TimestampMixin):
     output_text: Mapped[str | None] = mapped_column(Text, nullable=True)
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # Worker lease: which worker process owns the run and when it last checked in.
+    claimed_by: Mapped[str | None] = mapped_column(String, nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import UTC, datetime
 
-from sqlalchemy import JSON, DateTime, ForeignKey, String, Text, Uuid
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, Text, Uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -11,6 +11,8 @@ from app.db.base import Base
 
 class RunArtifact(Base):
     __tablename__ = "run_artifacts"
+    # Artifact listing / zip export order within a run.
+    __table_args__ = (Index("ix_run_artifacts_run_id_created_at", "run_id", "created_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     run_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("runs.id"), nullable=False)
@@ -19,6 +21,13 @@ class RunArtifact(Base):
     mime_type: Mapped[str] = mapped_column(String, nullable=False, default="application/json")
     content_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     content_text: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # New artifacts keep their body in `artifact_blobs` (deduplicated by content hash) instead of
+    # the inline columns above; `blob_format` says whether it decodes to text or JSON.
+    blob_sha256: Mapped[str | None] = mapped_column(
+        String(64), ForeignKey("artifact_blobs.sha256"), nullable=True, index=True
+    )
+    blob_format: Mapped[str | None] = mapped_column(String, nullable=True)  # text|json
+    size_bytes: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(tz=UTC), nullable=False
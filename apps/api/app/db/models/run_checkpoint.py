@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import UTC, datetime
 
-from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String, UniqueConstraint, Uuid
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint, Uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -11,13 +11,20 @@ from app.db.base import Base
 
 class RunCheckpoint(Base):
     __tablename__ = "run_checkpoints"
-    __table_args__ = (UniqueConstraint("run_id", "seq", name="uq_run_checkpoint_seq"),)
+    __table_args__ = (
+        UniqueConstraint("run_id", "seq", name="uq_run_checkpoint_seq"),
+        # Latest checkpoint of a node (rerun from `node`).
+        Index("ix_run_checkpoints_run_id_node_seq", "run_id", "node", "seq"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     run_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), ForeignKey("runs.id"), nullable=False)
 
     seq: Mapped[int] = mapped_column(Integer, nullable=False)
     node: Mapped[str] = mapped_column(String, nullable=False)
+    # "full": `state` is the complete RunState. "delta": `state` is a diff (see
+    # `app.services.state_diff`) against the checkpoint with the previous seq.
+    kind: Mapped[str] = mapped_column(String, nullable=False, default="full", server_default="full")
     state: Mapped[dict] = mapped_column(JSON, nullable=False)
 
     created_at: Mapped[datetime] = mapped_column(
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from app.core.config import get_settings
+from app.llm.tokens import estimate_tokens
+
+_TRUNCATED = "\n…[truncated]"
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """`text` cut (at a line break when one is close) to at most about `max_tokens`."""
+
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    budget = max_tokens - estimate_tokens(_TRUNCATED)
+    n = int(len(text) * budget / tokens)
+    while n > 0 and estimate_tokens(text[:n]) > budget:
+        n = int(n * 0.9)
+    line_end = text.rfind("\n", 0, n)
+    if line_end >= n * 0.8:
+        n = line_end
+    return text[:n].rstrip() + _TRUNCATED
+
+
+def summarize_output(text: str, max_tokens: int) -> str:
+    """Condensed `text` for older context: its leading non-empty lines within `max_tokens`.
+
+    Roles open with their plan or conclusions, so the head of an output carries most of what later
+    roles need; this keeps summarizing free (no extra model call).
+    """
+
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return truncate_to_tokens("\n".join(lines), max_tokens)
+
+
+def role_token_budget(role: str) -> int:
+    """Max tokens of cross-role context in `role`'s prompt (`TEAM_CONTEXT_ROLE_MAX_TOKENS` wins)."""
+
+    settings = get_settings()
+    return settings.team_context_role_max_tokens.get(role, settings.team_context_max_tokens)
+
+
+@dataclass(frozen=True)
+class RoleContext:
+    text: str
+    tokens: int
+    # What the context would have cost without the budget.
+    unbudgeted_tokens: int
+
+    def stats(self) -> dict[str, int]:
+        return {"context_tokens": self.tokens, "context_tokens_unbudgeted": self.unbudgeted_tokens}
+
+
+def build_role_context(outputs: dict[str, str], *, role: str) -> RoleContext:
+    """Previous roles' outputs for `role`'s prompt, bounded by its token budget.
+
+    The most recent `team_context_recent_outputs` outputs are kept (each up to half the budget),
+    older ones are summarized, and if that is still too much the oldest are dropped.
+    """
+
+    settings = get_settings()
+    budget = role_token_budget(role)
+    entries = [(k, v.strip()) for k, v in outputs.items() if isinstance(v, str) and v.strip()]
+    full = "\n\n".join(f"{k}: {v}" for k, v in entries)
+    recent = max(0, settings.team_context_recent_outputs)
+    parts = []
+    for i, (k, v) in enumerate(entries):
+        if i >= len(entries) - recent:
+            v = truncate_to_tokens(v, budget // 2)
+        else:
+            v = summarize_output(v, settings.team_context_summary_tokens)
+        parts.append(f"{k}: {v}")
+    sizes = [estimate_tokens(p) + 1 for p in parts]
+    total = sum(sizes)
+    while len(parts) > 1 and total > budget:
+        total -= sizes.pop(0)
+        parts.pop(0)
+    text = truncate_to_tokens("\n\n".join(parts), budget)
+    return RoleContext(text=text, tokens=estimate_tokens(text), unbudgeted_tokens=estimate_tokens(full))
+
+
+def files_overview(files: list[dict]) -> str:
+    """Paths and sizes of generated files; their bodies never go into a prompt."""
+
+    lines = []
+    for f in files:
+        if not isinstance(f, dict) or not str(f.get("path") or "").strip():
+            continue
+        size = len(str(f.get("content") or "").encode("utf-8"))
+        lines.append(f"- {str(f.get('path')).strip()} ({size} bytes)")
+    return "\n".join(lines) or "(none)"
@@ -1,17 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import logging
 import mimetypes
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from uuid import UUID
 
+from app.core.config import get_settings
 from app.db.models.run import Run
 from app.db.session import SessionLocal
-from langgraph.types import Command
+from sqlalchemy.orm import Session
 
-from app.langgraph.workflow import WORKFLOW, RunState
-from app.llm.client import LLM_STREAM_EMITTER
+from app.langgraph.file_stream import FileStreamParser
+from app.langgraph.workflow import FILE_STREAM_ROLES, WORKFLOW, RunState, continue_after, resume_target
+from app.llm.client import LLM_EVENT_EMITTER, LLM_STREAM_EMITTER
+from app.llm.limiter import CURRENT_LLM_USER
+from app.services.event_writer import RunEventWriter
+from app.services.run_control import CURRENT_RUN_CONTROL, RUN_CONTROLS, RunCanceled
 from app.services.run_service import RunService
+from app.services.tracing import CURRENT_RUN_PROFILE, RunProfile
+
+logger = logging.getLogger(__name__)
 
 _NAME_SAFE = re.compile(r"[^a-zA-Z0-9._/ -]+")
 
@@ -84,133 +97,428 @@ def _scan_rule_violations(files: list[dict]) -> list[str]:
     return violations
 
 
-def execute_run(run_id: UUID) -> None:
+# Pause/resume/cancel arrive as signals (see `app.services.run_control`); the run status is only
+# re-read from the DB this often, as a safety net for lost notifications and for setups without
+# NOTIFY (SQLite with a separate worker process).
+_CONTROL_RECHECK_S = 5.0
+
+# Files parsed from a streaming reply are persisted here, off the thread (or event loop) that
+# delivers the deltas. Each run drains its own queue in order.
+_ARTIFACT_WRITERS = ThreadPoolExecutor(max_workers=4, thread_name_prefix="artifact-writer")
+# How long `finish()` waits for streamed files to be written before persisting the final set.
+_ARTIFACT_DRAIN_TIMEOUT_S = 30.0
+
+
+def execute_run(run_id: UUID, *, worker_id: str | None = None) -> None:
     """Execute a run end-to-end.
 
-    This is deterministic unless LLM env vars are configured.
+    This is deterministic unless LLM env vars are configured. `worker_id` is the worker that claimed
+    the run: the execution stops (without writing anything more) once the run is no longer its own.
+    """
+
+    svc = RunService()
+    # Set first so the writer's flushes (and every other query of the run) are profiled too.
+    profile = RunProfile(run_id)
+    profile_token = CURRENT_RUN_PROFILE.set(profile)
+    # All events of this run go through one buffered writer (in-memory seq, batched INSERTs).
+    events = RunEventWriter(run_id, service=svc)
+    try:
+        _execute(_RunExecution(run_id, svc, events, profile, worker_id=worker_id))
+    finally:
+        RUN_CONTROLS.close(run_id)
+        events.close()
+        CURRENT_RUN_PROFILE.reset(profile_token)
+
+
+async def aexecute_run(run_id: UUID, *, worker_id: str | None = None) -> None:
+    """Async `execute_run`: drives `WORKFLOW.astream` so many runs can share one event loop.
+
+    Model calls go through `achat`; the (short) DB transactions run on the default thread pool and
+    events are flushed by the writer's timer thread, so the loop itself never blocks on I/O.
     """
 
     svc = RunService()
-    with SessionLocal() as db:
-        run = db.get(Run, run_id)
-        if not run:
+    profile = RunProfile(run_id)
+    profile_token = CURRENT_RUN_PROFILE.set(profile)
+    events = RunEventWriter(run_id, service=svc, background_flush=True)
+    try:
+        await _aexecute(_RunExecution(run_id, svc, events, profile, worker_id=worker_id))
+    finally:
+        RUN_CONTROLS.close(run_id)
+        await asyncio.to_thread(events.close)
+        CURRENT_RUN_PROFILE.reset(profile_token)
+
+
+def _execute(ex: _RunExecution) -> None:
+    initial_input = ex.start()
+    if initial_input is None:
+        return
+    token = LLM_STREAM_EMITTER.set(ex.emit_delta)
+    event_token = LLM_EVENT_EMITTER.set(ex.events.emit)
+    user_token = CURRENT_LLM_USER.set(ex.user_key)
+    ctl_token = CURRENT_RUN_CONTROL.set(ex.ctl)
+    try:
+        while (control := ex.control()) == "paused":
+            ex.ctl.wait_while_paused(_CONTROL_RECHECK_S)
+        if control in {"canceled", "lost"}:
+            return
+        for namespace, stream_mode, chunk in WORKFLOW.stream(
+            initial_input, ex.config, stream_mode=["updates", "values"], subgraphs=True
+        ):
+            if stream_mode == "values":
+                ex.on_values(chunk, namespace)
+                continue
+            # Handle pause/cancel controls between LangGraph node updates.
+            while (control := ex.control()) == "paused":
+                ex.ctl.wait_while_paused(_CONTROL_RECHECK_S)
+            if control in {"canceled", "lost"}:
+                return
+            ex.on_updates(chunk, namespace)
+        ex.finish()
+    except RunCanceled:
+        # An LLM call was aborted mid-stream.
+        ex.control()
+    except Exception as e:
+        ex.fail(e)
+    finally:
+        CURRENT_RUN_CONTROL.reset(ctl_token)
+        CURRENT_LLM_USER.reset(user_token)
+        LLM_EVENT_EMITTER.reset(event_token)
+        LLM_STREAM_EMITTER.reset(token)
+
+
+async def _aexecute(ex: _RunExecution) -> None:
+    initial_input = await asyncio.to_thread(ex.start)
+    if initial_input is None:
+        return
+    # Set inside this task only; LangGraph's node tasks inherit it through their copied context.
+    LLM_STREAM_EMITTER.set(ex.emit_delta)
+    LLM_EVENT_EMITTER.set(ex.events.emit)
+    CURRENT_LLM_USER.set(ex.user_key)
+    CURRENT_RUN_CONTROL.set(ex.ctl)
+    try:
+        # A reclaimed run the user had paused waits before its first step, too.
+        while (control := await asyncio.to_thread(ex.control)) == "paused":
+            await ex.ctl.await_while_paused(_CONTROL_RECHECK_S)
+        if control in {"canceled", "lost"}:
             return
-        input_text = run.input
-        mode = (run.mode or "engineer").strip().lower()
-        roles = run.roles if isinstance(run.roles, list) else None
-        user_rules = run.user_rules if isinstance(run.user_rules, list) else None
-        seed_state = run.seed_state if isinstance(run.seed_state, dict) else None
-        seed_goto = (run.seed_goto or "").strip() or None
-
-        svc.set_status(db, run, "running")
-        svc.add_event(db, run_id, type="run.started", message="Run started", data={})
-        db.commit()
-
-    state: RunState = {"run_id": str(run_id), "input": input_text, "mode": mode}
-    if roles:
-        state["roles"] = roles
-    if user_rules:
-        state["user_rules"] = user_rules
-
-    initial_input: RunState | Command
-    if seed_state and seed_goto:
-        # Ensure the new run's identity is used.
-        seed_state = dict(seed_state)
-        seed_state["run_id"] = str(run_id)
-        seed_state["input"] = input_text
-        seed_state["mode"] = mode
+        async for namespace, stream_mode, chunk in WORKFLOW.astream(
+            initial_input, ex.config, stream_mode=["updates", "values"], subgraphs=True
+        ):
+            if stream_mode == "values":
+                await asyncio.to_thread(ex.on_values, chunk, namespace)
+                continue
+            while (control := await asyncio.to_thread(ex.control)) == "paused":
+                await ex.ctl.await_while_paused(_CONTROL_RECHECK_S)
+            if control in {"canceled", "lost"}:
+                return
+            ex.on_updates(chunk, namespace)
+        await asyncio.to_thread(ex.finish)
+    except RunCanceled:
+        await asyncio.to_thread(ex.control)
+    except Exception as e:
+        await asyncio.to_thread(ex.fail, e)
+
+
+class _RunExecution:
+    """State and DB side effects of one run, shared by the sync and async drivers.
+
+    The drivers only own iteration over the workflow stream and how they wait; everything that
+    touches the DB lives here so both paths persist identical events, checkpoints and artifacts.
+    """
+
+    def __init__(
+        self,
+        run_id: UUID,
+        svc: RunService,
+        events: RunEventWriter,
+        profile: RunProfile,
+        *,
+        worker_id: str | None = None,
+    ) -> None:
+        self.run_id = run_id
+        self.svc = svc
+        self.events = events
+        self.profile = profile
+        self.worker_id = worker_id
+        self.config = {"max_concurrency": max(1, get_settings().team_max_concurrency)}
+        # Registered before `start()` reads the status, so no signal can slip in between.
+        self.ctl = RUN_CONTROLS.open(run_id)
+        self._control_checked = time.monotonic()
+        self.state: RunState = {}
+        # The run's owner, whose LLM requests share a fair-queueing lane in the limiter.
+        self.user_key = ""
+        self._seen_outputs: dict[str, str] = {}
+        self._delta_buf: dict[str, str] = {}
+        self._delta_last_flush: dict[str, float] = {}
+        self._delta_lock = threading.Lock()
+        self._file_parsers: dict[str, FileStreamParser] = {}
+        # Streamed files waiting to be written, and those already written: path -> (artifact id, content).
+        self._artifact_lock = threading.Lock()
+        self._artifact_queue: list[tuple[str, str]] = []
+        self._artifacts_idle = threading.Event()
+        self._artifacts_idle.set()
+        self._persisted_files: dict[str, tuple[UUID, str]] = {}
+        self._paused_emitted = False
+        self._lease_lost = False
+        # "updates" arrive per node (several per step when team roles run in parallel); "values" is
+        # the merged state after each step, which is what we checkpoint for each node of that step.
+        # Both are tracked per graph namespace: a subgraph branch (the parallel schedule's build
+        # chain) steps on its own, and its nodes are checkpointed with the branch's state.
+        self._step_nodes: dict[tuple[str, ...], list[str]] = {}
+        # Outer nodes that are subgraphs; their nodes were reported individually already.
+        self._subgraph_nodes: set[str] = set()
+        # (seq, state) of the last checkpoint written, so the next one is stored as a diff.
+        self._last_checkpoint: tuple[int, dict] | None = None
+
+    def start(self) -> RunState | None:
+        """Mark the run as running and build the workflow input; None if there is nothing to run."""
+
+        run_id, svc, events = self.run_id, self.svc, self.events
+        with SessionLocal() as db:
+            run = db.get(Run, run_id)
+            if not run or run.status in {"succeeded", "failed", "canceled"}:
+                # Canceled (or finished) before a worker got to it.
+                return None
+            input_text = run.input
+            self.user_key = str(run.user_id)
+            mode = (run.mode or "engineer").strip().lower()
+            roles = run.roles if isinstance(run.roles, list) else None
+            user_rules = run.user_rules if isinstance(run.user_rules, list) else None
+            seed_state = run.seed_state if isinstance(run.seed_state, dict) else None
+            seed_goto = (run.seed_goto or "").strip() or None
+            # A run reclaimed from a dead worker picks up after its last checkpoint.
+            latest = svc.latest_checkpoint_state(db, run_id)
+            resumed = None
+            if latest is not None:
+                cp, cp_state = latest
+                resumed = {"seq": cp.seq, "node": cp.node}
+                self._last_checkpoint = (cp.seq, cp_state)
+
+            if run.status == "paused":
+                # Reclaimed while the user had it paused: wait for them to resume it.
+                self.ctl.set_status("paused")
+            else:
+                svc.set_status(db, run, "running")
+            events.emit(type="run.started", message="Run started", data={"resumed_from": resumed} if resumed else {})
+            events.flush(db)
+            db.commit()
+
+        if resumed is not None:
+            resume_state = {**cp_state, "run_id": str(run_id)}
+            self.state = resume_state
+            outputs = resume_state.get("outputs")
+            if isinstance(outputs, dict):
+                self._seen_outputs.update((k, v) for k, v in outputs.items() if isinstance(v, str))
+            goto = continue_after(resume_state, resumed["node"])
+            if goto is None:
+                # It had finished everything but the bookkeeping.
+                self.finish()
+                return None
+            return {**resume_state, "resume_at": goto}
+
+        state: RunState = {"run_id": str(run_id), "input": input_text, "mode": mode}
         if roles:
-            seed_state["roles"] = roles
+            state["roles"] = roles
         if user_rules:
-            seed_state["user_rules"] = user_rules
-        initial_input = Command(update=seed_state, goto=seed_goto)
-    else:
-        initial_input = state
+            state["user_rules"] = user_rules
+        self.state = state
 
-    seen_outputs: dict[str, str] = {}
-    delta_buf: dict[str, str] = {}
-    delta_last_flush: dict[str, float] = {}
-    paused_emitted = False
+        if seed_state and seed_goto:
+            # Ensure the new run's identity is used.
+            seed_state = dict(seed_state)
+            seed_state["run_id"] = str(run_id)
+            seed_state["input"] = input_text
+            seed_state["mode"] = mode
+            if roles:
+                seed_state["roles"] = roles
+            if user_rules:
+                seed_state["user_rules"] = user_rules
+            seed_state, seed_goto = resume_target(seed_state, seed_goto)
+            return {**seed_state, "resume_at": seed_goto}
+        return state
 
-    def emit_delta(role: str, delta: str) -> None:
+    def emit_delta(self, role: str, delta: str) -> None:
         r = (role or "assistant").strip() or "assistant"
         d = (delta or "")
         if not d:
             return
-        delta_buf[r] = (delta_buf.get(r, "") + d)[-50_000:]
-        now = time.monotonic()
-        last = delta_last_flush.get(r, 0.0)
-        if len(delta_buf[r]) < 256 and (now - last) < 0.20:
+        # Parallel team roles stream from LangGraph worker threads.
+        with self._delta_lock:
+            self._delta_buf[r] = self._delta_buf.get(r, "") + d
+            now = time.monotonic()
+            last = self._delta_last_flush.get(r, 0.0)
+            if len(self._delta_buf[r]) < 256 and (now - last) < 0.20:
+                return
+            chunk = self._delta_buf[r]
+            self._delta_buf[r] = ""
+            self._delta_last_flush[r] = now
+            # Under the lock, so a concurrent flush can't reorder this role's chunks.
+            self._emit_chunk(r, chunk)
+
+    def _emit_chunk(self, role: str, chunk: str) -> None:
+        self.events.emit(type="agent.delta", message=role, data={"role": role, "delta": chunk})
+        parser = self._file_parsers.get(role)
+        if parser is None:
+            if role not in FILE_STREAM_ROLES:
+                return
+            parser = self._file_parsers[role] = FileStreamParser()
+        for ev in parser.feed(chunk):
+            path = _sanitize_name(ev.path)
+            data = {"role": role, "index": ev.index, "path": path}
+            if ev.kind == "started":
+                self.events.emit(type="file.started", message=path, data=data)
+            elif ev.kind == "delta":
+                self.events.emit(type="file.delta", message=path, data={**data, "delta": ev.text})
+            else:
+                mime = _guess_mime(path)
+                nbytes = len(ev.text.encode("utf-8"))
+                self.events.emit(
+                    type="file.completed", message=path, data={**data, "mime_type": mime, "bytes": nbytes}
+                )
+                self._queue_artifact(path, ev.text)
+
+    def _queue_artifact(self, name: str, content: str) -> None:
+        if self.ctl.lost:
             return
-        chunk = delta_buf[r]
-        delta_buf[r] = ""
-        delta_last_flush[r] = now
-        with SessionLocal() as db:
-            svc.add_event(db, run_id, type="agent.delta", message=r, data={"role": r, "delta": chunk})
-            db.commit()
+        with self._artifact_lock:
+            self._artifact_queue.append((name, content))
+            if not self._artifacts_idle.is_set():
+                return  # the running drain picks it up
+            self._artifacts_idle.clear()
+        _ARTIFACT_WRITERS.submit(contextvars.copy_context().run, self._drain_artifacts)
 
-    try:
-        token = LLM_STREAM_EMITTER.set(emit_delta)
-        # Stream node updates so we can checkpoint at each node boundary.
-        for update in WORKFLOW.stream(initial_input, stream_mode="updates"):
-            # Handle pause/cancel controls between LangGraph node updates.
-            while True:
+    def _drain_artifacts(self) -> None:
+        while True:
+            with self._artifact_lock:
+                batch, self._artifact_queue = self._artifact_queue, []
+                if not batch:
+                    self._artifacts_idle.set()
+                    return
+            with self._artifact_lock:
+                persisted = dict(self._persisted_files)
+            written: dict[str, tuple[UUID, str]] = {}
+            try:
                 with SessionLocal() as db:
-                    run_ctl = db.get(Run, run_id)
-                    if run_ctl and run_ctl.status == "canceled":
-                        svc.add_event(db, run_id, type="run.canceled", message="Run canceled", data={})
-                        db.commit()
-                        return
-                    if not run_ctl or run_ctl.status != "paused":
-                        if paused_emitted:
-                            svc.add_event(db, run_id, type="run.resumed", message="Run resumed", data={})
-                            db.commit()
-                            paused_emitted = False
-                        break
-                    if not paused_emitted:
-                        svc.add_event(db, run_id, type="run.paused", message="Run paused", data={})
-                        db.commit()
-                        paused_emitted = True
-                time.sleep(0.4)
-            if not isinstance(update, dict):
-                continue
-            for node, node_state in update.items():
-                if not isinstance(node_state, dict):
-                    continue
-                state = node_state  # latest state at this node
-                outputs = state.get("outputs")
-                if isinstance(outputs, dict):
-                    for role, text in outputs.items():
-                        if not isinstance(role, str) or not isinstance(text, str):
+                    for name, content in batch:
+                        prev = written.get(name) or persisted.get(name)
+                        if prev is not None and prev[1] == content:
                             continue
-                        prev = seen_outputs.get(role)
-                        if prev == text:
-                            continue
-                        seen_outputs[role] = text
-                        with SessionLocal() as db:
-                            svc.add_event(
-                                db,
-                                run_id,
-                                type="agent.output",
-                                message=role,
-                                data={"role": role, "text": text},
-                            )
-                            db.commit()
-
-                with SessionLocal() as db:
-                    svc.add_checkpoint(db, run_id, node=str(node), state=dict(state))
-                    svc.add_event(db, run_id, type="checkpoint.saved", message="Checkpoint saved", data={"node": node})
-                    svc.add_event(db, run_id, type="node.completed", message=f"{node} completed", data={"node": node})
+                        if prev is not None:
+                            # Streamed again with other content (e.g. by a later role): replace it.
+                            self.svc.delete_artifacts(db, self.run_id, [prev[0]])
+                        art = self.svc.add_artifact(
+                            db, self.run_id, name=name, mime_type=_guess_mime(name), content_text=content
+                        )
+                        written[name] = (art.id, content)
                     db.commit()
-
-        # Flush remaining deltas, if any.
-        for r, chunk in list(delta_buf.items()):
-            if not chunk:
+            except Exception:
+                # `finish()` persists whatever didn't make it.
+                logger.exception("Persisting streamed files failed", extra={"run_id": str(self.run_id)})
                 continue
+            with self._artifact_lock:
+                self._persisted_files.update(written)
+
+    def control(self) -> str:
+        """Current control state: "canceled", "paused", "running" or "lost" (emitting transition events)."""
+
+        events = self.events
+        now = time.monotonic()
+        if now - self._control_checked >= _CONTROL_RECHECK_S:
+            self._control_checked = now
             with SessionLocal() as db:
-                svc.add_event(db, run_id, type="agent.delta", message=r, data={"role": r, "delta": chunk})
-                db.commit()
-        delta_buf.clear()
+                run_ctl = db.get(Run, self.run_id)
+                if self._owns(run_ctl):
+                    self.ctl.set_status("canceled" if not run_ctl else run_ctl.status)
+        if self.ctl.lost:
+            self._lose()
+            return "lost"
+        status = self.ctl.status
+        if status == "canceled":
+            events.emit(type="run.canceled", message="Run canceled", data={})
+            return "canceled"
+        if status != "paused":
+            if self._paused_emitted:
+                events.emit(type="run.resumed", message="Run resumed", data={})
+                self._paused_emitted = False
+            return "running"
+        if not self._paused_emitted:
+            events.emit(type="run.paused", message="Run paused", data={})
+            events.flush()
+            self._paused_emitted = True
+        return "paused"
+
+    def _owns(self, run: Run | None) -> bool:
+        """Whether this execution may still write the run; a reclaimed run belongs to its new worker."""
+
+        if self.worker_id is None or (run is not None and run.claimed_by == self.worker_id):
+            return True
+        self._lose()
+        return False
+
+    def _lose(self) -> None:
+        if not self._lease_lost:
+            logger.warning("Run lease lost; stopping", extra={"run_id": str(self.run_id), "worker": self.worker_id})
+            self._lease_lost = True
+        self.ctl.revoke()
+        self.events.discard()
+
+    def _flush_deltas(self) -> None:
+        with self._delta_lock:
+            for r, chunk in self._delta_buf.items():
+                if chunk:
+                    self._emit_chunk(r, chunk)
+            self._delta_buf.clear()
+
+    def on_values(self, chunk: object, namespace: tuple[str, ...] = ()) -> None:
+        if not isinstance(chunk, dict):
+            chunk = self.state
+        elif not namespace:
+            self.state = chunk
+        nodes = self._step_nodes.pop(namespace, None)
+        if not nodes or self.ctl.lost:
+            return
+        with SessionLocal() as db:
+            for node in nodes:
+                state = dict(chunk)
+                cp = self.svc.add_checkpoint(db, self.run_id, node=node, state=state, prev=self._last_checkpoint)
+                self._last_checkpoint = (cp.seq, state)
+                self.events.emit(type="checkpoint.saved", message="Checkpoint saved", data={"node": node})
+                self.events.emit(type="node.completed", message=f"{node} completed", data={"node": node})
+            self.events.flush(db)
+            db.commit()
+
+    def on_updates(self, chunk: object, namespace: tuple[str, ...] = ()) -> None:
+        if not isinstance(chunk, dict):
+            return
+        if namespace:
+            self._subgraph_nodes.add(namespace[0].split(":", 1)[0])
+        # A node finished, so its LLM stream has ended: its last deltas go out before its output.
+        self._flush_deltas()
+        for node, node_update in chunk.items():
+            if not isinstance(node_update, dict) or (not namespace and node in self._subgraph_nodes):
+                continue
+            self._step_nodes.setdefault(namespace, []).append(str(node))
+            metrics = (node_update.get("prompt_metrics") or {}).get(node)
+            if isinstance(metrics, dict):
+                self.events.emit(type="llm.prompt", message=str(node), data={"node": str(node), **metrics})
+            outputs = node_update.get("outputs")
+            if isinstance(outputs, dict):
+                for role, text in outputs.items():
+                    if not isinstance(role, str) or not isinstance(text, str):
+                        continue
+                    # The role's reply is complete; a later call of it streams a new document.
+                    with self._delta_lock:
+                        self._file_parsers.pop(role, None)
+                    prev = self._seen_outputs.get(role)
+                    if prev == text:
+                        continue
+                    self._seen_outputs[role] = text
+                    self.events.emit(type="agent.output", message=role, data={"role": role, "text": text})
+
+    def finish(self) -> None:
+        run_id, svc, events, state = self.run_id, self.svc, self.events, self.state
+        self._flush_deltas()
 
         final = state.get("final") or {}
         files = []
@@ -220,38 +528,41 @@ def execute_run(run_id: UUID) -> None:
             files = final.get("files") or []
         violations = _scan_rule_violations(files)
         if violations:
-            with SessionLocal() as db:
-                svc.add_event(
-                    db,
-                    run_id,
-                    type="rules.violation",
-                    message="global_rules",
-                    data={"violations": violations},
-                )
-                db.commit()
+            events.emit(type="rules.violation", message="global_rules", data={"violations": violations})
+        if not self._artifacts_idle.wait(_ARTIFACT_DRAIN_TIMEOUT_S):
+            logger.warning("Streamed files still being written", extra={"run_id": str(run_id)})
+        with self._artifact_lock:
+            persisted = dict(self._persisted_files)
+        # The final file set is authoritative: one file per path, the last one listed winning.
+        final_files: dict[str, str] = {}
+        for f in files:
+            if not isinstance(f, dict):
+                continue
+            path = _sanitize_name(str(f.get("path") or ""))
+            final_files.pop(path, None)
+            final_files[path] = str(f.get("content") or "")
 
         with SessionLocal() as db:
             run = db.get(Run, run_id)
-            if run:
-                if run.status == "canceled":
-                    svc.add_event(db, run_id, type="run.canceled", message="Run canceled", data={})
-                    db.commit()
-                    return
-                summary = (final.get("summary") or "").strip() or "Run completed"
-                if violations:
-                    summary = summary + "\n\n[Global rule violations]\n- " + "\n- ".join(violations)
-                run.output_text = summary
-                # Persist generated files as individual artifacts so the UI can show them as code tabs.
-                if files:
-                    manifest = []
-                    for f in files:
-                        if not isinstance(f, dict):
-                            continue
-                        path = _sanitize_name(str(f.get("path") or ""))
-                        content = str(f.get("content") or "")
-                        if not path:
-                            continue
-                        mime = _guess_mime(path)
+            if not run or not self._owns(run):
+                return
+            if run.status == "canceled":
+                events.emit(type="run.canceled", message="Run canceled", data={})
+                return
+            summary = (final.get("summary") or "").strip() or "Run completed"
+            if violations:
+                summary = summary + "\n\n[Global rule violations]\n- " + "\n- ".join(violations)
+            run.output_text = summary
+            # Streamed files the final set dropped or rewrote (e.g. replaced by a fallback demo) go.
+            stale = [art_id for path, (art_id, content) in persisted.items() if final_files.get(path) != content]
+            svc.delete_artifacts(db, run_id, stale)
+            # Persist generated files as individual artifacts so the UI can show them as code tabs
+            # (files already written while the reply streamed are only listed in the manifest).
+            if final_files:
+                manifest = []
+                for path, content in final_files.items():
+                    mime = _guess_mime(path)
+                    if path not in persisted or persisted[path][1] != content:
                         svc.add_artifact(
                             db,
                             run_id,
@@ -259,39 +570,44 @@ def execute_run(run_id: UUID) -> None:
                             mime_type=mime,
                             content_text=content,
                         )
-                        manifest.append({"path": path, "mime_type": mime, "bytes": len(content.encode("utf-8"))})
-                    if manifest:
-                        svc.add_artifact(
-                            db,
-                            run_id,
-                            name="files_manifest.json",
-                            mime_type="application/json",
-                            content_json={"files": manifest},
-                        )
-                svc.add_artifact(
-                    db,
-                    run_id,
-                    name="final_output.json",
-                    mime_type="application/json",
-                    content_json=final if isinstance(final, dict) else {"final": final},
-                )
-                svc.set_status(db, run, "succeeded")
-                svc.add_event(db, run_id, type="run.succeeded", message="Run succeeded", data={})
-                db.commit()
-    except Exception as e:
-        try:
-            LLM_STREAM_EMITTER.reset(token)  # type: ignore[name-defined]
-        except Exception:
-            pass
+                    manifest.append({"path": path, "mime_type": mime, "bytes": len(content.encode("utf-8"))})
+                if manifest:
+                    svc.add_artifact(
+                        db,
+                        run_id,
+                        name="files_manifest.json",
+                        mime_type="application/json",
+                        content_json={"files": manifest},
+                    )
+            svc.add_artifact(
+                db,
+                run_id,
+                name="final_output.json",
+                mime_type="application/json",
+                content_json=final if isinstance(final, dict) else {"final": final},
+            )
+            self._add_profile(db, "succeeded")
+            svc.set_status(db, run, "succeeded")
+            events.emit(type="run.succeeded", message="Run succeeded", data={})
+            events.flush(db)
+            db.commit()
+
+    def fail(self, e: Exception) -> None:
         with SessionLocal() as db:
-            run = db.get(Run, run_id)
-            if run:
+            run = db.get(Run, self.run_id)
+            if run and self._owns(run):
                 run.error = str(e)
-                svc.set_status(db, run, "failed")
-                svc.add_event(db, run_id, type="run.failed", message="Run failed", data={"error": str(e)})
+                self._add_profile(db, "failed")
+                self.svc.set_status(db, run, "failed")
+                self.events.emit(type="run.failed", message="Run failed", data={"error": str(e)})
+                self.events.flush(db)
                 db.commit()
-    else:
-        try:
-            LLM_STREAM_EMITTER.reset(token)  # type: ignore[name-defined]
-        except Exception:
-            pass
+
+    def _add_profile(self, db: Session, status: str) -> None:
+        self.svc.add_artifact(
+            db,
+            self.run_id,
+            name="run_profile.json",
+            mime_type="application/json",
+            content_json=self.profile.summary(status),
+        )
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+# Incremental parsing of the `{"summary": string, "files": [{"path": string, "content": string}]}`
+# replies of file-emitting roles, so generated files surface while the model is still writing.
+
+_PLAIN = re.compile(r'[^"\\]+')
+_WS = " \t\r\n"
+_LITERAL_END = ",}]" + _WS
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+@dataclass(frozen=True)
+class FileStreamEvent:
+    kind: str  # started|delta|completed
+    index: int
+    path: str
+    # New content for "delta", the whole content for "completed".
+    text: str = ""
+
+
+def _decode_escape(s: str, i: int) -> tuple[str, int]:
+    """Decode the escape sequence at `s[i]` (a backslash); (text, 0) if it isn't complete yet."""
+
+    if i + 1 >= len(s):
+        return "", 0
+    c = s[i + 1]
+    if c != "u":
+        return _ESCAPES.get(c, c), 2
+    if i + 6 > len(s):
+        return "", 0
+    try:
+        code = int(s[i + 2 : i + 6], 16)
+    except ValueError:
+        return s[i + 2 : i + 6], 6
+    if not 0xD800 <= code < 0xDC00:
+        return chr(code), 6
+    # High surrogate: combine with a following low surrogate like json.loads does.
+    if i + 8 > len(s):
+        return "", 0
+    if s[i + 6 : i + 8] != "\\u":
+        return chr(code), 6
+    if i + 12 > len(s):
+        return "", 0
+    try:
+        low = int(s[i + 8 : i + 12], 16)
+    except ValueError:
+        return chr(code), 6
+    if not 0xDC00 <= low < 0xE000:
+        return chr(code), 6
+    return chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)), 12
+
+
+class FileStreamParser:
+    """Feed it the raw text of a streaming reply; it reports each `files` entry as it is parsed.
+
+    An entry is "started" once its path is known, its content arrives as "delta" events (content
+    read before the path is reported with the first delta) and it is "completed" when its object
+    closes. Text before the first `{` is skipped; after malformed JSON no further events are
+    reported (the final reply is still parsed as a whole by the workflow).
+    """
+
+    def __init__(self) -> None:
+        # seek|key|colon|value|after|string|literal|done|failed
+        self._state = "seek"
+        self._carry = ""
+        self._stack: list[str] = []
+        # Current key of each open object (None for arrays), parallel to `_stack`.
+        self._keys: list[str | None] = []
+        # What the string being read is: "key", "path", "content" or None (skipped).
+        self._target: str | None = None
+        self._parts: list[str] = []
+        self._events: list[FileStreamEvent] = []
+        self._index = -1
+        self._in_file = False
+        self._path = ""
+        self._content: list[str] = []
+        self._emitted = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state in {"done", "failed"}
+
+    def feed(self, text: str) -> list[FileStreamEvent]:
+        s = self._carry + text
+        self._carry = ""
+        i, n = 0, len(s)
+        while i < n and not self.done:
+            state = self._state
+            if state == "string":
+                m = _PLAIN.match(s, i)
+                if m:
+                    self._string_piece(m.group())
+                    i = m.end()
+                elif s[i] == '"':
+                    self._end_string()
+                    i += 1
+                else:
+                    piece, used = _decode_escape(s, i)
+                    if not used:
+                        self._carry = s[i:]
+                        break
+                    self._string_piece(piece)
+                    i += used
+                continue
+
+            ch = s[i]
+            if state == "literal":
+                if ch in _LITERAL_END:
+                    self._state = "after"
+                    continue
+            elif ch in _WS:
+                pass
+            elif state == "seek":
+                if ch == "{":
+                    self._open("{")
+            elif state == "key":
+                if ch == '"':
+                    self._begin_string("key")
+                elif ch == "}":
+                    self._close("{")
+                else:
+                    self._state = "failed"
+            elif state == "colon":
+                self._state = "value" if ch == ":" else "failed"
+            elif state == "value":
+                if ch in "{[":
+                    self._open(ch)
+                elif ch == "]" and self._stack[-1] == "[":
+                    self._close("[")
+                elif ch == '"':
+                    self._begin_string(self._field())
+                elif ch in ",}]:":
+                    self._state = "failed"
+                else:
+                    self._state = "literal"
+            elif state == "after":
+                if ch == ",":
+                    self._state = "key" if self._stack[-1] == "{" else "value"
+                elif ch in "}]":
+                    self._close("{" if ch == "}" else "[")
+                else:
+                    self._state = "failed"
+            i += 1
+
+        self._flush_content()
+        events, self._events = self._events, []
+        return events
+
+    def _field(self) -> str | None:
+        if self._in_file and len(self._stack) == 3 and self._keys[2] in {"path", "content"}:
+            return self._keys[2]
+        return None
+
+    def _open(self, kind: str) -> None:
+        if kind == "{" and self._stack == ["{", "["] and self._keys[0] == "files":
+            self._index += 1
+            self._in_file = True
+            self._path = ""
+            self._content = []
+            self._emitted = 0
+        self._stack.append(kind)
+        self._keys.append(None)
+        self._state = "key" if kind == "{" else "value"
+
+    def _close(self, kind: str) -> None:
+        if self._stack[-1] != kind:
+            self._state = "failed"
+            return
+        self._stack.pop()
+        self._keys.pop()
+        if self._in_file and len(self._stack) == 2:
+            self._flush_content()
+            self._in_file = False
+            if self._path:
+                self._events.append(
+                    FileStreamEvent("completed", self._index, self._path, "".join(self._content))
+                )
+        self._state = "after" if self._stack else "done"
+
+    def _begin_string(self, target: str | None) -> None:
+        self._state = "string"
+        self._target = target
+        self._parts = []
+        if target == "content":
+            self._content = []
+            self._emitted = 0
+
+    def _string_piece(self, piece: str) -> None:
+        if self._target == "content":
+            self._content.append(piece)
+        elif self._target is not None:
+            self._parts.append(piece)
+
+    def _end_string(self) -> None:
+        target = self._target
+        self._target = None
+        if target == "key":
+            self._keys[-1] = "".join(self._parts)
+            self._state = "colon"
+            return
+        if target == "path" and not self._path:
+            path = "".join(self._parts).strip()
+            if path:
+                self._path = path
+                self._events.append(FileStreamEvent("started", self._index, path))
+        self._state = "after"
+
+    def _flush_content(self) -> None:
+        if not self._in_file or not self._path or self._emitted >= len(self._content):
+            return
+        delta = "".join(self._content[self._emitted :])
+        self._emitted = len(self._content)
+        if delta:
+            self._events.append(FileStreamEvent("delta", self._index, self._path, delta))
@@ -1,11 +1,62 @@
 from __future__ import annotations
 
+import functools
 import json
-from typing import TypedDict
+import re
+import time
+from collections.abc import Callable, Generator, Iterator
+from typing import Annotated, Any, TypedDict
 
-from langgraph.graph import END, StateGraph
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END, START, StateGraph
 
-from app.llm.client import ChatMessage, chat
+from app.core.config import get_settings
+from app.langgraph.context_budget import (
+    build_role_context,
+    estimate_tokens,
+    files_overview,
+    role_token_budget,
+    truncate_to_tokens,
+)
+from app.llm.client import ChatMessage, achat, chat
+from app.services.tracing import node_span
+
+
+def _merge_outputs(left: dict[str, str] | None, right: dict[str, str] | None) -> dict[str, str]:
+    # Idempotent so nodes may return either the full outputs dict or only their own entry.
+    return {**(left or {}), **(right or {})}
+
+
+def _merge_prompt_metrics(
+    left: dict[str, dict[str, int]] | None, right: dict[str, dict[str, int]] | None
+) -> dict[str, dict[str, int]]:
+    return {**(left or {}), **(right or {})}
+
+
+def _merge_roles_done(left: list[str] | None, right: list[str] | None) -> list[str]:
+    out = list(left or [])
+    out.extend(r for r in (right or []) if r not in out)
+    return out
+
+
+# Team DAG used by the "parallel" team schedule: a node runs once all of its dependencies that
+# are part of the run have completed. Advisory roles only need the lead's plan, so they fan out
+# concurrently with the architect -> task_view -> engineer chain.
+TEAM_NODE_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "team_lead": (),
+    "seo_expert": ("team_lead",),
+    "product_manager": ("team_lead",),
+    "data_analyst": ("team_lead",),
+    "deep_researcher": ("team_lead",),
+    "architect": ("team_lead",),
+    "task_view": ("architect",),
+    "engineer": ("task_view",),
+}
+# Under the "parallel" schedule the dependent chain runs as one subgraph branch next to the
+# advisory roles. LangGraph starts a step only once every node of the previous one finished, so
+# chain nodes scheduled as steps of the outer graph would each wait for the slowest advisory role.
+TEAM_BUILD_CHAIN = ("architect", "task_view", "engineer")
+TEAM_BUILD_NODE = "team_build"
 
 
 class RunState(TypedDict, total=False):
@@ -15,7 +66,12 @@ class RunState(TypedDict, total=False):
     roles: list[str]
     role_order: list[str]
     role_index: int
-    outputs: dict[str, str]
+    # "sequential" (one role per step, in role_order) or "parallel" (TEAM_NODE_DEPENDENCIES).
+    team_schedule: str
+    roles_done: Annotated[list[str], _merge_roles_done]
+    outputs: Annotated[dict[str, str], _merge_outputs]
+    # Per LLM node: prompt size (and the cross-role context before/after budgeting) and latency.
+    prompt_metrics: Annotated[dict[str, dict[str, int]], _merge_prompt_metrics]
     files: list[dict]
     user_rules: list[str]
     project_rules: dict
@@ -23,62 +79,165 @@ class RunState(TypedDict, total=False):
     task_view: dict
     final: dict | None
     errors: list[str]
+    # Node a seeded state (rerun from a checkpoint, reclaimed run) enters at instead of "init".
+    resume_at: str
+
+
+def _team_nodes(state: RunState) -> list[str]:
+    nodes = list(state.get("role_order") or [])
+    if "engineer" in nodes:
+        nodes.append("task_view")
+    return nodes
+
+
+def resume_target(state: dict[str, Any], node: str) -> tuple[dict[str, Any], str]:
+    """The seed state and entry node of a rerun of `node` from a checkpoint `state`.
+
+    Under the "parallel" schedule a team role only finishes its own branch, so it is re-run by
+    marking it pending again and entering at the router, which schedules it with anything else
+    still pending.
+    """
+
+    if state.get("team_schedule") != "parallel" or node not in TEAM_NODE_DEPENDENCIES:
+        return state, node
+    done = [r for r in state.get("roles_done") or [] if r != node]
+    return {**state, "roles_done": done}, "team_router"
+
+
+def continue_after(state: dict[str, Any], node: str) -> str | None:
+    """The node a run picks up from after its checkpoint `state` at `node`; None if it had finished.
+
+    Team runs re-enter at the router, which finds the next role from `role_index` (sequential) or
+    `roles_done` (parallel), so a role that was still running is simply scheduled again.
+    """
+
+    if state.get("final"):
+        return None
+    if node == "init":
+        return "rule_node"
+    return "team_router" if state.get("mode") == "team" else "engineer_solo"
+
+
+def _orjson_loads() -> Callable[[str], Any] | None:
+    try:
+        import orjson
+    except Exception:
+        return None
+    return orjson.loads
+
+
+_ORJSON_LOADS = _orjson_loads()
+
+# A string literal (an unterminated one runs to the end of the text) or a brace.
+_JSON_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"?|[{}]', re.DOTALL)
+_RAW_DECODER = json.JSONDecoder()
+
+
+def _loads_obj(text: str) -> dict | None:
+    """Parse `text` as a JSON object; None if it isn't one."""
+
+    obj: Any = None
+    if _ORJSON_LOADS is not None:
+        try:
+            obj = _ORJSON_LOADS(text)
+        except Exception:
+            # orjson is stricter (NaN, integers beyond 64 bits); let the stdlib have a go.
+            obj = None
+    if obj is None:
+        try:
+            obj = json.loads(text)
+        except Exception:
+            return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _fenced_blocks(t: str) -> Iterator[str]:
+    """Bodies of the ``` fenced blocks of `t` (the info string, e.g. `json`, is dropped)."""
+
+    pos = t.find("```")
+    while pos >= 0:
+        body = t.find("\n", pos + 3)
+        close = t.find("```", body) if body >= 0 else -1
+        if close < 0:
+            return
+        yield t[body + 1 : close].strip()
+        pos = t.find("```", close + 3)
+
+
+def _outermost(t: str, regions: list[tuple[int, int]]) -> Iterator[str]:
+    end = -1
+    for start, stop in sorted(regions):
+        if start >= end:
+            yield t[start:stop]
+            end = stop
+
+
+def _json_candidates(t: str) -> Iterator[str]:
+    """Balanced `{...}` regions of `t`, in order, found in a single pass.
+
+    Braces inside string literals don't count. Between regions the scan jumps to the next `{`, so
+    prose (and stray quotes in it) is skipped rather than tokenized. A region that gets rejected is
+    followed by its outermost nested regions, as is a `{` that is never closed.
+    """
+
+    opens: list[int] = []
+    # Regions closed inside a still-open `{`.
+    nested: list[tuple[int, int]] = []
+    pos = t.find("{")
+    while pos >= 0:
+        for m in _JSON_TOKEN.finditer(t, pos):
+            ch = t[m.start()]
+            if ch == "{":
+                opens.append(m.start())
+            elif ch == "}":
+                start = opens.pop()
+                if opens:
+                    nested.append((start, m.end()))
+                    continue
+                yield t[start : m.end()]
+                yield from _outermost(t, nested)
+                nested.clear()
+                pos = t.find("{", m.end())
+                break
+        else:
+            break
+    yield from _outermost(t, nested)
+
 
 def _extract_json_obj(text: str) -> dict | None:
     """Best-effort JSON object extraction.
 
     Some models may wrap JSON with prose or accidentally emit multiple JSON-looking blocks.
-    We scan for the first balanced {...} region that parses as JSON.
+    The whole text, fenced blocks and the object at the first `{` are tried as-is; otherwise the
+    first balanced {...} region that parses as JSON wins.
     """
 
     t = (text or "").strip()
     if not t:
         return None
-
-    start = t.find("{")
-    if start < 0:
+    if t[0] == "{" and t[-1] == "}" and (obj := _loads_obj(t)) is not None:
+        return obj
+    for block in _fenced_blocks(t):
+        if block.startswith("{") and (obj := _loads_obj(block)) is not None:
+            return obj
+    first = t.find("{")
+    if first < 0:
         return None
+    try:
+        obj = _RAW_DECODER.raw_decode(t, first)[0]
+    except ValueError:
+        obj = None
+    if isinstance(obj, dict):
+        return obj
+    for candidate in _json_candidates(t):
+        if (obj := _loads_obj(candidate)) is not None:
+            return obj
+    return None
 
-    depth = 0
-    in_str = False
-    esc = False
-    for i in range(start, len(t)):
-        ch = t[i]
-        if in_str:
-            if esc:
-                esc = False
-                continue
-            if ch == "\\":
-                esc = True
-                continue
-            if ch == '"':
-                in_str = False
-            continue
-
-        if ch == '"':
-            in_str = True
-            continue
-        if ch == "{":
-            depth += 1
-        elif ch == "}":
-            depth -= 1
-            if depth == 0:
-                candidate = t[start : i + 1]
-                try:
-                    obj = json.loads(candidate)
-                except Exception:
-                    # Continue searching: there might be another JSON object later.
-                    nxt = t.find("{", i + 1)
-                    if nxt < 0:
-                        return None
-                    start = nxt
-                    depth = 0
-                    in_str = False
-                    esc = False
-                    continue
-                return obj if isinstance(obj, dict) else None
 
-    return None
+# Roles whose streamed reply is the `{"summary", "files"}` JSON (`engineer_solo` and the team engineer);
+# the executor surfaces their files while they stream.
+FILE_STREAM_ROLES = frozenset({"engineer"})
 
 
 def _normalize_files(obj: dict) -> tuple[str, list[dict]]:
@@ -651,6 +810,77 @@ canvas{width:100%;height:auto;border-radius:14px;border:1px solid var(--bd);back
     ]
 
 
+# LLM-backed nodes are written once as generators: they `yield` the keyword arguments of a chat()
+# call and receive the model's text back. `_llm_node` drives them with `chat` under
+# `WORKFLOW.stream` and with `achat` under `WORKFLOW.astream`, so the async executor never blocks
+# its event loop on a model call.
+# A step may add `context_stats` to its request; it is recorded with the call's prompt metrics.
+LLMSteps = Generator[dict[str, Any], str, RunState]
+
+
+def _call_metrics(request: dict[str, Any]) -> dict[str, int]:
+    text = "".join(m.content for m in request.get("messages") or [])
+    return {
+        "calls": 1,
+        "prompt_chars": len(text),
+        "prompt_tokens": estimate_tokens(text),
+        **(request.pop("context_stats", None) or {}),
+    }
+
+
+def _with_metrics(update: RunState, name: str, calls: list[dict[str, int]]) -> RunState:
+    total: dict[str, int] = {}
+    for call in calls:
+        for k, v in call.items():
+            total[k] = total.get(k, 0) + v
+    return {**update, "prompt_metrics": {name: total}} if total else update
+
+
+def _llm_node(steps: Callable[[RunState], LLMSteps], name: str) -> RunnableLambda:
+    def _sync(state: RunState) -> RunState:
+        gen = steps(state)
+        calls: list[dict[str, int]] = []
+        with node_span(name):
+            try:
+                request = next(gen)
+                while True:
+                    calls.append(_call_metrics(request))
+                    t0 = time.perf_counter()
+                    text = chat(**request)
+                    calls[-1]["latency_ms"] = round((time.perf_counter() - t0) * 1000)
+                    request = gen.send(text)
+            except StopIteration as done:
+                return _with_metrics(done.value, name, calls)
+
+    async def _async(state: RunState) -> RunState:
+        gen = steps(state)
+        calls: list[dict[str, int]] = []
+        with node_span(name):
+            try:
+                request = next(gen)
+                while True:
+                    calls.append(_call_metrics(request))
+                    t0 = time.perf_counter()
+                    text = await achat(**request)
+                    calls[-1]["latency_ms"] = round((time.perf_counter() - t0) * 1000)
+                    request = gen.send(text)
+            except StopIteration as done:
+                return _with_metrics(done.value, name, calls)
+
+    return RunnableLambda(_sync, afunc=_async, name=name)
+
+
+def _traced(fn: Callable[[RunState], RunState], name: str) -> Callable[[RunState], RunState]:
+    """A plain (non-LLM) node wrapped in a tracing span; LLM nodes get theirs from `_llm_node`."""
+
+    @functools.wraps(fn)
+    def _node(state: RunState) -> RunState:
+        with node_span(name):
+            return fn(state)
+
+    return _node
+
+
 def build_workflow():
     graph: StateGraph = StateGraph(RunState)
 
@@ -688,12 +918,17 @@ def build_workflow():
         else:
             roles = ["engineer"]
 
+        schedule = (state.get("team_schedule") or get_settings().team_schedule or "").strip().lower()
+        if mode != "team" or schedule not in {"sequential", "parallel"}:
+            schedule = "sequential"
+
         return {
             **state,
             "mode": mode,
             "roles": roles,
             "role_order": roles if mode == "team" else [],
             "role_index": 0,
+            "team_schedule": schedule,
             "outputs": {},
             "errors": [],
         }
@@ -749,11 +984,11 @@ def build_workflow():
         outputs["rule_node"] = msg
         return {**state, "outputs": outputs, "project_rules": pr.model_dump()}
 
-    def engineer_solo(state: RunState) -> RunState:
+    def engineer_solo(state: RunState) -> LLMSteps:
         input_text = (state.get("input") or "").strip()
         rules_obj = state.get("project_rules") or {}
         rules_json = json.dumps(rules_obj, ensure_ascii=False, indent=2)[:20_000]
-        raw = chat(
+        raw = yield dict(
             messages=[
                 ChatMessage(
                     role="system",
@@ -817,10 +1052,18 @@ def build_workflow():
         }
         return {**state, "outputs": outputs, "files": files, "final": final}
 
-    def _team_role_node(role: str, system: str, *, emits_files: bool = False) -> callable:
-        def _fn(state: RunState) -> RunState:
+    def _role_done(state: RunState, role: str) -> RunState:
+        # Team role nodes return only what they changed so that parallel branches never write the
+        # same (non-reducer) key within one step.
+        if state.get("team_schedule") == "parallel":
+            return {"roles_done": [role]}
+        return {"role_index": int(state.get("role_index") or 0) + 1, "roles_done": [role]}
+
+    def _team_role_node(role: str, system: str, *, emits_files: bool = False) -> RunnableLambda:
+        def _fn(state: RunState) -> LLMSteps:
             input_text = (state.get("input") or "").strip()
             outputs = dict(state.get("outputs") or {})
+            update: RunState = {}
             user_content = input_text
             # Team-mode "engineer" must not see raw cross-role context. Provide only
             # a structured view that is safe to consume.
@@ -831,19 +1074,21 @@ def build_workflow():
                     "task_view": state.get("task_view") or {},
                     "dependency_contracts": (state.get("architecture") or {}).get("contracts") or [],
                 }
-                user_content = json.dumps(safe_view, ensure_ascii=False, indent=2)[:40_000]
+                view = json.dumps(safe_view, ensure_ascii=False, indent=2)
+                user_content = truncate_to_tokens(view, role_token_budget(role))
+                context_stats = {
+                    "context_tokens": estimate_tokens(user_content),
+                    "context_tokens_unbudgeted": estimate_tokens(view),
+                }
             else:
-                context_lines = []
-                for k, v in outputs.items():
-                    if not isinstance(v, str) or not v.strip():
-                        continue
-                    context_lines.append(f"{k}: {v.strip()}")
-                context = "\n\n".join(context_lines).strip()
-                if context:
-                    user_content = f"{input_text}\n\nContext so far:\n{context}"
+                # Earlier roles' outputs, bounded by this role's budget (older ones summarized).
+                context = build_role_context(outputs, role=role)
+                context_stats = context.stats()
+                if context.text:
+                    user_content = f"{input_text}\n\nContext so far:\n{context.text}"
 
             if emits_files:
-                raw = chat(
+                raw = yield dict(
                     messages=[
                         ChatMessage(
                             role="system",
@@ -867,6 +1112,7 @@ def build_workflow():
                     ),
                     stream=True,
                     event_role=role,
+                    context_stats=context_stats,
                 )
                 obj = _extract_json_obj(raw) or {"summary": raw, "files": []}
                 summary, files = _normalize_files(obj)
@@ -881,24 +1127,21 @@ def build_workflow():
                 ):
                     files = _merge_files(_stock_premium_web_files(), files)
                 if files:
-                    state["files"] = files
+                    update["files"] = files
                 outputs[role] = summary
             else:
-                out = chat(
+                out = yield dict(
                     messages=[
                         ChatMessage(role="system", content=system),
                         ChatMessage(role="user", content=user_content),
                     ],
                     fallback=f"[fallback] {role}: {input_text}",
+                    context_stats=context_stats,
                 )
                 outputs[role] = out
-            return {
-                **state,
-                "outputs": outputs,
-                "role_index": int(state.get("role_index") or 0) + 1,
-            }
+            return {**update, "outputs": {role: outputs[role]}, **_role_done(state, role)}
 
-        return _fn
+        return _llm_node(_fn, role)
 
     team_lead = _team_role_node(
         "team_lead",
@@ -912,11 +1155,11 @@ def build_workflow():
         "product_manager",
         "You are a product manager. Clarify requirements, scope, and MVP. Respond in Chinese.",
     )
-    def architect(state: RunState) -> RunState:
+    def architect(state: RunState) -> LLMSteps:
         """Planner/Architect role: JSON-only, planning facts only (no rules, no code)."""
         input_text = (state.get("input") or "").strip()
         outputs = dict(state.get("outputs") or {})
-        raw = chat(
+        raw = yield dict(
             messages=[
                 ChatMessage(
                     role="system",
@@ -954,7 +1197,7 @@ def build_workflow():
         obj = _extract_json_obj(raw)
         if not isinstance(obj, dict):
             # One retry asking for strict JSON only.
-            raw2 = chat(
+            raw2 = yield dict(
                 messages=[
                     ChatMessage(
                         role="system",
@@ -994,12 +1237,7 @@ def build_workflow():
         pg = goals.get("project_goals") if isinstance(goals, dict) else []
         headline = pg[0] if isinstance(pg, list) and pg else "架构规划完成"
         outputs["architect"] = str(headline)
-        return {
-            **state,
-            "outputs": outputs,
-            "architecture": obj,
-            "role_index": int(state.get("role_index") or 0) + 1,
-        }
+        return {"outputs": {"architect": outputs["architect"]}, "architecture": obj, **_role_done(state, "architect")}
     team_engineer = _team_role_node(
         "engineer",
         (
@@ -1032,6 +1270,38 @@ def build_workflow():
             return "task_view"
         return nxt
 
+    def route_after(node: str) -> Callable[[RunState], str]:
+        def route(state: RunState) -> str:
+            if state.get("team_schedule") != "parallel":
+                return route_team_next(state)
+            # Back to the router only to fan out this node's dependents; a branch nothing depends on
+            # joins at finalize, which the step barrier starts once every sibling branch is done.
+            if any(node in TEAM_NODE_DEPENDENCIES.get(n, ()) for n in _team_nodes(state)):
+                return "team_router"
+            return "team_finalize"
+
+        return route
+
+    def route_from_team_router(state: RunState) -> str | list[str]:
+        if state.get("team_schedule") != "parallel":
+            return route_team_next(state)
+        nodes = _team_nodes(state)
+        done = set(state.get("roles_done") or [])
+
+        def ready(n: str) -> bool:
+            return n not in done and all(d in done or d not in nodes for d in TEAM_NODE_DEPENDENCIES.get(n, ()))
+
+        branches = [n for n in nodes if n not in TEAM_BUILD_CHAIN and ready(n)]
+        chain = [n for n in TEAM_BUILD_CHAIN if n in nodes and n not in done]
+        if chain and ready(chain[0]):
+            branches.append(TEAM_BUILD_NODE)
+        return branches or "team_finalize"
+
+    def route_build_next(state: RunState) -> str:
+        nodes = _team_nodes(state)
+        done = set(state.get("roles_done") or [])
+        return next((n for n in TEAM_BUILD_CHAIN if n in nodes and n not in done), END)
+
     def team_router(state: RunState) -> RunState:
         return state
 
@@ -1060,9 +1330,9 @@ def build_workflow():
             "rules_hint": rules_obj,
         }
         outputs["task_view"] = "Task view prepared."
-        return {**state, "outputs": outputs, "task_view": view}
+        return {"outputs": {"task_view": outputs["task_view"]}, "task_view": view, "roles_done": ["task_view"]}
 
-    def team_finalize(state: RunState) -> RunState:
+    def team_finalize(state: RunState) -> LLMSteps:
         input_text = (state.get("input") or "").strip()
         outputs = dict(state.get("outputs") or {})
         files = list(state.get("files") or [])
@@ -1072,7 +1342,9 @@ def build_workflow():
             if any((p or "").lower().endswith("index.html") for p in paths):
                 summary += "\n\n运行方式：直接用浏览器打开 `index.html`。"
         else:
-            summary = chat(
+            # Bounded like any role's context; files only by path and size, never their bodies.
+            context = build_role_context(outputs, role="team_finalize")
+            summary = yield dict(
                 messages=[
                     ChatMessage(
                         role="system",
@@ -1083,10 +1355,15 @@ def build_workflow():
                     ),
                     ChatMessage(
                         role="user",
-                        content=f"User request:\n{input_text}\n\nTeam outputs:\n{outputs}\n\nFiles:\n{files}",
+                        content=(
+                            f"User request:\n{input_text}\n\n"
+                            f"Team outputs:\n{context.text}\n\n"
+                            f"Files:\n{files_overview(files)}"
+                        ),
                     ),
                 ],
                 fallback=outputs.get("team_lead") or "[fallback] team_lead: Run completed",
+                context_stats=context.stats(),
             )
         final = {
             "summary": summary,
@@ -1097,21 +1374,58 @@ def build_workflow():
         }
         return {**state, "final": final}
 
-    graph.add_node("init", init)
-    graph.add_node("rule_node", rule_node)
-    graph.add_node("engineer_solo", engineer_solo)
-    graph.add_node("team_router", team_router)
+    architect_node = _llm_node(architect, "architect")
+    task_view_node = _traced(task_view, "task_view")
+
+    # The architect -> task_view -> engineer chain of the "parallel" schedule, as one branch.
+    build: StateGraph = StateGraph(RunState)
+    build.add_node("architect", architect_node)
+    build.add_node("task_view", task_view_node)
+    build.add_node("engineer", team_engineer)
+    build_routes = {**{n: n for n in TEAM_BUILD_CHAIN}, END: END}
+    build.add_conditional_edges(START, route_build_next, build_routes)
+    for node in TEAM_BUILD_CHAIN:
+        build.add_conditional_edges(node, route_build_next, build_routes)
+
+    graph.add_node("init", _traced(init, "init"))
+    graph.add_node("rule_node", _traced(rule_node, "rule_node"))
+    graph.add_node("engineer_solo", _llm_node(engineer_solo, "engineer_solo"))
+    graph.add_node("team_router", _traced(team_router, "team_router"))
     graph.add_node("team_lead", team_lead)
     graph.add_node("seo_expert", seo_expert)
     graph.add_node("product_manager", product_manager)
-    graph.add_node("architect", architect)
-    graph.add_node("task_view", task_view)
+    graph.add_node("architect", architect_node)
+    graph.add_node("task_view", task_view_node)
     graph.add_node("engineer", team_engineer)
     graph.add_node("data_analyst", data_analyst)
     graph.add_node("deep_researcher", deep_researcher)
-    graph.add_node("team_finalize", team_finalize)
+    graph.add_node(TEAM_BUILD_NODE, build.compile())
+    graph.add_node("team_finalize", _llm_node(team_finalize, "team_finalize"))
+
+    team_routes = {
+        "team_router": "team_router",
+        "team_lead": "team_lead",
+        "seo_expert": "seo_expert",
+        "product_manager": "product_manager",
+        "architect": "architect",
+        "task_view": "task_view",
+        "engineer": "engineer",
+        "data_analyst": "data_analyst",
+        "deep_researcher": "deep_researcher",
+        "team_finalize": "team_finalize",
+    }
 
-    graph.set_entry_point("init")
+    def route_entry(state: RunState) -> str:
+        return state.get("resume_at") or "init"
+
+    entry_routes = {
+        "init": "init",
+        "rule_node": "rule_node",
+        "engineer_solo": "engineer_solo",
+        **team_routes,
+        TEAM_BUILD_NODE: TEAM_BUILD_NODE,
+    }
+    graph.add_conditional_edges(START, route_entry, entry_routes)
     graph.add_edge("init", "rule_node")
     graph.add_conditional_edges(
         "rule_node", route_from_init, {"team_router": "team_router", "engineer_solo": "engineer_solo"}
@@ -1120,19 +1434,7 @@ def build_workflow():
     graph.add_edge("engineer_solo", END)
 
     graph.add_conditional_edges(
-        "team_router",
-        route_team_next,
-        {
-            "team_lead": "team_lead",
-            "seo_expert": "seo_expert",
-            "product_manager": "product_manager",
-            "architect": "architect",
-            "task_view": "task_view",
-            "engineer": "engineer",
-            "data_analyst": "data_analyst",
-            "deep_researcher": "deep_researcher",
-            "team_finalize": "team_finalize",
-        },
+        "team_router", route_from_team_router, {**team_routes, TEAM_BUILD_NODE: TEAM_BUILD_NODE}
     )
 
     for node in [
@@ -1145,22 +1447,9 @@ def build_workflow():
         "data_analyst",
         "deep_researcher",
     ]:
-        graph.add_conditional_edges(
-            node,
-            route_team_next,
-            {
-                "team_lead": "team_lead",
-                "seo_expert": "seo_expert",
-                "product_manager": "product_manager",
-                "architect": "architect",
-                "task_view": "task_view",
-                "engineer": "engineer",
-                "data_analyst": "data_analyst",
-                "deep_researcher": "deep_researcher",
-                "team_finalize": "team_finalize",
-            },
-        )
+        graph.add_conditional_edges(node, route_after(node), team_routes)
 
+    graph.add_edge(TEAM_BUILD_NODE, "team_finalize")
     graph.add_edge("team_finalize", END)
 
     return graph.compile()
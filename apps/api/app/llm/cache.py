@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models.llm_cache_entry import LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Expired / over-limit rows are pruned once every this many writes rather than on each one.
+_PRUNE_EVERY = 64
+
+
+def cache_key(payload: dict[str, Any]) -> str:
+    """Key of a chat request: model, temperature and messages with normalized whitespace."""
+
+    messages = [
+        [m.get("role") or "", "\n".join(line.rstrip() for line in (m.get("content") or "").strip().splitlines())]
+        for m in payload.get("messages") or []
+    ]
+    raw = json.dumps(
+        [payload.get("model") or "", round(float(payload.get("temperature") or 0.0), 4), messages],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.now(tz=UTC)
+
+
+class LLMResponseCache:
+    """Two-tier cache of LLM completions: a per-process LRU in front of an optional DB table.
+
+    Entries expire after `ttl_seconds`. The memory tier holds at most `max_entries`; the DB tier
+    is trimmed to `max_rows`, least recently used first. Each tier also holds at most `max_bytes`
+    of responses, so a few very long replies can't grow it without bound. Only successful provider
+    responses are stored, never fallbacks.
+    """
+
+    def __init__(
+        self, *, ttl_seconds: float, max_entries: int, persistent: bool, max_rows: int, max_bytes: int
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.persistent = persistent
+        self.max_rows = max(1, max_rows)
+        self.max_bytes = max(1, max_bytes)
+        self._lock = threading.Lock()
+        # key -> (deadline, text, size in bytes); `_bytes` is the sum of the sizes.
+        self._entries: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                deadline, text, _size = entry
+                if deadline > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return text
+                self._forget(key)
+        if not self.persistent:
+            return None
+
+        try:
+            text, expires_at = self._db_get(key)
+        except Exception:
+            logger.exception("LLM cache lookup failed")
+            return None
+        if text is not None and expires_at is not None:
+            self._remember(key, text, (expires_at - _now()).total_seconds())
+        return text
+
+    def set(self, key: str, *, model: str, text: str) -> None:
+        self._remember(key, text, self.ttl_seconds)
+        if not self.persistent or len(text.encode("utf-8")) > self.max_bytes:
+            return
+        try:
+            self._db_set(key, model=model, text=text)
+        except Exception:
+            logger.exception("LLM cache write failed")
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remember(self, key: str, text: str, ttl: float) -> None:
+        size = len(text.encode("utf-8"))
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = (time.monotonic() + ttl, text, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._forget(next(iter(self._entries)))
+
+    def _forget(self, key: str) -> None:
+        # Lock held.
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _db_get(self, key: str) -> tuple[str | None, datetime | None]:
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            row = db.execute(
+                select(LLMCacheEntry.response_text, LLMCacheEntry.expires_at).where(
+                    LLMCacheEntry.key == key, LLMCacheEntry.expires_at > _now()
+                )
+            ).first()
+            if row is None:
+                return None, None
+            db.execute(
+                update(LLMCacheEntry)
+                .where(LLMCacheEntry.key == key)
+                .values(hits=LLMCacheEntry.hits + 1, last_used_at=_now())
+            )
+            db.commit()
+        expires_at = row[1] if row[1].tzinfo else row[1].replace(tzinfo=UTC)
+        return row[0], expires_at
+
+    def _db_set(self, key: str, *, model: str, text: str) -> None:
+        from app.db.session import SessionLocal
+
+        now = _now()
+        values = {
+            "key": key,
+            "model": model,
+            "response_text": text,
+            "size_bytes": len(text.encode("utf-8")),
+            "hits": 0,
+            "created_at": now,
+            "last_used_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds),
+        }
+        with SessionLocal() as db:
+            insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+            stmt = insert(LLMCacheEntry).values(**values)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[LLMCacheEntry.key],
+                    set_={k: stmt.excluded[k] for k in ("response_text", "size_bytes", "last_used_at", "expires_at")},
+                )
+            )
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % _PRUNE_EVERY == 0
+            if prune:
+                self._prune(db)
+            db.commit()
+
+    def _prune(self, db: Session) -> None:
+        db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= _now()))
+        excess = db.execute(select(func.count()).select_from(LLMCacheEntry)).scalar_one() - self.max_rows
+        if excess > 0:
+            oldest = select(LLMCacheEntry.key).order_by(LLMCacheEntry.last_used_at.asc()).limit(excess)
+            db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(oldest)))
+        total = db.execute(select(func.coalesce(func.sum(LLMCacheEntry.size_bytes), 0))).scalar_one()
+        if total > self.max_bytes:
+            # Keep the most recently used rows that fit in `max_bytes`; delete the rest.
+            newest_first = (LLMCacheEntry.last_used_at.desc(), LLMCacheEntry.key.asc())
+            kept_bytes = func.sum(LLMCacheEntry.size_bytes).over(order_by=newest_first, rows=(None, 0))
+            db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.size_bytes > self.max_bytes))
+            running = select(LLMCacheEntry.key, kept_bytes.label("kept_bytes")).subquery()
+            over = select(running.c.key).where(running.c.kept_bytes > self.max_bytes)
+            db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(over)))
+
+
+_llm_cache: LLMResponseCache | None = None
+_llm_cache_config: tuple | None = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache | None:
+    """The configured response cache, or None when `LLM_CACHE` is off (the default).
+
+    Rebuilt (empty memory tier) if the cache settings change, e.g. after `reload_settings()`.
+    """
+
+    settings = get_settings()
+    if settings.llm_cache not in {"memory", "db"}:
+        return None
+    config = (
+        settings.llm_cache,
+        settings.llm_cache_ttl_seconds,
+        settings.llm_cache_max_entries,
+        settings.llm_cache_max_rows,
+        settings.llm_cache_max_bytes,
+    )
+    global _llm_cache, _llm_cache_config
+    with _llm_cache_lock:
+        if _llm_cache is None or _llm_cache_config != config:
+            _llm_cache = LLMResponseCache(
+                ttl_seconds=settings.llm_cache_ttl_seconds,
+                max_entries=settings.llm_cache_max_entries,
+                persistent=settings.llm_cache == "db",
+                max_rows=settings.llm_cache_max_rows,
+                max_bytes=settings.llm_cache_max_bytes,
+            )
+            _llm_cache_config = config
+        return _llm_cache
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
+import threading
 import time
+import weakref
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
 from contextvars import ContextVar
 from dataclasses import dataclass
 from typing import Any, Callable
@@ -9,6 +15,15 @@ from typing import Any, Callable
 import httpx
 
 from app.core.config import get_settings
+from app.llm.cache import LLMResponseCache, cache_key, get_llm_cache
+from app.llm.limiter import CURRENT_LLM_USER, Admission, LimiterTimeout, LLMLimiter, get_llm_limiter
+from app.llm.providers import LATENCY, Endpoint, get_provider_registry
+from app.llm.resilience import CircuitBreaker, RetryPolicy, classify, get_circuit_breaker
+from app.llm.tokens import estimate_tokens
+from app.services.run_control import CURRENT_RUN_CONTROL, RunCanceled, RunControl
+from app.services.tracing import LLMCall, llm_call
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -24,6 +39,80 @@ LLM_STREAM_EMITTER: ContextVar[StreamEmitter | None] = ContextVar(
     "LLM_STREAM_EMITTER", default=None
 )
 
+# Called like `RunEventWriter.emit(type=..., message=..., data=...)`; the executor installs its
+# run's writer so retries and circuit breaker state show up as run events.
+LLMEventEmitter = Callable[..., None]
+LLM_EVENT_EMITTER: ContextVar[LLMEventEmitter | None] = ContextVar("LLM_EVENT_EMITTER", default=None)
+
+
+_http_client: httpx.Client | None = None
+_http_client_lock = threading.Lock()
+# httpx.AsyncClient is bound to the event loop it first ran on, so keep one per loop.
+_async_http_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def _client_options() -> dict[str, Any]:
+    settings = get_settings()
+    return {
+        "timeout": httpx.Timeout(settings.llm_timeout_seconds, connect=settings.llm_connect_timeout_seconds),
+        "http2": settings.llm_http2 and _http2_available(),
+        "limits": httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+        ),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Process-wide LLM HTTP client so calls reuse pooled keep-alive (and HTTP/2) connections.
+
+    Created lazily from settings; `close_http_client()` shuts it down on app/worker exit.
+    """
+
+    global _http_client
+    if _http_client is not None:
+        return _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(**_client_options())
+        return _http_client
+
+
+def close_http_client() -> None:
+    global _http_client
+    with _http_client_lock:
+        client, _http_client = _http_client, None
+    if client is not None:
+        client.close()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Async counterpart of `get_http_client()` for the running event loop."""
+
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(**_client_options())
+        _async_http_clients[loop] = client
+    return client
+
+
+async def aclose_http_client() -> None:
+    client = _async_http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
 
 def _deterministic_fallback(messages: list[ChatMessage]) -> str:
     # Keep it predictable in dev/test when no API is configured.
@@ -35,104 +124,551 @@ def _deterministic_fallback(messages: list[ChatMessage]) -> str:
     return (user_text or "Run completed").strip()
 
 
-def chat(
-    *,
-    messages: list[ChatMessage],
-    temperature: float = 0.2,
-    fallback: str | None = None,
-    stream: bool = False,
-    event_role: str | None = None,
-) -> str:
-    settings = get_settings()
-    api_key = (settings.deepseek_api_key or "").strip()
-    api_base = (settings.deepseek_api_base or "").strip().rstrip("/")
-    model = (settings.deepseek_model or "").strip()
+@dataclass(frozen=True)
+class _Request:
+    endpoint: Endpoint
+    url: str
+    headers: dict[str, str]
+    payload: dict[str, Any]
+
 
-    if not api_key or not api_base or not model:
-        return (fallback or _deterministic_fallback(messages)).strip()
+def _build_request(endpoint: Endpoint, messages: list[ChatMessage], temperature: float, stream: bool) -> _Request:
+    """OpenAI-compatible request to `endpoint`."""
 
-    url = f"{api_base}/chat/completions"
     payload: dict[str, Any] = {
-        "model": model,
+        "model": endpoint.model,
         "messages": [{"role": m.role, "content": m.content} for m in messages],
         "temperature": temperature,
     }
     if stream:
         payload["stream"] = True
+    return _Request(
+        endpoint=endpoint,
+        url=f"{endpoint.api_base}/chat/completions",
+        headers={"authorization": f"Bearer {endpoint.api_key}"},
+        payload=payload,
+    )
 
-    emitter = LLM_STREAM_EMITTER.get()
-    role_tag = (event_role or "").strip() or "assistant"
 
-    def _emit(delta: str) -> None:
-        if not delta or not emitter:
-            return
+# Cached responses are replayed to the stream emitter in pieces of this size.
+_REPLAY_CHUNK_CHARS = 32
+# Limiter waits at least this long are reported as `llm.queued` run events.
+_QUEUE_EVENT_MIN_S = 0.05
+
+
+class _DeltaCoalescer:
+    """Batches stream deltas into fewer emissions without ever dropping text.
+
+    Deltas are buffered until `min_chars` are pending or `max_delay_s` passed since the last
+    emission; `finish()` flushes the rest. The emitted pieces concatenate to exactly the stripped
+    full text: leading whitespace is skipped and trailing whitespace is held back until more text
+    follows it.
+    """
+
+    def __init__(self, emit: Callable[[str], None], *, min_chars: int = 32, max_delay_s: float = 0.08) -> None:
+        self._emit = emit
+        self._min_chars = min_chars
+        self._max_delay_s = max_delay_s
+        self._pending: list[str] = []
+        self._pending_len = 0
+        self._started = False
+        self._last_emit = time.monotonic()
+
+    def add(self, delta: str) -> None:
+        self._pending.append(delta)
+        self._pending_len += len(delta)
+        if self._pending_len >= self._min_chars or time.monotonic() - self._last_emit >= self._max_delay_s:
+            self._flush(final=False)
+
+    def finish(self) -> None:
+        self._flush(final=True)
+
+    def _flush(self, *, final: bool) -> None:
+        buf = "".join(self._pending)
+        if not self._started:
+            buf = buf.lstrip()
+        out = buf.rstrip()
+        rest = "" if final else buf[len(out) :]
+        self._pending = [rest] if rest else []
+        self._pending_len = len(rest)
+        if out:
+            self._started = True
+            self._last_emit = time.monotonic()
+            self._emit(out)
+
+
+class _StreamParser:
+    """Accumulates an OpenAI-compatible SSE stream and forwards deltas to the run's emitter.
+
+    Deltas are coalesced (so we don't spam the DB) but never lost: call `finish()` once the stream
+    ends and the emitted deltas add up to exactly `text()`.
+    """
+
+    def __init__(self, emitter: StreamEmitter, event_role: str | None) -> None:
+        self._emitter = emitter
+        self._role_tag = (event_role or "").strip() or "assistant"
+        self._acc: list[str] = []
+        self._deltas = _DeltaCoalescer(self._emit)
+        self.first_text_at: float | None = None
+        # Token usage, if the provider reports it in a chunk.
+        self.usage: dict[str, Any] | None = None
+
+    def feed(self, line: str | bytes) -> bool:
+        """Consume one line ("data: {json}" ... "data: [DONE]"). Returns False once the stream is done."""
+
+        if not line:
+            return True
+        s = (line.decode("utf-8", errors="ignore") if isinstance(line, bytes) else line).strip()
+        if not s.startswith("data:"):
+            return True
+        data_s = s[len("data:") :].strip()
+        if data_s == "[DONE]":
+            return False
+        try:
+            chunk = json.loads(data_s)
+        except Exception:
+            return True
+        try:
+            choices = chunk.get("choices") or []
+            delta = (choices[0].get("delta") or {}) if choices else {}
+            text = (delta.get("content") or "") if isinstance(delta, dict) else ""
+            if isinstance(chunk.get("usage"), dict):
+                self.usage = chunk["usage"]
+        except Exception:
+            text = ""
+        if not text:
+            return True
+        if self.first_text_at is None:
+            self.first_text_at = time.perf_counter()
+        self._acc.append(text)
+        self._deltas.add(text)
+        return True
+
+    def finish(self) -> None:
+        """Emit whatever is still buffered."""
+
+        self._deltas.finish()
+
+    def replay(self, text: str) -> None:
+        """Stream an already known (cached) response as if it arrived from the provider."""
+
+        for i in range(0, len(text), _REPLAY_CHUNK_CHARS):
+            piece = text[i : i + _REPLAY_CHUNK_CHARS]
+            self._acc.append(piece)
+            self._deltas.add(piece)
+        self.finish()
+
+    def text(self) -> str:
+        return "".join(self._acc).strip()
+
+    def _emit(self, delta: str) -> None:
         try:
-            emitter(role_tag, delta)
+            self._emitter(self._role_tag, delta)
         except Exception:
             # Never allow streaming telemetry to break the main response path.
             return
 
-    try:
-        with httpx.Client(timeout=60) as client:
-            if stream and emitter:
-                # OpenAI-compatible SSE streaming: "data: {json}\n\n" ... "data: [DONE]".
-                acc: list[str] = []
-                last_emit = time.monotonic()
-                with client.stream(
-                    "POST",
-                    url,
-                    headers={"authorization": f"Bearer {api_key}"},
-                    json=payload,
-                ) as resp:
-                    resp.raise_for_status()
-                    for line in resp.iter_lines():
-                        if not line:
-                            continue
-                        s = line.decode("utf-8", errors="ignore").strip()
-                        if not s.startswith("data:"):
-                            continue
-                        data_s = s[len("data:") :].strip()
-                        if data_s == "[DONE]":
-                            break
-                        try:
-                            chunk = json.loads(data_s)
-                        except Exception:
-                            continue
-                        try:
-                            choices = chunk.get("choices") or []
-                            delta = (choices[0].get("delta") or {}) if choices else {}
-                            text = (delta.get("content") or "") if isinstance(delta, dict) else ""
-                        except Exception:
-                            text = ""
-                        if not text:
-                            continue
-                        acc.append(text)
-                        # Throttle emission a bit so we don't spam the DB.
-                        now = time.monotonic()
-                        if now - last_emit >= 0.08 or len(text) >= 32:
-                            _emit(text)
-                            last_emit = now
-                return "".join(acc).strip() or (fallback or _deterministic_fallback(messages)).strip()
-
-            resp = client.post(
-                url,
-                headers={"authorization": f"Bearer {api_key}"},
-                json=payload,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-    except Exception:
-        return (fallback or _deterministic_fallback(messages)).strip()
 
+def _completion_content(data: Any) -> str:
     # OpenAI-compatible shape
     try:
         choices = data.get("choices") or []
         msg = choices[0].get("message") or {}
-        content = (msg.get("content") or "").strip()
-        if content:
-            return content
+        return (msg.get("content") or "").strip()
     except Exception:
-        pass
+        return ""
+
 
+def _completion_text(data: Any) -> str:
     # Debug-friendly fallback for unexpected schemas.
-    return json.dumps(data)[:2000]
+    return _completion_content(data) or json.dumps(data)[:2000]
+
+
+def _record_usage(call: LLMCall, usage: Any, text: str) -> None:
+    # Provider-reported usage when available, otherwise estimates.
+    usage = usage if isinstance(usage, dict) else {}
+    if isinstance(usage.get("prompt_tokens"), int):
+        call.tokens_in = usage["prompt_tokens"]
+    out = usage.get("completion_tokens")
+    call.tokens_out = out if isinstance(out, int) else estimate_tokens(text)
+
+
+def _cache_keys(endpoints: list[Endpoint], messages: list[ChatMessage], temperature: float) -> list[str]:
+    """Cache keys of every candidate, in failover order.
+
+    A response is stored under the model that gave it, so a call answered after a failover is found
+    again under a later candidate's key.
+    """
+
+    return list(dict.fromkeys(cache_key(_build_request(e, messages, temperature, False).payload) for e in endpoints))
+
+
+def _cache_lookup(cache: LLMResponseCache, keys: list[str]) -> str | None:
+    for key in keys:
+        if (text := cache.get(key)) is not None:
+            return text
+    return None
+
+
+def _cache_hit(text: str | None, emitter: StreamEmitter | None, event_role: str | None) -> str | None:
+    """Pass a cache hit through, replaying it to the stream emitter (if given) so the UI sees deltas."""
+
+    if text is None:
+        return None
+    if emitter is not None:
+        _StreamParser(emitter, event_role).replay(text)
+    return text
+
+
+def _emit_llm_event(type: str, message: str, data: dict[str, Any]) -> None:
+    emitter = LLM_EVENT_EMITTER.get()
+    if emitter is None:
+        return
+    try:
+        emitter(type=type, message=message, data=data)
+    except Exception:
+        logger.exception("Emitting %s failed", type)
+
+
+def _report_circuit(call: LLMCall, breaker: CircuitBreaker, changed: str | None) -> None:
+    if changed is None:
+        return
+    if changed == "open":
+        logger.warning("LLM circuit opened", extra={"provider": breaker.provider})
+    _emit_llm_event("llm.circuit", changed, {**breaker.snapshot(), "node": call.node, "role": call.role})
+
+
+def _short_circuit(call: LLMCall, breaker: CircuitBreaker, fb: str) -> str:
+    """The fallback, without a request, while every candidate's circuit is open."""
+
+    call.outcome = "circuit_open"
+    snapshot = breaker.snapshot()
+    _emit_llm_event("llm.circuit", snapshot["state"], {**snapshot, "node": call.node, "role": call.role})
+    return fb
+
+
+def _queued(call: LLMCall, admission: Admission, limiter: LLMLimiter) -> None:
+    call.queued_s += admission.waited
+    if admission.waited >= _QUEUE_EVENT_MIN_S:
+        data = {"node": call.node, "role": call.role, "provider": call.provider}
+        data.update(wait_ms=round(admission.waited * 1000), in_flight=limiter.in_flight, queued=limiter.queued)
+        _emit_llm_event("llm.queued", call.node, data)
+
+
+@contextmanager
+def _admitted(call: LLMCall, ctl: RunControl | None) -> Iterator[None]:
+    """Hold a limiter slot for one request, reporting any time spent queued for it."""
+
+    limiter = get_llm_limiter()
+    admission = limiter.admit(CURRENT_LLM_USER.get() or "", call.tokens_in, ctl=ctl)
+    _queued(call, admission, limiter)
+    try:
+        yield
+    finally:
+        limiter.release(admission, call.tokens_in + call.tokens_out)
+
+
+@asynccontextmanager
+async def _aadmitted(call: LLMCall, ctl: RunControl | None) -> AsyncIterator[None]:
+    limiter = get_llm_limiter()
+    admission = await limiter.aadmit(CURRENT_LLM_USER.get() or "", call.tokens_in, ctl=ctl)
+    _queued(call, admission, limiter)
+    try:
+        yield
+    finally:
+        limiter.release(admission, call.tokens_in + call.tokens_out)
+
+
+def _throttled(call: LLMCall, fb: str) -> str:
+    """The fallback for a request that waited the whole `llm_queue_timeout_seconds` for the limiter."""
+
+    call.outcome = "throttled"
+    data = {"node": call.node, "role": call.role, "timeout_s": get_settings().llm_queue_timeout_seconds}
+    _emit_llm_event("llm.throttled", call.node, data)
+    return fb
+
+
+class _Attempts:
+    """Which endpoint a call tries next, and how long it backs off first.
+
+    Endpoints are tried in the registry's order. A failure moves on to the next endpoint right away;
+    only the last one is retried with backoff, so a degraded primary costs one failed request rather
+    than a full retry cycle.
+    """
+
+    def __init__(self, call: LLMCall, endpoints: list[Endpoint], build: Callable[[Endpoint], _Request]) -> None:
+        self.call = call
+        self._endpoints = endpoints
+        self._build = build
+        self._i = 0
+        self._retry = 0
+        self._policy = RetryPolicy.from_settings()
+        # Seconds to wait before the next request, if it is a retry.
+        self.delay: float | None = None
+        # When the current request was sent (after any limiter queueing).
+        self.started = 0.0
+        self._use(endpoints[0])
+
+    def _use(self, endpoint: Endpoint) -> None:
+        self.req = self._build(endpoint)
+        self.breaker = get_circuit_breaker(endpoint.api_base)
+        self.call.provider, self.call.model = endpoint.provider, endpoint.model
+
+    def allow(self) -> bool:
+        """Whether a request may go out now, failing over past open circuits; False if none is left."""
+
+        while not self.breaker.allow():
+            if not self._failover("circuit_open"):
+                return False
+        return True
+
+    def succeeded(self, first_text_at: float | None) -> None:
+        _report_circuit(self.call, self.breaker, self.breaker.record_success())
+        LATENCY.record(self.req.endpoint, (first_text_at or time.perf_counter()) - self.started)
+
+    def failed(self, exc: Exception, parser: _StreamParser | None) -> bool:
+        """After a failed request: True to try again (after `delay`), False to fall back."""
+
+        failure = classify(exc)
+        if failure.retryable:
+            # Only provider-side trouble counts against the circuit, not e.g. a rejected request.
+            _report_circuit(self.call, self.breaker, self.breaker.record_failure())
+        if parser is not None and parser.first_text_at is not None:
+            # Deltas already reached the run's stream and can't be taken back.
+            return False
+        if self._failover(failure.reason):
+            return True
+        self.delay = self._policy.delay(self._retry, failure)
+        if self.delay is None:
+            return False
+        self._retry += 1
+        call = self.call
+        call.attempts += 1
+        data = {"node": call.node, "role": call.role, "provider": call.provider, "attempt": call.attempts}
+        data.update(reason=failure.reason, delay_s=round(self.delay, 3))
+        _emit_llm_event("llm.retry", failure.reason, data)
+        return True
+
+    def _failover(self, reason: str) -> bool:
+        if self._i + 1 >= len(self._endpoints):
+            return False
+        previous = self._endpoints[self._i]
+        self._i += 1
+        self._retry, self.delay = 0, None
+        self._use(self._endpoints[self._i])
+        call = self.call
+        _emit_llm_event(
+            "llm.failover",
+            f"{previous.provider} -> {call.provider}",
+            {
+                "node": call.node,
+                "role": call.role,
+                "from": {"provider": previous.provider, "api_base": previous.api_base},
+                "to": {"provider": call.provider, "api_base": self.req.endpoint.api_base},
+                "reason": reason,
+            },
+        )
+        return True
+
+
+def chat(
+    *,
+    messages: list[ChatMessage],
+    temperature: float = 0.2,
+    fallback: str | None = None,
+    stream: bool = False,
+    event_role: str | None = None,
+) -> str:
+    with llm_call(event_role, estimate_tokens("".join(m.content for m in messages))) as call:
+        return _chat(call, messages, temperature, fallback, stream, event_role)
+
+
+def _chat(
+    call: LLMCall,
+    messages: list[ChatMessage],
+    temperature: float,
+    fallback: str | None,
+    stream: bool,
+    event_role: str | None,
+) -> str:
+    emitter = LLM_STREAM_EMITTER.get()
+    streaming = stream and emitter is not None
+    fb = (fallback or _deterministic_fallback(messages)).strip()
+    endpoints = get_provider_registry().candidates(call.node, call.role)
+    if not endpoints:
+        call.outcome = "unconfigured"
+        return fb
+    attempts = _Attempts(call, endpoints, lambda e: _build_request(e, messages, temperature, streaming))
+
+    cache = get_llm_cache()
+    keys = _cache_keys(endpoints, messages, temperature) if cache else []
+    if cache and (hit := _cache_hit(_cache_lookup(cache, keys), emitter if streaming else None, event_role)):
+        call.outcome = "cached"
+        return hit
+
+    ctl = CURRENT_RUN_CONTROL.get()
+    client = get_http_client()
+    while True:
+        parser: _StreamParser | None = None
+        try:
+            if attempts.delay is not None and ctl is not None:
+                ctl.sleep(attempts.delay)
+            elif attempts.delay is not None:
+                time.sleep(attempts.delay)
+            if not attempts.allow():
+                return _short_circuit(call, attempts.breaker, fb)
+            # A canceled run aborts the call: before sending, and between streamed chunks.
+            if ctl is not None:
+                ctl.check()
+            req = attempts.req
+            with _admitted(call, ctl):
+                attempts.started = time.perf_counter()
+                if streaming:
+                    parser = _StreamParser(emitter, event_role)
+                    with client.stream("POST", req.url, headers=req.headers, json=req.payload) as resp:
+                        resp.raise_for_status()
+                        for line in resp.iter_lines():
+                            if ctl is not None:
+                                ctl.check()
+                            if not parser.feed(line):
+                                break
+                    parser.finish()
+                    text = parser.text()
+                    call.first_token(parser.first_text_at)
+                    _record_usage(call, parser.usage, text)
+                else:
+                    resp = client.post(req.url, headers=req.headers, json=req.payload)
+                    resp.raise_for_status()
+                    data = resp.json()
+                    call.first_token()
+                    text = _completion_content(data)
+                    _record_usage(call, data.get("usage") if isinstance(data, dict) else None, text)
+                    if not text:
+                        attempts.succeeded(call.first_token_at)
+                        return _completion_text(data)
+        except RunCanceled:
+            call.outcome = "canceled"
+            raise
+        except LimiterTimeout:
+            return _throttled(call, fb)
+        except Exception as e:
+            if attempts.failed(e, parser):
+                continue
+            call.outcome = "fallback"
+            return fb
+        break
+    attempts.succeeded(call.first_token_at)
+    if not text:
+        call.outcome = "fallback"
+        return fb
+    if cache:
+        # Keyed by the model that actually answered: one of `keys`, so the lookup above finds it.
+        cache.set(cache_key(req.payload), model=req.payload["model"], text=text)
+    return text
+
+
+async def achat(
+    *,
+    messages: list[ChatMessage],
+    temperature: float = 0.2,
+    fallback: str | None = None,
+    stream: bool = False,
+    event_role: str | None = None,
+) -> str:
+    """Async `chat()`: same request, fallback, caching and streaming semantics, without pinning a thread."""
+
+    with llm_call(event_role, estimate_tokens("".join(m.content for m in messages))) as call:
+        return await _achat(call, messages, temperature, fallback, stream, event_role)
+
+
+async def _achat(
+    call: LLMCall,
+    messages: list[ChatMessage],
+    temperature: float,
+    fallback: str | None,
+    stream: bool,
+    event_role: str | None,
+) -> str:
+    emitter = LLM_STREAM_EMITTER.get()
+    streaming = stream and emitter is not None
+    fb = (fallback or _deterministic_fallback(messages)).strip()
+    endpoints = get_provider_registry().candidates(call.node, call.role)
+    if not endpoints:
+        call.outcome = "unconfigured"
+        return fb
+    attempts = _Attempts(call, endpoints, lambda e: _build_request(e, messages, temperature, streaming))
+
+    cache = get_llm_cache()
+    keys = _cache_keys(endpoints, messages, temperature) if cache else []
+    if cache:
+        # The persistent tier does blocking DB I/O.
+        if cache.persistent:
+            cached = await asyncio.to_thread(_cache_lookup, cache, keys)
+        else:
+            cached = _cache_lookup(cache, keys)
+        if hit := _cache_hit(cached, emitter if streaming else None, event_role):
+            call.outcome = "cached"
+            return hit
+
+    ctl = CURRENT_RUN_CONTROL.get()
+    client = get_async_http_client()
+    while True:
+        parser: _StreamParser | None = None
+        try:
+            if attempts.delay is not None and ctl is not None:
+                await ctl.asleep(attempts.delay)
+            elif attempts.delay is not None:
+                await asyncio.sleep(attempts.delay)
+            if not attempts.allow():
+                return _short_circuit(call, attempts.breaker, fb)
+            if ctl is not None:
+                ctl.check()
+            req = attempts.req
+            async with _aadmitted(call, ctl):
+                attempts.started = time.perf_counter()
+                if streaming:
+                    parser = _StreamParser(emitter, event_role)
+                    async with client.stream("POST", req.url, headers=req.headers, json=req.payload) as resp:
+                        resp.raise_for_status()
+                        async for line in resp.aiter_lines():
+                            if ctl is not None:
+                                ctl.check()
+                            if not parser.feed(line):
+                                break
+                    parser.finish()
+                    text = parser.text()
+                    call.first_token(parser.first_text_at)
+                    _record_usage(call, parser.usage, text)
+                else:
+                    resp = await client.post(req.url, headers=req.headers, json=req.payload)
+                    resp.raise_for_status()
+                    data = resp.json()
+                    call.first_token()
+                    text = _completion_content(data)
+                    _record_usage(call, data.get("usage") if isinstance(data, dict) else None, text)
+                    if not text:
+                        attempts.succeeded(call.first_token_at)
+                        return _completion_text(data)
+        except RunCanceled:
+            call.outcome = "canceled"
+            raise
+        except LimiterTimeout:
+            return _throttled(call, fb)
+        except Exception as e:
+            if attempts.failed(e, parser):
+                continue
+            call.outcome = "fallback"
+            return fb
+        break
+    attempts.succeeded(call.first_token_at)
+    if not text:
+        call.outcome = "fallback"
+        return fb
+    if cache:
+        # As in `_chat`: keyed by the model that answered.
+        key = cache_key(req.payload)
+        if cache.persistent:
+            await asyncio.to_thread(cache.set, key, model=req.payload["model"], text=text)
+        else:
+            cache.set(key, model=req.payload["model"], text=text)
+    return text
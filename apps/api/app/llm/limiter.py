@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, func, or_, select, text, update
+
+from app.core.config import get_settings
+from app.db.models.llm_rate_lease import LLMRateLease
+from app.services.metrics import METRICS
+from app.services.run_control import RunControl
+
+logger = logging.getLogger(__name__)
+
+LLM_QUEUE_SECONDS = METRICS.histogram(
+    "atoms_llm_queue_wait_seconds", "Time LLM requests waited for the concurrency / token-rate limiter."
+)
+LLM_THROTTLED = METRICS.counter("atoms_llm_throttled_total", "LLM requests that gave up waiting for the limiter.")
+
+# Owner of the run making LLM calls (set by the executor); the limiter queues fairly between owners.
+CURRENT_LLM_USER: ContextVar[str | None] = ContextVar("CURRENT_LLM_USER", default=None)
+
+# Waiters re-check cancellation (and the token budget) at least this often.
+_WAIT_SLICE_S = 1.0
+# DB admission is polled with backoff between these bounds.
+_DB_POLL_S = (0.05, 0.5)
+# A lease of a process that died stops counting as in flight after this.
+_LEASE_SECONDS = 600
+# Old leases are pruned once every this many releases.
+_PRUNE_EVERY = 64
+# Serializes DB admissions on Postgres (pg_advisory_xact_lock key).
+_DB_LOCK_KEY = 7_140_201
+
+
+class LimiterTimeout(Exception):
+    """A request waited `llm_queue_timeout_seconds` without being admitted."""
+
+
+@dataclass
+class Admission:
+    tokens: int
+    # Seconds spent queued.
+    waited: float
+    lease_id: str | None = None
+
+
+class _Waiter:
+    def __init__(self, user: str, tokens: int, loop: asyncio.AbstractEventLoop | None = None) -> None:
+        self.user = user
+        self.tokens = tokens
+        self.granted = False
+        self.loop = loop
+        self.event: threading.Event | asyncio.Event = asyncio.Event() if loop is not None else threading.Event()
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            pass  # loop closed
+
+
+def _now() -> datetime:
+    return datetime.now(tz=UTC)
+
+
+class LLMLimiter:
+    """Admission of outbound LLM requests: at most `llm_max_concurrency` in flight and a
+    `llm_tokens_per_minute` token bucket, shared by every run in the process.
+
+    Requests that can't go out yet queue per user and are admitted round-robin across users, so one
+    user's burst of runs doesn't starve everyone else. With `llm_limiter_backend=db` an admitted
+    request also needs a lease in `llm_rate_leases`, which applies the same limits across processes
+    (fairness stays per process). Limits are read from settings at use time; 0 disables one.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        # Tokens left in the bucket (None until a budget is configured); may go negative when
+        # responses turn out longer than reserved.
+        self._level: float | None = None
+        self._refilled_at = time.monotonic()
+        self._releases = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+    def admit(self, user: str, tokens: int, *, ctl: RunControl | None = None) -> Admission:
+        """Block until the request may be sent; raises `LimiterTimeout` or (via `ctl`) `RunCanceled`."""
+
+        t0 = time.monotonic()
+        deadline = t0 + max(0.0, get_settings().llm_queue_timeout_seconds)
+        waiter = _Waiter(user, tokens)
+        eta = self._enqueue(waiter)
+        try:
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LimiterTimeout()
+                waiter.event.wait(min(remaining, _WAIT_SLICE_S, eta if eta is not None else _WAIT_SLICE_S))
+                if ctl is not None:
+                    ctl.check()
+                with self._lock:
+                    eta = self._dispatch()
+            admission = Admission(tokens=tokens, waited=0.0)
+            if self._db_backend():
+                delay = _DB_POLL_S[0]
+                while (lease_id := self._db_acquire(user, tokens)) is False:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LimiterTimeout()
+                    if ctl is not None:
+                        ctl.sleep(min(delay, remaining))
+                    else:
+                        time.sleep(min(delay, remaining))
+                    delay = min(delay * 2, _DB_POLL_S[1])
+                admission.lease_id = lease_id if isinstance(lease_id, str) else None
+        except BaseException as e:
+            self._abandon(waiter)
+            self._timed_out(e)
+            raise
+        return self._admitted(admission, t0)
+
+    async def aadmit(self, user: str, tokens: int, *, ctl: RunControl | None = None) -> Admission:
+        """Async `admit` that doesn't hold a thread."""
+
+        t0 = time.monotonic()
+        deadline = t0 + max(0.0, get_settings().llm_queue_timeout_seconds)
+        waiter = _Waiter(user, tokens, asyncio.get_running_loop())
+        eta = self._enqueue(waiter)
+        try:
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LimiterTimeout()
+                timeout = min(remaining, _WAIT_SLICE_S, eta if eta is not None else _WAIT_SLICE_S)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout=timeout)  # type: ignore[union-attr]
+                except TimeoutError:
+                    pass
+                if ctl is not None:
+                    ctl.check()
+                with self._lock:
+                    eta = self._dispatch()
+            admission = Admission(tokens=tokens, waited=0.0)
+            if self._db_backend():
+                delay = _DB_POLL_S[0]
+                while (lease_id := await asyncio.to_thread(self._db_acquire, user, tokens)) is False:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LimiterTimeout()
+                    if ctl is not None:
+                        await ctl.asleep(min(delay, remaining))
+                    else:
+                        await asyncio.sleep(min(delay, remaining))
+                    delay = min(delay * 2, _DB_POLL_S[1])
+                admission.lease_id = lease_id if isinstance(lease_id, str) else None
+        except BaseException as e:
+            self._abandon(waiter)
+            self._timed_out(e)
+            raise
+        return self._admitted(admission, t0)
+
+    def release(self, admission: Admission, tokens_used: int) -> None:
+        """Free the request's slot; `tokens_used` (prompt + completion) settles its token reservation."""
+
+        with self._lock:
+            self._in_flight -= 1
+            if self._level is not None:
+                self._level -= tokens_used - admission.tokens
+            self._releases += 1
+            prune = self._releases % _PRUNE_EVERY == 0
+            self._dispatch()
+        if admission.lease_id is not None:
+            self._db_release(admission.lease_id, tokens_used, prune=prune)
+
+    def _enqueue(self, waiter: _Waiter) -> float | None:
+        with self._lock:
+            self._queues.setdefault(waiter.user, deque()).append(waiter)
+            return self._dispatch()
+
+    def _dispatch(self) -> float | None:
+        """Admit queued waiters, round-robin across users, while the limits allow (lock held).
+
+        Returns the seconds until the token bucket can admit the next waiter, if that is what holds it.
+        """
+
+        settings = get_settings()
+        max_in_flight, tpm = max(0, settings.llm_max_concurrency), max(0, settings.llm_tokens_per_minute)
+        now = time.monotonic()
+        if tpm <= 0:
+            self._level = None
+        elif self._level is None:
+            self._level = float(tpm)
+        else:
+            self._level = min(float(tpm), self._level + (now - self._refilled_at) * tpm / 60)
+        self._refilled_at = now
+        while self._queues:
+            if max_in_flight and self._in_flight >= max_in_flight:
+                return None
+            user, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if self._level is not None:
+                # A request larger than the whole budget goes out once the bucket is full.
+                need = min(waiter.tokens, tpm)
+                if self._level < need:
+                    return (need - self._level) * 60 / tpm
+                self._level -= waiter.tokens
+            queue.popleft()
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            self._in_flight += 1
+            waiter.grant()
+        return None
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter.granted:
+                self._in_flight -= 1
+                if self._level is not None:
+                    self._level += waiter.tokens
+            else:
+                queue = self._queues.get(waiter.user)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[waiter.user]
+            self._dispatch()
+
+    @staticmethod
+    def _timed_out(exc: BaseException) -> None:
+        if isinstance(exc, LimiterTimeout):
+            LLM_THROTTLED.inc()
+
+    @staticmethod
+    def _admitted(admission: Admission, t0: float) -> Admission:
+        admission.waited = time.monotonic() - t0
+        LLM_QUEUE_SECONDS.observe(admission.waited)
+        return admission
+
+    @staticmethod
+    def _db_backend() -> bool:
+        return get_settings().llm_limiter_backend == "db"
+
+    def _db_acquire(self, user: str, tokens: int) -> str | bool:
+        """A new lease id, False if the global limits say wait, or True if the DB is unavailable."""
+
+        from app.db.session import SessionLocal
+
+        settings = get_settings()
+        max_in_flight, tpm = max(0, settings.llm_max_concurrency), max(0, settings.llm_tokens_per_minute)
+        now = _now()
+        try:
+            with SessionLocal() as db:
+                dialect = db.get_bind().dialect.name
+                if dialect == "postgresql":
+                    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _DB_LOCK_KEY})
+                elif dialect == "sqlite":
+                    # pysqlite runs SELECTs outside a transaction; take the write lock before counting.
+                    db.execute(text("BEGIN IMMEDIATE"))
+                if max_in_flight:
+                    active = db.execute(
+                        select(func.count())
+                        .select_from(LLMRateLease)
+                        .where(LLMRateLease.released_at.is_(None), LLMRateLease.expires_at > now)
+                    ).scalar_one()
+                    if active >= max_in_flight:
+                        return False
+                if tpm:
+                    spent = db.execute(
+                        select(func.coalesce(func.sum(LLMRateLease.tokens), 0)).where(
+                            LLMRateLease.acquired_at > now - timedelta(minutes=1)
+                        )
+                    ).scalar_one()
+                    if spent and spent + min(tokens, tpm) > tpm:
+                        return False
+                lease = LLMRateLease(
+                    id=uuid.uuid4().hex,
+                    user_key=user,
+                    tokens=tokens,
+                    acquired_at=now,
+                    expires_at=now + timedelta(seconds=_LEASE_SECONDS),
+                )
+                db.add(lease)
+                db.commit()
+                return lease.id
+        except Exception:
+            # Never let the limiter take LLM calls down with it: admit on the local limits alone.
+            logger.exception("LLM limiter lease failed")
+            return True
+
+    def _db_release(self, lease_id: str, tokens_used: int, *, prune: bool) -> None:
+        from app.db.session import SessionLocal
+
+        now = _now()
+        try:
+            with SessionLocal() as db:
+                db.execute(
+                    update(LLMRateLease)
+                    .where(LLMRateLease.id == lease_id)
+                    .values(released_at=now, tokens=tokens_used)
+                )
+                if prune:
+                    db.execute(
+                        delete(LLMRateLease).where(
+                            LLMRateLease.acquired_at < now - timedelta(minutes=1),
+                            or_(LLMRateLease.released_at.is_not(None), LLMRateLease.expires_at <= now),
+                        )
+                    )
+                db.commit()
+        except Exception:
+            logger.exception("LLM limiter release failed")
+
+
+_limiter: LLMLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> LLMLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = LLMLimiter()
+        return _limiter
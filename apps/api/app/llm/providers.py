@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import Settings, get_settings
+from app.llm.resilience import get_circuit_breaker
+
+logger = logging.getLogger(__name__)
+
+# The provider configured through DEEPSEEK_*; also the default route when it is configured.
+DEFAULT_PROVIDER = "deepseek"
+_DEFAULT_ROUTE = "default"
+# Weight of the newest sample in an endpoint's latency average.
+_LATENCY_ALPHA = 0.3
+# Share of calls that try a provider's endpoints in random order, so a slow endpoint that
+# recovered is noticed again.
+_EXPLORE_RATE = 0.05
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """One OpenAI-compatible base URL serving a provider's model."""
+
+    provider: str
+    api_base: str
+    api_key: str
+    model: str
+
+
+@dataclass(frozen=True)
+class Provider:
+    name: str
+    model: str
+    api_key: str
+    api_bases: tuple[str, ...]
+
+    def endpoints(self) -> list[Endpoint]:
+        return [Endpoint(self.name, base, self.api_key, self.model) for base in self.api_bases]
+
+
+def _provider(name: str, spec: dict[str, Any]) -> Provider | None:
+    bases = spec.get("api_base") or spec.get("api_bases") or []
+    if isinstance(bases, str):
+        bases = [bases]
+    api_bases = tuple(str(b).strip().rstrip("/") for b in bases if str(b).strip())
+    api_key = str(spec.get("api_key") or "").strip()
+    model = str(spec.get("model") or "").strip()
+    if not api_bases or not api_key or not model:
+        return None
+    return Provider(name=name, model=model, api_key=api_key, api_bases=api_bases)
+
+
+class EndpointLatency:
+    """Moving average of each endpoint's latency (time to first token, or the whole response)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._avg: dict[tuple[str, str], float] = {}
+
+    def record(self, endpoint: Endpoint, seconds: float) -> None:
+        key = (endpoint.api_base, endpoint.model)
+        with self._lock:
+            prev = self._avg.get(key)
+            self._avg[key] = seconds if prev is None else prev + _LATENCY_ALPHA * (seconds - prev)
+
+    def get(self, endpoint: Endpoint) -> float | None:
+        with self._lock:
+            return self._avg.get((endpoint.api_base, endpoint.model))
+
+    def order(self, endpoints: list[Endpoint]) -> list[Endpoint]:
+        """Fastest first; endpoints without samples yet come first so they get measured."""
+
+        if len(endpoints) < 2:
+            return list(endpoints)
+        if random.random() < _EXPLORE_RATE:
+            return random.sample(endpoints, len(endpoints))
+        with self._lock:
+            avg = {e: self._avg.get((e.api_base, e.model), 0.0) for e in endpoints}
+        return sorted(endpoints, key=avg.__getitem__)
+
+
+LATENCY = EndpointLatency()
+
+
+class ProviderRegistry:
+    """Configured providers and which of them serve each workflow node or role.
+
+    A route is an ordered provider chain: the first is preferred and the rest are failovers. A
+    node's route wins over its role's, which wins over "default".
+    """
+
+    def __init__(self, providers: dict[str, Provider], routes: dict[str, list[str]]) -> None:
+        self.providers = providers
+        default = routes.get(_DEFAULT_ROUTE) or ([DEFAULT_PROVIDER] if DEFAULT_PROVIDER in providers else [])
+        if not default and providers:
+            default = [next(iter(providers))]
+        self._routes: dict[str, list[str]] = {}
+        for key, chain in {**routes, _DEFAULT_ROUTE: default}.items():
+            known = [name for name in chain if name in providers]
+            if len(known) < len(chain):
+                logger.warning("LLM route %r names unknown providers: %s", key, sorted(set(chain) - set(known)))
+            if known:
+                self._routes[key] = known
+
+    def route(self, node: str | None, role: str | None = None) -> list[str]:
+        for key in (node, role, _DEFAULT_ROUTE):
+            if key and key in self._routes:
+                return self._routes[key]
+        return []
+
+    def candidates(self, node: str | None, role: str | None = None) -> list[Endpoint]:
+        """Endpoints to try, in order: the route's providers, each provider's endpoints fastest first.
+
+        Endpoints whose circuit is open move to the end, so a healthy failover is tried first.
+        """
+
+        out: list[Endpoint] = []
+        for name in self.route(node, role):
+            out.extend(LATENCY.order(self.providers[name].endpoints()))
+        return sorted(out, key=lambda e: get_circuit_breaker(e.api_base).state == "open")
+
+
+def _load(settings: Settings) -> ProviderRegistry:
+    providers: dict[str, Provider] = {}
+    deepseek = _provider(
+        DEFAULT_PROVIDER,
+        {
+            "api_base": settings.deepseek_api_base or "",
+            "api_key": settings.deepseek_api_key,
+            "model": settings.deepseek_model,
+        },
+    )
+    if deepseek is not None:
+        providers[DEFAULT_PROVIDER] = deepseek
+    for name, spec in settings.llm_providers.items():
+        provider = _provider(name, spec if isinstance(spec, dict) else {})
+        if provider is None:
+            logger.warning("LLM provider %r needs api_base, api_key and model; ignored", name)
+            continue
+        providers[name] = provider
+    return ProviderRegistry(providers, settings.llm_routes)
+
+
+_registry: ProviderRegistry | None = None
+_registry_config: str | None = None
+_registry_lock = threading.Lock()
+
+
+def get_provider_registry() -> ProviderRegistry:
+    """The registry built from settings; rebuilt if they change, e.g. after `reload_settings()`."""
+
+    settings = get_settings()
+    config = json.dumps(
+        [
+            settings.deepseek_api_base,
+            settings.deepseek_api_key,
+            settings.deepseek_model,
+            settings.llm_providers,
+            settings.llm_routes,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    global _registry, _registry_config
+    with _registry_lock:
+        if _registry is None or _registry_config != config:
+            _registry = _load(settings)
+            _registry_config = config
+        return _registry
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+import httpx
+
+from app.core.config import get_settings
+from app.services.metrics import METRICS
+
+LLM_CIRCUIT_TRANSITIONS = METRICS.counter(
+    "atoms_llm_circuit_transitions_total", "LLM circuit breaker state changes.", ("provider", "state")
+)
+
+# Responses worth another attempt: rate limiting, timeouts and server-side failures.
+_RETRY_STATUSES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class Failure:
+    """A failed provider request, classified for the retry policy and the circuit breaker."""
+
+    reason: str
+    retryable: bool
+    # Seconds the provider asked us to wait (`Retry-After`), if it said.
+    retry_after: float | None = None
+
+
+def retry_after_seconds(headers: httpx.Headers) -> float | None:
+    """`Retry-After` (seconds or HTTP date) or `retry-after-ms` as seconds, if present and valid."""
+
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return max(0.0, float(ms) / 1000)
+        except ValueError:
+            pass
+    value = (headers.get("retry-after") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return max(0.0, (when - datetime.now(tz=UTC)).total_seconds())
+
+
+def classify(exc: BaseException) -> Failure:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return Failure(
+            reason=f"http_{status}",
+            retryable=status in _RETRY_STATUSES,
+            retry_after=retry_after_seconds(exc.response.headers),
+        )
+    if isinstance(exc, httpx.TimeoutException):
+        return Failure(reason="connect_timeout" if isinstance(exc, httpx.ConnectTimeout) else "timeout", retryable=True)
+    if isinstance(exc, httpx.TransportError):
+        return Failure(reason=type(exc).__name__, retryable=True)
+    # Unexpected payloads and our own bugs: retrying won't help.
+    return Failure(reason=type(exc).__name__, retryable=False)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int
+    base_seconds: float
+    max_seconds: float
+
+    @classmethod
+    def from_settings(cls) -> RetryPolicy:
+        settings = get_settings()
+        return cls(
+            max_retries=max(0, settings.llm_max_retries),
+            base_seconds=max(0.0, settings.llm_retry_base_seconds),
+            max_seconds=max(0.0, settings.llm_retry_max_seconds),
+        )
+
+    def delay(self, retry: int, failure: Failure) -> float | None:
+        """Seconds to wait before retry number `retry` (0-based), or None to give up.
+
+        Full-jitter exponential backoff, but never sooner than the provider's `Retry-After`; a
+        `Retry-After` beyond `max_seconds` gives up instead of holding the run that long.
+        """
+
+        if not failure.retryable or retry >= self.max_retries:
+            return None
+        backoff = random.uniform(0, min(self.max_seconds, self.base_seconds * 2**retry))
+        if failure.retry_after is None:
+            return backoff
+        if failure.retry_after > self.max_seconds:
+            return None
+        return max(failure.retry_after, backoff)
+
+
+class CircuitBreaker:
+    """Shared failure state of one provider endpoint.
+
+    "closed" lets calls through; `failure_threshold` consecutive failures open it, and while "open"
+    calls fail fast (their fallback) instead of each waiting on a degraded provider. After
+    `reset_seconds` it turns "half_open" and lets a single probe through: success closes it, failure
+    opens it again. Thresholds are read from settings at use time.
+    """
+
+    def __init__(self, provider: str) -> None:
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        # When the half-open probe was let through (None: no probe out).
+        self._probe_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe when half-open)."""
+
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            # A probe that never reported back (e.g. its run was canceled) is given up on.
+            now = time.monotonic()
+            if state == "half_open" and (self._probe_at is None or now - self._probe_at > self._probe_s()):
+                self._probe_at = now
+                return True
+            return False
+
+    def record_success(self) -> str | None:
+        """Note a successful request; returns the new state if this changed it."""
+
+        with self._lock:
+            self._failures = 0
+            self._probe_at = None
+            if self._state == "closed":
+                return None
+            return self._transition("closed")
+
+    def record_failure(self) -> str | None:
+        """Note a failed request; returns the new state if this changed it."""
+
+        with self._lock:
+            self._failures += 1
+            probe, self._probe_at = self._probe_at is not None, None
+            if probe or (self._state == "closed" and self._failures >= max(1, get_settings().llm_breaker_failures)):
+                self._opened_at = time.monotonic()
+                return self._transition("open")
+            return None
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            out: dict[str, Any] = {"provider": self.provider, "state": state, "failures": self._failures}
+            if state == "open":
+                out["retry_in_s"] = round(max(0.0, self._opened_at + self._reset_s() - time.monotonic()), 2)
+            return out
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self._reset_s():
+            return "half_open"
+        return self._state
+
+    def _transition(self, state: str) -> str | None:
+        previous, self._state = self._current_state(), state
+        if previous == state:
+            return None
+        LLM_CIRCUIT_TRANSITIONS.inc(provider=self.provider, state=state)
+        return state
+
+    @staticmethod
+    def _reset_s() -> float:
+        return max(0.0, get_settings().llm_breaker_reset_seconds)
+
+    @staticmethod
+    def _probe_s() -> float:
+        settings = get_settings()
+        return max(settings.llm_breaker_reset_seconds, settings.llm_timeout_seconds)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """The process-wide breaker of `provider` (shared by all runs and both client flavours)."""
+
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(provider)
+        return breaker
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+# Token counts are estimates (no tokenizer dependency): ~4 ASCII characters per token, and one
+# token per other character, which is about right for the Chinese most roles answer in.
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
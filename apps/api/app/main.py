@@ -1,11 +1,37 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
-from app.api.routes import auth, health, projects, runs
-from app.core.config import get_settings
+from app.api.routes import auth, health, metrics, projects, runs
+from app.core.config import get_settings, install_reload_signal_handler
+from app.db.session import engine
+from app.llm.client import close_http_client
+from app.services.event_bus import PostgresEventListener
+from app.services.session_cache import get_session_cache
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # On Postgres, receive run events written by other processes (workers, other replicas) so
+    # SSE streams are push-based everywhere. SQLite has no cross-process notifications.
+    listener = PostgresEventListener() if engine.dialect.name == "postgresql" else None
+    if listener:
+        listener.start()
+    # Build the session cache now so a misconfigured backend fails the boot, not the first request.
+    get_session_cache()
+    # `kill -HUP <pid>` re-reads settings without a restart.
+    install_reload_signal_handler()
+    try:
+        yield
+    finally:
+        if listener:
+            listener.stop()
+        close_http_client()
 
 
 def create_app() -> FastAPI:
@@ -17,6 +43,7 @@ def create_app() -> FastAPI:
         openapi_url="/api/openapi.json",
         docs_url="/api/docs",
         redoc_url="/api/redoc",
+        lifespan=lifespan,
     )
 
     # CORS: allow the local web app to call the API with cookies.
@@ -35,6 +62,7 @@ def create_app() -> FastAPI:
     )
 
     app.include_router(health.router, prefix="/api")
+    app.include_router(metrics.router, prefix="/api")
     app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
     app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
     app.include_router(runs.router, prefix="/api/runs", tags=["runs"])
@@ -32,6 +32,9 @@ class RunDetail(RunPublic):
 
 class RunList(BaseModel):
     runs: list[RunPublic]
+    # Keyset cursor for the next (older) page; null when this is the last page.
+    next_before_created_at: datetime | None = None
+    next_before_id: str | None = None
 
 
 class RunEventPublic(BaseModel):
@@ -44,6 +47,7 @@ class RunEventPublic(BaseModel):
 
 class RunEvents(BaseModel):
     events: list[RunEventPublic]
+    next_after_seq: int | None = None
 
 
 class ArtifactPublic(BaseModel):
@@ -55,6 +59,8 @@ class ArtifactPublic(BaseModel):
 
 class RunArtifacts(BaseModel):
     artifacts: list[ArtifactPublic]
+    next_after_created_at: datetime | None = None
+    next_after_id: str | None = None
 
 
 class ArtifactDetail(ArtifactPublic):
@@ -65,9 +71,10 @@ class ArtifactDetail(ArtifactPublic):
 class RunCheckpointPublic(BaseModel):
     seq: int
     node: str
-    state: dict
+    state: dict | None = None  # omitted with `include_state=false`
     created_at: datetime
 
 
 class RunCheckpoints(BaseModel):
     checkpoints: list[RunCheckpointPublic]
+    next_after_seq: int | None = None
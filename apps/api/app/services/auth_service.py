@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import logging
 import secrets
@@ -16,7 +17,8 @@ from app.db.models.oauth_account import OAuthAccount
 from app.db.models.password_reset_token import PasswordResetToken
 from app.db.models.session import Session as DbSession
 from app.db.models.user import User
-from app.services.security import hash_password, verify_password
+from app.services.security import PasswordHasherBusy, get_password_hasher, needs_rehash
+from app.services.session_cache import get_session_cache
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +33,20 @@ def _now() -> datetime:
     return datetime.now(tz=UTC)
 
 
+def _end_read(db: Session) -> None:
+    """End the (read-only) transaction so its pooled connection is returned before a slow await."""
+
+    db.rollback()
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in attempts in progress; retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 class AuthService:
     def __init__(self, settings: Settings | None = None) -> None:
         self._settings = settings or get_settings()
@@ -52,34 +68,79 @@ class AuthService:
             return
         session.revoked_at = _now()
         db.add(session)
+        get_session_cache().invalidate_on_commit(db, [session_id])
+
+    async def signup_with_password(self, db: Session, username: str, email: str, password: str) -> AuthResult:
+        """Create a password account. DB work runs in worker threads; hashing on the hasher pool.
+
+        No DB transaction (and so no pooled connection) is held while waiting for bcrypt, otherwise
+        a login burst exhausts the connection pool.
+        """
+
+        await asyncio.to_thread(self._ensure_account_available, db, username, email)
+        password_hash = await self._hash(password)
+        return await asyncio.to_thread(self._create_password_user, db, username, email, password_hash)
 
-    def signup_with_password(self, db: Session, username: str, email: str, password: str) -> AuthResult:
+    def _ensure_account_available(self, db: Session, username: str, email: str) -> None:
         existing = (
             db.execute(select(User).where((User.email == email) | (User.username == username))).scalars().first()
         )
+        _end_read(db)
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Account already exists",
             )
 
-        user = User(email=email, username=username, password_hash=hash_password(password))
+    def _create_password_user(self, db: Session, username: str, email: str, password_hash: str) -> AuthResult:
+        user = User(email=email, username=username, password_hash=password_hash)
         db.add(user)
         db.flush()
         session = self.create_session(db, user)
         return AuthResult(user=user, session=session)
 
-    def login_with_password(self, db: Session, email: str, password: str) -> AuthResult:
-        user = db.execute(select(User).where(User.email == email)).scalars().first()
-        if not user or not user.password_hash:
+    async def login_with_password(self, db: Session, email: str, password: str) -> AuthResult:
+        row = await asyncio.to_thread(self._password_hash_by_email, db, email)
+        if not row or not row[1]:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+        user_id, password_hash = row
 
-        if not verify_password(password, user.password_hash):
+        if not await self._verify(password, password_hash):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
 
+        # Transparently upgrade hashes made with a lower cost than currently configured.
+        new_hash = await self._hash(password) if needs_rehash(password_hash) else None
+        return await asyncio.to_thread(self._finish_login, db, user_id, new_hash)
+
+    def _password_hash_by_email(self, db: Session, email: str) -> tuple[UUID, str | None] | None:
+        row = db.execute(select(User.id, User.password_hash).where(User.email == email)).first()
+        _end_read(db)
+        return (row[0], row[1]) if row else None
+
+    def _finish_login(self, db: Session, user_id: UUID, new_hash: str | None) -> AuthResult:
+        user = db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+        if new_hash:
+            user.password_hash = new_hash
+            db.add(user)
         session = self.create_session(db, user)
         return AuthResult(user=user, session=session)
 
+    @staticmethod
+    async def _hash(password: str) -> str:
+        try:
+            return await get_password_hasher().hash(password)
+        except PasswordHasherBusy as e:
+            raise _busy() from e
+
+    @staticmethod
+    async def _verify(password: str, password_hash: str) -> bool:
+        try:
+            return await get_password_hasher().verify(password, password_hash)
+        except PasswordHasherBusy as e:
+            raise _busy() from e
+
     def upsert_oauth_user(
         self,
         db: Session,
@@ -164,9 +225,20 @@ class AuthService:
         db.flush()
         return token
 
-    def reset_password_with_token(self, db: Session, token: str, new_password: str) -> None:
-        now = _now()
+    async def reset_password_with_token(self, db: Session, token: str, new_password: str) -> None:
         token_hash = self._hash_reset_token(token)
+        await asyncio.to_thread(self._check_reset_token, db, token_hash)
+        password_hash = await self._hash(new_password)
+        await asyncio.to_thread(self._apply_password_reset, db, token_hash, password_hash)
+
+    def _check_reset_token(self, db: Session, token_hash: str) -> None:
+        try:
+            self._valid_reset_token(db, token_hash)
+        finally:
+            _end_read(db)
+
+    def _valid_reset_token(self, db: Session, token_hash: str) -> PasswordResetToken:
+        now = _now()
         prt = (
             db.execute(
                 select(PasswordResetToken).where(
@@ -178,21 +250,21 @@ class AuthService:
             .scalars()
             .first()
         )
-        if not prt:
+        if not prt or not db.get(User, prt.user_id):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid or expired reset token",
             )
+        return prt
 
+    def _apply_password_reset(self, db: Session, token_hash: str, password_hash: str) -> None:
+        # Re-validated: the token may have been used while the new password was being hashed.
+        prt = self._valid_reset_token(db, token_hash)
+        now = _now()
         user = db.get(User, prt.user_id)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid or expired reset token",
-            )
 
         # Update password + revoke existing sessions.
-        user.password_hash = hash_password(new_password)
+        user.password_hash = password_hash
         db.add(user)
 
         sessions = (
@@ -208,6 +280,7 @@ class AuthService:
         for s in sessions:
             s.revoked_at = now
             db.add(s)
+        get_session_cache().invalidate_on_commit(db, [s.id for s in sessions])
 
         prt.used_at = now
         db.add(prt)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models.artifact_blob import ArtifactBlob
+from app.db.models.run_artifact import RunArtifact
+
+logger = logging.getLogger(__name__)
+
+
+class BlobBackend(ABC):
+    """Where blob bodies live. Metadata is always kept in `artifact_blobs`."""
+
+    @abstractmethod
+    def write(self, sha256: str, data: bytes) -> bytes | None:
+        """Persist `data`; returns the value for `ArtifactBlob.content` (None if stored elsewhere)."""
+
+    @abstractmethod
+    def read(self, blob: ArtifactBlob) -> bytes: ...
+
+    @abstractmethod
+    def remove(self, sha256: str) -> None:
+        """Drop the body of a blob whose row has been deleted (and committed)."""
+
+
+class DbBlobBackend(BlobBackend):
+    """Bodies in the `artifact_blobs.content` column (default; no extra infrastructure)."""
+
+    def write(self, sha256: str, data: bytes) -> bytes | None:
+        return data
+
+    def read(self, blob: ArtifactBlob) -> bytes:
+        return blob.content or b""
+
+    def remove(self, sha256: str) -> None:
+        return None
+
+
+class FilesystemBlobBackend(BlobBackend):
+    """Bodies as files under `root/ab/cd/<sha256>` (e.g. a shared volume or mounted bucket)."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def write(self, sha256: str, data: bytes) -> bytes | None:
+        # Always (re)write: the body may be mid-removal by a garbage collector that saw no row.
+        path = self.path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so readers never observe a partial file.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return None
+
+    def read(self, blob: ArtifactBlob) -> bytes:
+        if blob.content is not None:
+            # Written while the "db" backend was configured.
+            return blob.content
+        return self.path(blob.sha256).read_bytes()
+
+    def remove(self, sha256: str) -> None:
+        self.path(sha256).unlink(missing_ok=True)
+
+
+class BlobStore:
+    """Content-addressed storage for artifact bodies.
+
+    Identical bodies (fallback demo files, reruns, unchanged outputs) are stored once. A blob is
+    in use while a `run_artifacts` row points at it; `collect_garbage` deletes the others, so
+    removing an artifact row is all it takes to release its body.
+    """
+
+    def __init__(self, backend: BlobBackend) -> None:
+        self.backend = backend
+
+    def put(self, db: Session, data: bytes) -> str:
+        """Store `data` (or reuse an identical blob); returns its sha256 for the artifact row.
+
+        The caller adds the referencing artifact in the same transaction. An existing blob is
+        locked until then, so a concurrent `collect_garbage` can't delete it in between.
+        """
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        found = db.execute(select(ArtifactBlob.sha256).where(ArtifactBlob.sha256 == sha256).with_for_update()).first()
+        if found is not None:
+            return sha256
+
+        content = self.backend.write(sha256, data)
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(ArtifactBlob).values(sha256=sha256, size_bytes=len(data), content=content)
+        # A concurrent writer may have inserted the same blob since our SELECT.
+        db.execute(stmt.on_conflict_do_nothing(index_elements=[ArtifactBlob.sha256]))
+        return sha256
+
+    def get(self, db: Session, sha256: str) -> bytes:
+        blob = db.get(ArtifactBlob, sha256)
+        if blob is None:
+            raise KeyError(sha256)
+        return self.backend.read(blob)
+
+    def get_many(self, db: Session, sha256s: list[str]) -> dict[str, bytes]:
+        """Bodies for several blobs in one query."""
+
+        if not sha256s:
+            return {}
+        blobs = db.execute(select(ArtifactBlob).where(ArtifactBlob.sha256.in_(set(sha256s)))).scalars()
+        return {b.sha256: self.backend.read(b) for b in blobs}
+
+    def collect_garbage(self, db: Session, *, limit: int = 1000) -> int:
+        """Delete up to `limit` blobs no artifact references, and their bodies. Commits; returns the count."""
+
+        referenced = exists().where(RunArtifact.blob_sha256 == ArtifactBlob.sha256)
+        shas = list(db.execute(select(ArtifactBlob.sha256).where(~referenced).limit(limit)).scalars())
+        if not shas:
+            return 0
+        # Re-check: a concurrent `put` may have reused a blob since the SELECT.
+        unreferenced = delete(ArtifactBlob).where(~referenced).returning(ArtifactBlob.sha256)
+        try:
+            deleted = list(db.execute(unreferenced.where(ArtifactBlob.sha256.in_(shas))).scalars())
+            db.commit()
+        except IntegrityError:
+            # Referenced by an artifact committed while we waited on `put`'s lock: go one by one.
+            db.rollback()
+            deleted = []
+            for sha256 in shas:
+                try:
+                    with db.begin_nested():
+                        deleted.extend(db.execute(unreferenced.where(ArtifactBlob.sha256 == sha256)).scalars())
+                except IntegrityError:
+                    continue
+            db.commit()
+        # Bodies go only after the rows are gone, so a crash leaves an orphan file, never a dangling row.
+        for sha256 in deleted:
+            if db.get(ArtifactBlob, sha256) is not None:
+                continue  # re-created meanwhile
+            try:
+                self.backend.remove(sha256)
+            except OSError:
+                logger.exception("Removing blob body failed", extra={"sha256": sha256})
+        return len(deleted)
+
+
+_blob_store: BlobStore | None = None
+
+
+def get_blob_store() -> BlobStore:
+    global _blob_store
+    if _blob_store is not None:
+        return _blob_store
+
+    settings = get_settings()
+    if settings.artifact_blob_backend == "fs":
+        backend: BlobBackend = FilesystemBlobBackend(settings.artifact_blob_dir)
+    else:
+        backend = DbBlobBackend()
+    _blob_store = BlobStore(backend)
+    return _blob_store
+
+
+def main() -> None:
+    """`python -m app.services.blob_store`: garbage-collect unreferenced artifact blobs."""
+
+    from app.db.session import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    store = get_blob_store()
+    total = 0
+    with SessionLocal() as db:
+        while n := store.collect_garbage(db):
+            total += n
+    logger.info("Collected %d unreferenced artifact blobs", total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from uuid import UUID
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from app.db.models.run_event import RunEvent
+from app.services.run_control import CONTROL_CHANNEL, RUN_CONTROLS
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel used to fan run events out across API replicas / worker processes.
+NOTIFY_CHANNEL = "run_events"
+_SESSION_INFO_KEY = "run_events_to_publish"
+_SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def event_payload(e: RunEvent) -> dict:
+    """Public (SSE / API) shape of a run event."""
+
+    return {
+        "seq": e.seq,
+        "type": e.type,
+        "message": e.message,
+        "data": e.data,
+        "created_at": e.created_at.isoformat(),
+    }
+
+
+class Subscription:
+    """A single SSE client's view of one run's live events."""
+
+    def __init__(self, bus: RunEventBus, run_id: UUID, loop: asyncio.AbstractEventLoop) -> None:
+        self.bus = bus
+        self.run_id = run_id
+        self.loop = loop
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=_SUBSCRIBER_QUEUE_SIZE)
+
+    async def get(self, timeout: float) -> dict | None:
+        """Next live event, or None if nothing arrived within `timeout` seconds."""
+
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    def _offer(self, payload: dict) -> None:
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Slow consumer: the dropped event shows up as a seq gap and is replayed from the DB.
+            pass
+
+
+class RunEventBus:
+    """In-process pub/sub for run events.
+
+    Writers publish after their transaction commits; async SSE handlers subscribe per run and only
+    hit the DB for catch-up. Publishing is thread-safe (the executor runs on worker threads).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subs: dict[UUID, set[Subscription]] = defaultdict(set)
+        self._last_seq: dict[UUID, int] = {}
+
+    def subscribe(self, run_id: UUID) -> Subscription:
+        sub = Subscription(self, run_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subs[run_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.run_id)
+            if subs is None:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.run_id]
+                self._last_seq.pop(sub.run_id, None)
+
+    def has_subscribers(self, run_id: UUID) -> bool:
+        with self._lock:
+            return bool(self._subs.get(run_id))
+
+    def last_seq(self, run_id: UUID) -> int:
+        with self._lock:
+            return self._last_seq.get(run_id, 0)
+
+    def note_seq(self, run_id: UUID, seq: int) -> None:
+        """Record that subscribers of `run_id` already have everything up to `seq` (DB catch-up)."""
+
+        with self._lock:
+            if self._subs.get(run_id):
+                self._last_seq[run_id] = max(self._last_seq.get(run_id, 0), seq)
+
+    def publish(self, run_id: UUID, payloads: list[dict]) -> None:
+        with self._lock:
+            subs = list(self._subs.get(run_id) or ())
+            if not subs or not payloads:
+                return
+            self._last_seq[run_id] = max(self._last_seq.get(run_id, 0), *(p["seq"] for p in payloads))
+        for sub in subs:
+            for p in payloads:
+                try:
+                    sub.loop.call_soon_threadsafe(sub._offer, p)
+                except RuntimeError:
+                    # Subscriber's loop is gone; it will be unsubscribed by its own cleanup.
+                    break
+
+    def publish_on_commit(self, db: Session, run_id: UUID, payloads: list[dict]) -> None:
+        """Queue `payloads` for publication once `db` commits (dropped on rollback).
+
+        On Postgres a NOTIFY is issued in the same transaction so other processes learn about the
+        new events exactly when they become visible.
+        """
+
+        if not payloads:
+            return
+        db.info.setdefault(_SESSION_INFO_KEY, []).append((run_id, payloads))
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {
+                    "channel": NOTIFY_CHANNEL,
+                    "payload": json.dumps({"run_id": str(run_id), "seq": payloads[-1]["seq"]}),
+                },
+            )
+
+
+EVENT_BUS = RunEventBus()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    for run_id, payloads in session.info.pop(_SESSION_INFO_KEY, ()):
+        try:
+            EVENT_BUS.publish(run_id, payloads)
+        except Exception:
+            logger.exception("Publishing run events failed", extra={"run_id": str(run_id)})
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted(session: Session) -> None:
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+class PostgresEventListener:
+    """Background LISTEN loop that republishes other processes' run events on the local bus.
+
+    Events are fetched once per notification and only for runs that have local subscribers, so DB
+    load scales with event count rather than with the number of connected viewers. The same
+    connection also receives pause/resume/cancel signals for runs executing in this process.
+    """
+
+    def __init__(self, bus: RunEventBus = EVENT_BUS, *, poll_timeout: float = 1.0) -> None:
+        self.bus = bus
+        self.poll_timeout = poll_timeout
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="run-events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_timeout * 2)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Run event LISTEN loop failed; reconnecting")
+                self._stop.wait(1.0)
+
+    def _listen(self) -> None:
+        from app.db.session import engine
+
+        raw = engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            conn.autocommit = True
+            conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            conn.execute(f"LISTEN {CONTROL_CHANNEL}")
+            while not self._stop.is_set():
+                for n in conn.notifies(timeout=self.poll_timeout, stop_after=100):
+                    if n.channel == CONTROL_CHANNEL:
+                        RUN_CONTROLS.handle_notification(n.payload)
+                    else:
+                        self._handle(n.payload)
+        finally:
+            raw.invalidate()
+
+    def _handle(self, payload: str) -> None:
+        from app.db.session import SessionLocal
+
+        try:
+            msg = json.loads(payload)
+            run_id = UUID(msg["run_id"])
+            seq = int(msg["seq"])
+        except Exception:
+            return
+        if not self.bus.has_subscribers(run_id):
+            return
+        after = self.bus.last_seq(run_id)
+        if seq <= after:
+            return
+        with SessionLocal() as db:
+            stmt = (
+                select(RunEvent)
+                .where(RunEvent.run_id == run_id, RunEvent.seq > after)
+                .order_by(RunEvent.seq.asc())
+            )
+            payloads = [event_payload(e) for e in db.execute(stmt).scalars().all()]
+        self.bus.publish(run_id, payloads)
+
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+from collections.abc import Callable
+from datetime import UTC, datetime
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.services.run_service import RunService
+
+# Another writer (e.g. the cancel/pause endpoints) may insert events for the same run between our
+# flushes. On a `(run_id, seq)` conflict we re-seed from the DB and renumber the pending batch.
+_MAX_FLUSH_ATTEMPTS = 3
+# Writers whose counter advanced inside a caller's transaction, re-seeded if it rolls back.
+_SESSION_INFO_KEY = "run_event_writers"
+
+
+class RunEventWriter:
+    """Buffered, per-run writer for `run_events`.
+
+    The sequence counter is seeded once from the DB and then kept in memory, and buffered events
+    are written as one multi-row INSERT per commit window. A batch is flushed when it reaches
+    `batch_size` events or `flush_ms` after its first event, whichever comes first, so SSE clients
+    still see events promptly.
+
+    With `background_flush`, `emit` never writes on the calling thread (a full batch is handed to
+    the timer thread immediately), which keeps it safe to call from an event loop.
+    """
+
+    def __init__(
+        self,
+        run_id: UUID,
+        *,
+        flush_ms: int | None = None,
+        batch_size: int | None = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        service: RunService | None = None,
+        background_flush: bool = False,
+    ) -> None:
+        settings = get_settings()
+        self.run_id = run_id
+        self._flush_s = max(0, settings.run_event_flush_ms if flush_ms is None else flush_ms) / 1000
+        self._batch_size = max(1, settings.run_event_batch_size if batch_size is None else batch_size)
+        self._session_factory = session_factory
+        self._svc = service or RunService()
+        self._background_flush = background_flush
+        self._lock = threading.RLock()
+        self._pending: list[dict] = []
+        self._next_seq: int | None = None
+        self._timer: threading.Timer | None = None
+        self._closed = False
+        self._discarded = False
+
+    def __enter__(self) -> RunEventWriter:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def emit(self, *, type: str, message: str, data: dict | None) -> None:
+        """Buffer an event; it reaches the DB within the flush window."""
+
+        with self._lock:
+            if self._discarded:
+                return
+            self._pending.append(
+                {"type": type, "message": message, "data": data, "created_at": datetime.now(tz=UTC)}
+            )
+            if self._closed or len(self._pending) >= self._batch_size:
+                if self._background_flush:
+                    if self._timer is None or self._timer.interval > 0:
+                        self._schedule_flush(0)
+                else:
+                    self.flush()
+            elif self._timer is None:
+                self._schedule_flush(self._flush_s)
+
+    def flush(self, db: Session | None = None) -> None:
+        """Write all buffered events.
+
+        With `db`, rows are added to the caller's transaction (the caller commits), so events can
+        land atomically with e.g. a status change. Without it, the writer commits on its own session.
+        """
+
+        with self._lock:
+            self._cancel_timer()
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            if db is not None:
+                if self._next_seq is None:
+                    self._next_seq = self._svc.next_seq(db, self.run_id, "events")
+                # `add_events` renumbers the batch if another writer took these numbers meanwhile.
+                self._next_seq = self._svc.add_events(db, self.run_id, pending, start_seq=self._next_seq)
+                db.info.setdefault(_SESSION_INFO_KEY, set()).add(self)
+                return
+            try:
+                self._write_own_session(pending)
+            except Exception:
+                # Keep the batch so a later flush can retry it.
+                self._pending = pending + self._pending
+                raise
+
+    def close(self) -> None:
+        """Flush whatever is buffered; later `emit` calls are written through immediately."""
+
+        with self._lock:
+            self._closed = True
+            self.flush()
+
+    def discard(self) -> None:
+        """Drop buffered events and ignore later ones, e.g. once the run belongs to another worker."""
+
+        with self._lock:
+            self._cancel_timer()
+            self._pending = []
+            self._discarded = True
+
+    def _reseed(self) -> None:
+        with self._lock:
+            self._next_seq = None
+
+    def _write_own_session(self, pending: list[dict]) -> None:
+        for attempt in range(_MAX_FLUSH_ATTEMPTS):
+            with self._session_factory() as sdb:
+                try:
+                    if self._next_seq is None or attempt:
+                        self._next_seq = self._svc.next_seq(sdb, self.run_id, "events")
+                    next_seq = self._svc.add_events(sdb, self.run_id, pending, start_seq=self._next_seq)
+                    sdb.commit()
+                except IntegrityError:
+                    sdb.rollback()
+                    if attempt == _MAX_FLUSH_ATTEMPTS - 1:
+                        raise
+                    continue
+            self._next_seq = next_seq
+            return
+
+    def _schedule_flush(self, delay: float) -> None:
+        self._cancel_timer()
+        # The timer thread runs in the caller's context, so e.g. tracing attributes the write to the run.
+        self._timer = threading.Timer(delay, contextvars.copy_context().run, args=(self._flush_from_timer,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush_from_timer(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            # The next emit/flush/close on the owning thread will retry and surface errors there.
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_committed(session: Session) -> None:
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _reseed_rolled_back(session: Session) -> None:
+    # The rows numbered in that transaction were never written.
+    for writer in session.info.pop(_SESSION_INFO_KEY, ()):
+        writer._reseed()
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from uuid import UUID
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel carrying pause/resume/cancel requests to the process executing the run.
+CONTROL_CHANNEL = "run_control"
+_SESSION_INFO_KEY = "run_controls_to_signal"
+_STATUSES = {"running", "paused", "canceled"}
+
+
+class RunCanceled(Exception):
+    """Raised inside a run (e.g. by `chat()`) once the run has been canceled."""
+
+
+class RunLeaseLost(RunCanceled):
+    """Raised inside a run once this process no longer owns it (another worker reclaimed it)."""
+
+
+class RunControl:
+    """Live control state ("running", "paused" or "canceled") of one executing run.
+
+    Signalled from API requests (same process directly, other processes via NOTIFY), read by the
+    executor between workflow steps and by `chat()` while a response streams in.
+    """
+
+    def __init__(self, run_id: UUID, status: str = "running") -> None:
+        self.run_id = run_id
+        self._cond = threading.Condition()
+        self._status = status
+        # Set once another worker took the run over: this execution must stop without writing.
+        self._lost = False
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @property
+    def lost(self) -> bool:
+        return self._lost
+
+    @property
+    def canceled(self) -> bool:
+        return self._status == "canceled" or self._lost
+
+    def check(self) -> None:
+        if self._lost:
+            raise RunLeaseLost(str(self.run_id))
+        if self._status == "canceled":
+            raise RunCanceled(str(self.run_id))
+
+    def set_status(self, status: str) -> None:
+        if status not in _STATUSES:
+            return
+        with self._cond:
+            # Cancellation is final.
+            if status == self._status or self._status == "canceled":
+                return
+            self._status = status
+            self._wake()
+
+    def revoke(self) -> None:
+        """The run's lease was lost: abort it like a cancellation, but as `RunLeaseLost`."""
+
+        with self._cond:
+            if self._lost:
+                return
+            self._lost = True
+            self._wake()
+
+    def _wake(self) -> None:
+        # Condition held.
+        self._cond.notify_all()
+        for loop, ev in list(self._async_waiters):
+            try:
+                loop.call_soon_threadsafe(ev.set)
+            except RuntimeError:
+                pass  # loop closed
+
+    def wait_while_paused(self, timeout: float) -> str:
+        """Block until the run is no longer paused (or `timeout` elapses); returns the status."""
+
+        with self._cond:
+            self._cond.wait_for(lambda: self._status != "paused" or self._lost, timeout=timeout)
+            return self._status
+
+    async def await_while_paused(self, timeout: float) -> str:
+        """Async `wait_while_paused` that doesn't hold a thread."""
+
+        ev = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), ev)
+        with self._cond:
+            if self._status != "paused" or self._lost:
+                return self._status
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(ev.wait(), timeout=timeout)
+        except TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+        return self._status
+
+    def sleep(self, seconds: float) -> None:
+        """Wait `seconds` (e.g. a retry backoff), raising `RunCanceled` as soon as the run is canceled."""
+
+        with self._cond:
+            self._cond.wait_for(lambda: self.canceled, timeout=max(0.0, seconds))
+        self.check()
+
+    async def asleep(self, seconds: float) -> None:
+        """Async `sleep` that doesn't hold a thread."""
+
+        deadline = time.monotonic() + max(0.0, seconds)
+        ev = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), ev)
+        with self._cond:
+            self._async_waiters.add(waiter)
+        try:
+            # Any status change wakes us; only cancellation cuts the wait short.
+            while not self.canceled and (remaining := deadline - time.monotonic()) > 0:
+                ev.clear()
+                try:
+                    await asyncio.wait_for(ev.wait(), timeout=remaining)
+                except TimeoutError:
+                    break
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+        self.check()
+
+
+# Installed by the executor for the duration of a run; `chat()` aborts streams when it's canceled.
+CURRENT_RUN_CONTROL: ContextVar[RunControl | None] = ContextVar("CURRENT_RUN_CONTROL", default=None)
+
+
+class RunControlRegistry:
+    """Controls of the runs executing in this process, keyed by run id."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._controls: dict[UUID, RunControl] = {}
+
+    def open(self, run_id: UUID) -> RunControl:
+        with self._lock:
+            ctl = self._controls.get(run_id)
+            if ctl is None:
+                ctl = self._controls[run_id] = RunControl(run_id)
+            return ctl
+
+    def close(self, run_id: UUID) -> None:
+        with self._lock:
+            self._controls.pop(run_id, None)
+
+    def signal(self, run_id: UUID, status: str) -> None:
+        """Apply `status` to the run if it executes in this process (no-op otherwise)."""
+
+        with self._lock:
+            ctl = self._controls.get(run_id)
+        if ctl is not None:
+            ctl.set_status(status)
+
+    def revoke(self, run_id: UUID) -> None:
+        """Abort the run's execution in this process because another worker now owns it."""
+
+        with self._lock:
+            ctl = self._controls.get(run_id)
+        if ctl is not None:
+            ctl.revoke()
+
+    def signal_on_commit(self, db: Session, run_id: UUID, status: str) -> None:
+        """Signal `status` once `db` commits; on Postgres also NOTIFY the other processes."""
+
+        db.info.setdefault(_SESSION_INFO_KEY, []).append((run_id, status))
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": CONTROL_CHANNEL, "payload": json.dumps({"run_id": str(run_id), "status": status})},
+            )
+
+    def handle_notification(self, payload: str) -> None:
+        try:
+            msg = json.loads(payload)
+            run_id = UUID(msg["run_id"])
+            status = str(msg["status"])
+        except Exception:
+            return
+        self.signal(run_id, status)
+
+
+RUN_CONTROLS = RunControlRegistry()
+
+
+@event.listens_for(Session, "after_commit")
+def _signal_committed(session: Session) -> None:
+    for run_id, status in session.info.pop(_SESSION_INFO_KEY, ()):
+        try:
+            RUN_CONTROLS.signal(run_id, status)
+        except Exception:
+            logger.exception("Signalling run control failed", extra={"run_id": str(run_id)})
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted(session: Session) -> None:
+    session.info.pop(_SESSION_INFO_KEY, None)
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
-from datetime import UTC, datetime
-from uuid import UUID
+import json
+from datetime import UTC, datetime, timedelta
+from uuid import UUID, uuid4
 
-from sqlalchemy import func, select
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
 from app.db.models.run import Run
 from app.db.models.run_artifact import RunArtifact
 from app.db.models.run_checkpoint import RunCheckpoint
 from app.db.models.run_event import RunEvent
+from app.services.blob_store import get_blob_store
+from app.services.event_bus import EVENT_BUS, event_payload
+from app.services.state_diff import apply_state_diff, diff_state
 
 UNKNOWN_TABLE_KIND_ERROR = "unknown table kind"
+_CLAIM_CANDIDATES = 8
 
 
 def _now() -> datetime:
@@ -58,6 +66,86 @@ class RunService:
             run.finished_at = _now()
         db.add(run)
 
+    def claim_next_run(self, db: Session, worker_id: str, *, lease_seconds: int) -> Run | None:
+        """Claim the oldest queued run (or one whose worker lease expired) for `worker_id`.
+
+        Postgres uses `FOR UPDATE SKIP LOCKED` so concurrent workers never block on each other.
+        Other dialects (SQLite) fall back to a compare-and-set UPDATE on the row's status/owner.
+        The claim is committed before returning. A reclaimed run keeps its status: a run the user
+        paused stays paused on its new worker.
+        """
+
+        now = _now()
+        stale = now - timedelta(seconds=lease_seconds)
+        claimable = or_(
+            Run.status == "queued",
+            and_(Run.status.in_(("running", "paused")), Run.heartbeat_at.is_not(None), Run.heartbeat_at < stale),
+        )
+        stmt = select(Run).where(claimable).order_by(Run.created_at.asc())
+
+        if db.get_bind().dialect.name == "postgresql":
+            run = db.execute(stmt.limit(1).with_for_update(skip_locked=True)).scalars().first()
+            if not run:
+                db.rollback()
+                return None
+            reclaimed = run.status != "queued"
+            if not reclaimed:
+                run.status = "running"
+            run.claimed_by = worker_id
+            run.heartbeat_at = now
+            db.add(run)
+        else:
+            run = None
+            reclaimed = False
+            for cand in db.execute(stmt.limit(_CLAIM_CANDIDATES)).scalars().all():
+                res = db.execute(
+                    update(Run)
+                    .where(
+                        Run.id == cand.id,
+                        Run.status == cand.status,
+                        Run.claimed_by.is_(None) if cand.claimed_by is None else Run.claimed_by == cand.claimed_by,
+                    )
+                    .values(
+                        status="running" if cand.status == "queued" else cand.status,
+                        claimed_by=worker_id,
+                        heartbeat_at=now,
+                    )
+                )
+                if res.rowcount == 1:
+                    run = cand
+                    reclaimed = cand.status != "queued"
+                    break
+            if run is None:
+                db.rollback()
+                return None
+            db.refresh(run)
+
+        if reclaimed:
+            self.add_event(
+                db,
+                run.id,
+                type="run.reclaimed",
+                message="Run reclaimed from a stale worker",
+                data={"worker": worker_id},
+            )
+        db.commit()
+        return run
+
+    def heartbeat(self, db: Session, worker_id: str, run_ids: list[UUID]) -> set[UUID]:
+        """Extend the lease of runs still owned by `worker_id`; returns those ids.
+
+        A run missing from the result was reclaimed by another worker, so its execution here must stop.
+        """
+
+        if not run_ids:
+            return set()
+        db.execute(
+            update(Run)
+            .where(Run.id.in_(run_ids), Run.claimed_by == worker_id)
+            .values(heartbeat_at=_now())
+        )
+        return set(db.execute(select(Run.id).where(Run.id.in_(run_ids), Run.claimed_by == worker_id)).scalars())
+
     def next_seq(self, db: Session, run_id: UUID, table: str) -> int:
         if table == "events":
             stmt = select(func.coalesce(func.max(RunEvent.seq), 0) + 1).where(RunEvent.run_id == run_id)
@@ -77,15 +165,122 @@ class RunService:
         ev = RunEvent(run_id=run_id, seq=seq, type=type, message=message, data=data)
         db.add(ev)
         db.flush()
+        EVENT_BUS.publish_on_commit(db, run_id, [event_payload(ev)])
         return ev
 
-    def add_checkpoint(self, db: Session, run_id: UUID, *, node: str, state: dict) -> RunCheckpoint:
+    def add_events(self, db: Session, run_id: UUID, events: list[dict], *, start_seq: int) -> int:
+        """Insert `events` (type/message/data dicts) as one multi-row INSERT numbered from `start_seq`.
+
+        Returns the next free sequence number. Unlike `add_event`, no `MAX(seq)` lookup is done;
+        callers own the counter (see `RunEventWriter`). If another writer took some of those numbers
+        meanwhile, the batch is renumbered after the run's last event instead of failing the
+        caller's transaction.
+        """
+
+        if not events:
+            return start_seq
+        now = _now()
+        rows = [
+            {
+                "id": uuid4(),
+                "run_id": run_id,
+                "seq": start_seq + i,
+                "type": e["type"],
+                "message": e.get("message") or "",
+                "data": e.get("data"),
+                "created_at": e.get("created_at") or now,
+            }
+            for i, e in enumerate(events)
+        ]
+        upsert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        conflict_free = upsert(RunEvent).on_conflict_do_nothing(index_elements=["run_id", "seq"])
+        inserted = list(db.execute(conflict_free.returning(RunEvent.id), rows).scalars())
+        if len(inserted) < len(rows):
+            db.execute(delete(RunEvent).where(RunEvent.id.in_(inserted)))
+            start_seq = self.next_seq(db, run_id, "events")
+            for i, r in enumerate(rows):
+                r["seq"] = start_seq + i
+            db.execute(insert(RunEvent), rows)
+        payloads = [
+            {
+                "seq": r["seq"],
+                "type": r["type"],
+                "message": r["message"],
+                "data": r["data"],
+                "created_at": r["created_at"].isoformat(),
+            }
+            for r in rows
+        ]
+        EVENT_BUS.publish_on_commit(db, run_id, payloads)
+        return start_seq + len(rows)
+
+    def add_checkpoint(
+        self, db: Session, run_id: UUID, *, node: str, state: dict, prev: tuple[int, dict] | None = None
+    ) -> RunCheckpoint:
+        """Store `state` after `node`.
+
+        `prev` is the `(seq, state)` of the caller's previous checkpoint of this run. When it is the
+        immediate predecessor only a diff against it is stored, except for every
+        `checkpoint_full_every`-th checkpoint, which is a full snapshot so that reconstructing a
+        state never replays more than that many rows.
+        """
+
         seq = self.next_seq(db, run_id, "checkpoints")
-        cp = RunCheckpoint(run_id=run_id, seq=seq, node=node, state=state)
+        full_every = max(1, get_settings().checkpoint_full_every)
+        if prev is not None and prev[0] == seq - 1 and (seq - 1) % full_every != 0:
+            cp = RunCheckpoint(run_id=run_id, seq=seq, node=node, kind="delta", state=diff_state(prev[1], state))
+        else:
+            cp = RunCheckpoint(run_id=run_id, seq=seq, node=node, kind="full", state=state)
         db.add(cp)
         db.flush()
         return cp
 
+    def checkpoint_states(
+        self, db: Session, run_id: UUID, *, after_seq: int = 0, limit: int | None = None
+    ) -> list[tuple[RunCheckpoint, dict]]:
+        """Checkpoints with `seq > after_seq` (at most `limit`) in seq order with their full states.
+
+        Delta rows before the page are replayed only from the closest full snapshot.
+        """
+
+        stmt = (
+            select(RunCheckpoint)
+            .where(RunCheckpoint.run_id == run_id, RunCheckpoint.seq > after_seq)
+            .order_by(RunCheckpoint.seq.asc())
+            .limit(limit)
+        )
+        page = list(db.execute(stmt).scalars())
+        if not page:
+            return []
+        state: dict = {}
+        if page[0].kind == "delta":
+            base_seq = db.execute(
+                select(func.max(RunCheckpoint.seq)).where(
+                    RunCheckpoint.run_id == run_id, RunCheckpoint.seq < page[0].seq, RunCheckpoint.kind == "full"
+                )
+            ).scalar_one()
+            prefix = select(RunCheckpoint).where(
+                RunCheckpoint.run_id == run_id,
+                RunCheckpoint.seq >= (base_seq or 0),
+                RunCheckpoint.seq < page[0].seq,
+            )
+            for cp in db.execute(prefix.order_by(RunCheckpoint.seq.asc())).scalars():
+                state = apply_state_diff(state, cp.state) if cp.kind == "delta" else (cp.state or {})
+        out: list[tuple[RunCheckpoint, dict]] = []
+        for cp in page:
+            state = apply_state_diff(state, cp.state) if cp.kind == "delta" else (cp.state or {})
+            out.append((cp, state))
+        return out
+
+    def latest_checkpoint_state(self, db: Session, run_id: UUID) -> tuple[RunCheckpoint, dict] | None:
+        """The run's last checkpoint with its full state, if it has any."""
+
+        seq = db.execute(select(func.max(RunCheckpoint.seq)).where(RunCheckpoint.run_id == run_id)).scalar_one()
+        if seq is None:
+            return None
+        states = self.checkpoint_states(db, run_id, after_seq=seq - 1, limit=1)
+        return states[0] if states else None
+
     def add_artifact(
         self,
         db: Session,
@@ -96,13 +291,44 @@ class RunService:
         content_json: dict | None = None,
         content_text: str | None = None,
     ) -> RunArtifact:
+        """Add an artifact whose body is stored (once per distinct content) in the blob store."""
+
+        if content_text is not None:
+            blob_format, data = "text", content_text.encode("utf-8")
+        elif content_json is not None:
+            blob_format, data = "json", json.dumps(content_json, ensure_ascii=False).encode("utf-8")
+        else:
+            blob_format, data = None, None
         art = RunArtifact(
             run_id=run_id,
             name=name,
             mime_type=mime_type,
-            content_json=content_json,
-            content_text=content_text,
+            blob_sha256=get_blob_store().put(db, data) if data is not None else None,
+            blob_format=blob_format,
+            size_bytes=len(data) if data is not None else 0,
         )
         db.add(art)
         db.flush()
         return art
+
+    def delete_artifacts(self, db: Session, run_id: UUID, artifact_ids: list[UUID]) -> None:
+        """Remove artifacts of the run; their blobs are collected once nothing else references them."""
+
+        if artifact_ids:
+            db.execute(delete(RunArtifact).where(RunArtifact.run_id == run_id, RunArtifact.id.in_(artifact_ids)))
+
+    def artifact_contents(
+        self, db: Session, arts: list[RunArtifact]
+    ) -> list[tuple[dict | None, str | None]]:
+        """`(content_json, content_text)` for each artifact, loading blob bodies in one query."""
+
+        bodies = get_blob_store().get_many(db, [a.blob_sha256 for a in arts if a.blob_sha256])
+        out: list[tuple[dict | None, str | None]] = []
+        for a in arts:
+            if not a.blob_sha256:
+                # Rows written before the blob store keep their body inline.
+                out.append((a.content_json, a.content_text))
+                continue
+            text = bodies.get(a.blob_sha256, b"").decode("utf-8")
+            out.append((json.loads(text) if text else None, None) if a.blob_format == "json" else (None, text))
+        return out
@@ -1,20 +1,133 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TypeVar
 
 import bcrypt
 
+from app.core.config import get_settings
 
-def hash_password(password: str) -> str:
+T = TypeVar("T")
+
+
+def _prehash(password: str) -> bytes:
     raw = password.encode("utf-8")
     # bcrypt truncates at 72 bytes; prehash for longer inputs.
     if len(raw) > 72:
         raw = hashlib.sha256(raw).digest()
-    return bcrypt.hashpw(raw, bcrypt.gensalt()).decode("utf-8")
+    return raw
+
+
+def hash_password(password: str, *, rounds: int | None = None) -> str:
+    rounds = rounds or get_settings().bcrypt_rounds
+    return bcrypt.hashpw(_prehash(password), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    raw = password.encode("utf-8")
-    if len(raw) > 72:
-        raw = hashlib.sha256(raw).digest()
-    return bcrypt.checkpw(raw, password_hash.encode("utf-8"))
+    return bcrypt.checkpw(_prehash(password), password_hash.encode("utf-8"))
+
+
+def needs_rehash(password_hash: str, *, rounds: int | None = None) -> bool:
+    """True if `password_hash` uses a lower bcrypt cost than configured."""
+
+    rounds = rounds or get_settings().bcrypt_rounds
+    try:
+        return int(password_hash.split("$")[2]) < rounds
+    except (IndexError, ValueError):
+        return False
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised instead of queueing when too many hash/verify calls are already pending."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded thread pool so request handlers only await it.
+
+    bcrypt releases the GIL, so a small pool uses that many cores without blocking the event loop
+    or the shared request threadpool. At most `max_pending` calls wait or run at once; beyond that
+    callers get `PasswordHasherBusy` instead of an ever-growing queue.
+    """
+
+    def __init__(self, *, workers: int, max_pending: int) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(verify_password, password, password_hash)
+
+    def stats(self) -> dict[str, int]:
+        """Queue depth and counters (`pending` includes the `running` calls)."""
+
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def _run(self, fn: Callable[..., T], *args: object) -> T:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PasswordHasherBusy(f"{self._pending} password hashing calls pending")
+            self._pending += 1
+        try:
+            future = self._executor.submit(self._call, fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # Settled by the job itself, not the awaiting request: a cancelled request (e.g. a client
+        # disconnect) leaves bcrypt running, and that still counts against `max_pending`.
+        future.add_done_callback(self._settle)
+        return await asyncio.wrap_future(future)
+
+    def _settle(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self._completed += 1
+
+    def _call(self, fn: Callable[..., T], *args: object) -> T:
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+
+_password_hasher: PasswordHasher | None = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _password_hasher
+    if _password_hasher is not None:
+        return _password_hasher
+
+    settings = get_settings()
+    _password_hasher = PasswordHasher(
+        workers=settings.password_hash_workers, max_pending=settings.password_hash_max_pending
+    )
+    return _password_hasher
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_SESSION_INFO_KEY = "session_cache_invalidations"
+
+
+@dataclass(frozen=True)
+class SessionSnapshot:
+    """What `get_current_user` needs from a validated session, without touching the DB."""
+
+    user_id: UUID
+    email: str | None
+    username: str | None
+    expires_at: datetime
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "user_id": str(self.user_id),
+                "email": self.email,
+                "username": self.username,
+                "expires_at": self.expires_at.isoformat(),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> SessionSnapshot:
+        d = json.loads(raw)
+        return cls(
+            user_id=UUID(d["user_id"]),
+            email=d["email"],
+            username=d["username"],
+            expires_at=datetime.fromisoformat(d["expires_at"]),
+        )
+
+
+class SessionCache(ABC):
+    """Cache of validated sessions keyed by session id. Entries never outlive the session."""
+
+    @abstractmethod
+    def get(self, session_id: UUID) -> SessionSnapshot | None: ...
+
+    @abstractmethod
+    def set(self, session_id: UUID, snapshot: SessionSnapshot) -> None: ...
+
+    @abstractmethod
+    def invalidate(self, session_ids: list[UUID]) -> None: ...
+
+    def invalidate_on_commit(self, db: Session, session_ids: list[UUID]) -> None:
+        """Drop `session_ids` now and again once `db` commits.
+
+        The second pass evicts entries that a concurrent request re-cached from the DB before the
+        revocation became visible.
+        """
+
+        if not session_ids:
+            return
+        self.invalidate(session_ids)
+        db.info.setdefault(_SESSION_INFO_KEY, []).append((self, session_ids))
+
+    def _ttl(self, snapshot: SessionSnapshot, ttl_seconds: float) -> float:
+        return min(ttl_seconds, (snapshot.expires_at - datetime.now(tz=UTC)).total_seconds())
+
+
+class NullSessionCache(SessionCache):
+    def get(self, session_id: UUID) -> SessionSnapshot | None:
+        return None
+
+    def set(self, session_id: UUID, snapshot: SessionSnapshot) -> None:
+        return None
+
+    def invalidate(self, session_ids: list[UUID]) -> None:
+        return None
+
+
+class InMemorySessionCache(SessionCache):
+    """Per-process LRU with a TTL.
+
+    With several API replicas a revocation only reaches the replica that handled it, so other
+    replicas may accept the session for up to `ttl_seconds`; use `RedisSessionCache` there.
+    """
+
+    def __init__(self, *, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[UUID, tuple[float, SessionSnapshot]] = OrderedDict()
+
+    def get(self, session_id: UUID) -> SessionSnapshot | None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            deadline, snapshot = entry
+            if deadline <= time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return snapshot
+
+    def set(self, session_id: UUID, snapshot: SessionSnapshot) -> None:
+        ttl = self._ttl(snapshot, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = (time.monotonic() + ttl, snapshot)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_ids: list[UUID]) -> None:
+        with self._lock:
+            for sid in session_ids:
+                self._entries.pop(sid, None)
+
+
+class RedisSessionCache(SessionCache):
+    """Shared cache for multi-replica deployments: a revocation is seen by every replica at once.
+
+    Fails open: while Redis is unreachable every lookup misses and requests validate against the DB.
+    """
+
+    def __init__(self, url: str, *, ttl_seconds: float, prefix: str = "session:") -> None:
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_CACHE_BACKEND=redis needs the `redis` package (see requirements.txt)") from e
+
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, session_id: UUID) -> SessionSnapshot | None:
+        try:
+            raw = self._redis.get(f"{self.prefix}{session_id}")
+        except Exception:
+            logger.exception("Session cache lookup failed")
+            return None
+        return SessionSnapshot.from_json(raw) if raw else None
+
+    def set(self, session_id: UUID, snapshot: SessionSnapshot) -> None:
+        ttl_ms = int(self._ttl(snapshot, self.ttl_seconds) * 1000)
+        if ttl_ms <= 0:
+            return
+        try:
+            self._redis.set(f"{self.prefix}{session_id}", snapshot.to_json(), px=ttl_ms)
+        except Exception:
+            logger.exception("Session cache write failed")
+
+    def invalidate(self, session_ids: list[UUID]) -> None:
+        if not session_ids:
+            return
+        try:
+            self._redis.delete(*(f"{self.prefix}{sid}" for sid in session_ids))
+        except Exception:
+            # The sessions are revoked in the DB; other replicas may accept them until the TTL expires.
+            logger.exception("Session cache invalidation failed")
+
+
+_session_cache: SessionCache | None = None
+
+
+def get_session_cache() -> SessionCache:
+    global _session_cache
+    if _session_cache is not None:
+        return _session_cache
+
+    settings = get_settings()
+    backend = settings.session_cache_backend
+    if backend == "redis":
+        cache: SessionCache = RedisSessionCache(
+            settings.session_cache_redis_url or "redis://localhost:6379/0",
+            ttl_seconds=settings.session_cache_ttl_seconds,
+        )
+    elif backend == "memory" and settings.session_cache_ttl_seconds > 0:
+        cache = InMemorySessionCache(
+            ttl_seconds=settings.session_cache_ttl_seconds, max_entries=settings.session_cache_max_entries
+        )
+    else:
+        cache = NullSessionCache()
+    _session_cache = cache
+    return cache
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    for cache, session_ids in session.info.pop(_SESSION_INFO_KEY, ()):
+        cache.invalidate(session_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted(session: Session) -> None:
+    session.info.pop(_SESSION_INFO_KEY, None)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from typing import Any
+
+# A diff between two JSON objects:
+#   {"set": {key: new_value}, "unset": [key, ...], "patch": {key: <nested diff>}}
+# Empty parts are omitted, so an unchanged state diffs to {}. Nested objects are diffed
+# recursively; lists and scalars are replaced wholesale when they change.
+
+
+def diff_state(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Diff that turns `old` into `new` when passed to `apply_state_diff`."""
+
+    set_: dict[str, Any] = {}
+    patch: dict[str, Any] = {}
+    for key, value in new.items():
+        if key not in old:
+            set_[key] = value
+            continue
+        prev = old[key]
+        if prev == value:
+            continue
+        if isinstance(prev, dict) and isinstance(value, dict):
+            patch[key] = diff_state(prev, value)
+        else:
+            set_[key] = value
+    unset = [key for key in old if key not in new]
+
+    out: dict[str, Any] = {}
+    if set_:
+        out["set"] = set_
+    if unset:
+        out["unset"] = unset
+    if patch:
+        out["patch"] = patch
+    return out
+
+
+def apply_state_diff(base: dict[str, Any], diff: dict[str, Any]) -> dict[str, Any]:
+    """Return `base` with `diff` applied. `base` is not modified; unchanged values are shared."""
+
+    if not diff:
+        return base
+    out = dict(base)
+    for key in diff.get("unset") or ():
+        out.pop(key, None)
+    out.update(diff.get("set") or {})
+    for key, sub in (diff.get("patch") or {}).items():
+        prev = out.get(key)
+        out[key] = apply_state_diff(prev if isinstance(prev, dict) else {}, sub)
+    return out
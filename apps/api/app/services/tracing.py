@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Spans kept per run profile; later ones are only counted (the aggregates stay exact).
+_MAX_SPANS = 2000
+
+NODE_SECONDS = METRICS.histogram(
+    "atoms_workflow_node_duration_seconds", "Wall time of a workflow node.", ("node",)
+)
+LLM_SECONDS = METRICS.histogram(
+    "atoms_llm_call_duration_seconds", "Wall time of a chat() call.", ("node", "outcome")
+)
+LLM_TTFT_SECONDS = METRICS.histogram(
+    "atoms_llm_time_to_first_token_seconds", "Time from sending a chat() request to its first text.", ("node",)
+)
+LLM_TOKENS = METRICS.counter("atoms_llm_tokens_total", "Tokens sent to / received from the LLM.", ("node", "direction"))
+LLM_RETRIES = METRICS.counter("atoms_llm_retries_total", "Retried LLM requests.", ("node",))
+RUN_SECONDS = METRICS.histogram("atoms_run_duration_seconds", "Wall time of a run's execution.", ("status",))
+RUN_DB_SECONDS = METRICS.histogram("atoms_run_db_seconds", "Time a run spent in DB queries.", ("status",))
+RUN_DB_QUERIES = METRICS.histogram(
+    "atoms_run_db_queries", "DB queries issued by a run.", ("status",), buckets=(10, 25, 50, 100, 250, 500, 1000, 2500)
+)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class RunProfile:
+    """Spans and per-node aggregates of one run's execution, saved as `run_profile.json`.
+
+    Filled through `CURRENT_RUN_PROFILE` by workflow nodes (`node_span`), `chat()` (`llm_call`)
+    and every DB query issued from the run's context.
+    """
+
+    def __init__(self, run_id: UUID) -> None:
+        self.run_id = run_id
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans: list[dict[str, Any]] = []
+        self._spans_dropped = 0
+        self._nodes: dict[str, dict[str, float]] = {}
+        self._llm: dict[str, float] = {}
+        self._db_queries = 0
+        self._db_seconds = 0.0
+        self._observed = False
+
+    def add_span(self, name: str, kind: str, start: float, end: float, **attrs: Any) -> None:
+        span = {"name": name, "kind": kind, "start_ms": _ms(start - self._t0), "ms": _ms(end - start), **attrs}
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("span", extra={"run_id": str(self.run_id), "span": span})
+        with self._lock:
+            if len(self._spans) < _MAX_SPANS:
+                self._spans.append(span)
+            else:
+                self._spans_dropped += 1
+            node = name if kind == "node" else attrs.get("node")
+            if not node:
+                return
+            stats = self._nodes.setdefault(str(node), {})
+            if kind == "node":
+                self._add(stats, runs=1, ms=span["ms"])
+            elif kind == "llm":
+                llm = {
+                    "llm_calls": 1,
+                    "llm_ms": span["ms"],
+                    "tokens_in": attrs.get("tokens_in") or 0,
+                    "tokens_out": attrs.get("tokens_out") or 0,
+                    "retries": max(0, (attrs.get("attempts") or 1) - 1),
+                    "queue_ms": attrs.get("queue_ms") or 0,
+                }
+                self._add(stats, **llm)
+                self._add(self._llm, **llm)
+                if attrs.get("ttft_ms") is not None:
+                    # The slowest first token of the node's calls.
+                    stats["ttft_ms_max"] = max(stats.get("ttft_ms_max", 0.0), attrs["ttft_ms"])
+
+    def add_db(self, seconds: float) -> None:
+        with self._lock:
+            self._db_queries += 1
+            self._db_seconds += seconds
+
+    @property
+    def db_queries(self) -> int:
+        return self._db_queries
+
+    def summary(self, status: str) -> dict[str, Any]:
+        """The profile as saved; also records the run in the process metrics (once)."""
+
+        wall = time.perf_counter() - self._t0
+        with self._lock:
+            db_seconds, db_queries = self._db_seconds, self._db_queries
+            out = {
+                "run_id": str(self.run_id),
+                "status": status,
+                "wall_ms": _ms(wall),
+                "db": {"queries": db_queries, "ms": _ms(db_seconds)},
+                "llm": dict(self._llm),
+                "nodes": {node: dict(stats) for node, stats in self._nodes.items()},
+                "spans": list(self._spans),
+                "spans_dropped": self._spans_dropped,
+            }
+            observe, self._observed = not self._observed, True
+        if observe:
+            RUN_SECONDS.observe(wall, status=status)
+            RUN_DB_SECONDS.observe(db_seconds, status=status)
+            RUN_DB_QUERIES.observe(db_queries, status=status)
+        return out
+
+    @staticmethod
+    def _add(stats: dict[str, float], **values: float) -> None:
+        for k, v in values.items():
+            stats[k] = round(stats.get(k, 0) + v, 2)
+
+
+# Installed by the executor for the duration of a run (including its DB threads).
+CURRENT_RUN_PROFILE: ContextVar[RunProfile | None] = ContextVar("CURRENT_RUN_PROFILE", default=None)
+# The workflow node being executed, so `chat()` calls are attributed to it.
+CURRENT_NODE: ContextVar[str | None] = ContextVar("CURRENT_NODE", default=None)
+
+
+@contextmanager
+def node_span(node: str) -> Iterator[None]:
+    token = CURRENT_NODE.set(node)
+    start = time.perf_counter()
+    error: str | None = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        CURRENT_NODE.reset(token)
+        NODE_SECONDS.observe(end - start, node=node)
+        profile = CURRENT_RUN_PROFILE.get()
+        if profile is not None:
+            profile.add_span(node, "node", start, end, **({"error": error} if error else {}))
+
+
+class LLMCall:
+    """Measurements of one `chat()` call, filled in by the client while it runs."""
+
+    def __init__(self, role: str | None, tokens_in: int) -> None:
+        self.node = CURRENT_NODE.get() or (role or "").strip() or "none"
+        self.role = role
+        # Set by the client once it picks an endpoint.
+        self.provider: str | None = None
+        self.model: str | None = None
+        self.started = time.perf_counter()
+        # Time spent waiting for the LLM limiter.
+        self.queued_s = 0.0
+        self.first_token_at: float | None = None
+        self.tokens_in = tokens_in
+        self.tokens_out = 0
+        # ok|cached|fallback|circuit_open|throttled|unconfigured|canceled|error
+        self.outcome = "ok"
+        self.attempts = 1
+
+    def first_token(self, at: float | None = None) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = at if at is not None else time.perf_counter()
+
+
+@contextmanager
+def llm_call(role: str | None, tokens_in: int) -> Iterator[LLMCall]:
+    call = LLMCall(role, tokens_in)
+    try:
+        yield call
+    except BaseException:
+        if call.outcome == "ok":
+            call.outcome = "error"
+        raise
+    finally:
+        end = time.perf_counter()
+        LLM_SECONDS.observe(end - call.started, node=call.node, outcome=call.outcome)
+        ttft = call.first_token_at - call.started if call.first_token_at is not None else None
+        if ttft is not None:
+            LLM_TTFT_SECONDS.observe(ttft, node=call.node)
+        if call.outcome not in {"cached", "unconfigured", "circuit_open", "throttled"}:
+            LLM_TOKENS.inc(call.tokens_in, node=call.node, direction="in")
+            LLM_TOKENS.inc(call.tokens_out, node=call.node, direction="out")
+        if call.attempts > 1:
+            LLM_RETRIES.inc(call.attempts - 1, node=call.node)
+        profile = CURRENT_RUN_PROFILE.get()
+        if profile is not None:
+            profile.add_span(
+                "chat",
+                "llm",
+                call.started,
+                end,
+                node=call.node,
+                role=call.role,
+                provider=call.provider,
+                model=call.model,
+                outcome=call.outcome,
+                ttft_ms=_ms(ttft) if ttft is not None else None,
+                queue_ms=_ms(call.queued_s),
+                tokens_in=call.tokens_in,
+                tokens_out=call.tokens_out,
+                attempts=call.attempts,
+            )
+
+
+# Kept on the statement's execution context, so a statement that fails leaves nothing behind.
+_QUERY_STARTED = "_tracing_query_started"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(_conn, _cursor, _statement, _parameters, context, _executemany) -> None:  # type: ignore[no-untyped-def]
+    if context is not None and CURRENT_RUN_PROFILE.get() is not None:
+        setattr(context, _QUERY_STARTED, time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(_conn, _cursor, _statement, _parameters, context, _executemany) -> None:  # type: ignore[no-untyped-def]
+    started = getattr(context, _QUERY_STARTED, None)
+    if started is None:
+        return
+    profile = CURRENT_RUN_PROFILE.get()
+    if profile is not None:
+        profile.add_db(time.perf_counter() - started)
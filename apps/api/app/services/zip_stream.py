@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import zipfile
+from collections.abc import Iterator
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that hands written bytes back to the caller.
+
+    `zipfile` treats it as an unseekable stream and emits data descriptors instead of seeking
+    back to patch local headers, so an archive can be produced front to back.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        return None
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+class ZipStream:
+    """Incremental zip writer: add members one by one and yield the compressed bytes as you go.
+
+    Memory is bounded by the largest single member, not by the archive size.
+
+        zs = ZipStream()
+        for name, data in members:
+            yield from zs.add(name, data)
+        yield from zs.finish()
+    """
+
+    def __init__(self, *, compression: int = zipfile.ZIP_DEFLATED) -> None:
+        self._sink = _ChunkSink()
+        self._zf = zipfile.ZipFile(self._sink, mode="w", compression=compression)
+
+    def add(self, name: str, data: str | bytes) -> Iterator[bytes]:
+        self._zf.writestr(name, data)
+        chunk = self._sink.drain()
+        if chunk:
+            yield chunk
+
+    def finish(self) -> Iterator[bytes]:
+        """Write the central directory."""
+
+        self._zf.close()
+        chunk = self._sink.drain()
+        if chunk:
+            yield chunk
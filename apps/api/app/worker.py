@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from uuid import UUID, uuid4
+
+from app.core.config import get_settings, install_reload_signal_handler
+from app.db.session import SessionLocal, engine
+from app.langgraph.executor import aexecute_run, execute_run
+from app.llm.client import aclose_http_client, close_http_client
+from app.services.event_bus import PostgresEventListener
+from app.services.run_control import RUN_CONTROLS
+from app.services.run_service import RunService
+
+logger = logging.getLogger(__name__)
+
+
+class RunWorkerPool:
+    """Claims queued runs from the `runs` table and executes them on a bounded thread pool.
+
+    Each worker process holds at most `concurrency` runs and keeps their leases alive with a
+    heartbeat. Runs whose worker died (stale heartbeat) are reclaimed by any other worker and resume
+    after their last checkpoint, so the pool can be scaled to N processes independently of the API.
+    A worker that was only slow stops its copy of a reclaimed run as soon as its heartbeat (or the
+    executor's control recheck) sees that the run is no longer its own.
+
+    With `use_async` the runs are coroutines (`aexecute_run`) on a single event-loop thread, so
+    one process can hold hundreds of runs that mostly wait on the LLM.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int | None = None,
+        poll_ms: int | None = None,
+        lease_seconds: int | None = None,
+        worker_id: str | None = None,
+        use_async: bool | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.concurrency = max(1, concurrency or settings.run_worker_concurrency)
+        self.poll_s = max(50, poll_ms or settings.run_worker_poll_ms) / 1000
+        self.lease_seconds = max(5, lease_seconds or settings.run_worker_lease_seconds)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._svc = RunService()
+        self.use_async = settings.run_worker_async if use_async is None else use_async
+        self._executor: ThreadPoolExecutor | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: threading.Thread | None = None
+        if self.use_async:
+            self._loop = asyncio.new_event_loop()
+            self._loop_thread = threading.Thread(
+                target=self._loop.run_forever, name="run-worker-loop", daemon=True
+            )
+            self._loop_thread.start()
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="run-worker")
+        self._active: dict[UUID, Future] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stop claiming new runs; `serve_forever` returns once in-flight runs finish."""
+
+        self._stop.set()
+
+    def claim_once(self) -> UUID | None:
+        """Claim and start at most one run. Returns its id, or None if nothing was claimable."""
+
+        with self._lock:
+            if len(self._active) >= self.concurrency:
+                return None
+        with SessionLocal() as db:
+            run = self._svc.claim_next_run(db, self.worker_id, lease_seconds=self.lease_seconds)
+            run_id = run.id if run else None
+        if run_id is None:
+            return None
+        logger.info("Claimed run", extra={"run_id": str(run_id), "worker": self.worker_id})
+        if self._loop is not None:
+            fut = asyncio.run_coroutine_threadsafe(aexecute_run(run_id, worker_id=self.worker_id), self._loop)
+        else:
+            fut = self._executor.submit(execute_run, run_id, worker_id=self.worker_id)
+        with self._lock:
+            self._active[run_id] = fut
+        fut.add_done_callback(lambda _f, rid=run_id: self._done(rid))
+        return run_id
+
+    def serve_forever(self) -> None:
+        hb = threading.Thread(target=self._heartbeat_loop, name="run-worker-heartbeat", daemon=True)
+        hb.start()
+        logger.info("Run worker started", extra={"worker": self.worker_id, "concurrency": self.concurrency})
+        try:
+            while not self._stop.is_set():
+                try:
+                    claimed = self.claim_once()
+                except Exception:
+                    logger.exception("Claiming a run failed")
+                    claimed = None
+                if claimed is None:
+                    # Nothing to do (or pool saturated): back off until the next poll.
+                    self._stop.wait(self.poll_s)
+        finally:
+            self._drain()
+            self._stop.set()
+            hb.join(timeout=self.poll_s)
+
+    def _drain(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            return
+        with self._lock:
+            in_flight = list(self._active.values())
+        wait(in_flight)
+        assert self._loop is not None and self._loop_thread is not None
+        asyncio.run_coroutine_threadsafe(aclose_http_client(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+
+    def _done(self, run_id: UUID) -> None:
+        with self._lock:
+            fut = self._active.pop(run_id, None)
+        if fut is not None and fut.exception() is not None:
+            logger.error("Run execution crashed", exc_info=fut.exception(), extra={"run_id": str(run_id)})
+
+    def _heartbeat_loop(self) -> None:
+        interval = self.lease_seconds / 3
+        while True:
+            with self._lock:
+                run_ids = list(self._active)
+            if run_ids:
+                try:
+                    with SessionLocal() as db:
+                        owned = self._svc.heartbeat(db, self.worker_id, run_ids)
+                        db.commit()
+                except Exception:
+                    logger.exception("Run heartbeat failed")
+                else:
+                    for run_id in set(run_ids) - owned:
+                        RUN_CONTROLS.revoke(run_id)
+            if self._stop.is_set() and not run_ids:
+                return
+            time.sleep(interval)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    pool = RunWorkerPool()
+
+    def _graceful(_signum, _frame) -> None:  # type: ignore[no-untyped-def]
+        logger.info("Shutdown requested; draining in-flight runs", extra={"worker": pool.worker_id})
+        pool.stop()
+
+    signal.signal(signal.SIGTERM, _graceful)
+    signal.signal(signal.SIGINT, _graceful)
+    install_reload_signal_handler()
+    # Pause/resume/cancel requests for our runs arrive from the API processes via NOTIFY.
+    listener = PostgresEventListener() if engine.dialect.name == "postgresql" else None
+    if listener:
+        listener.start()
+    try:
+        pool.serve_forever()
+    finally:
+        if listener:
+            listener.stop()
+        close_http_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Offline benchmarks for the API (run from `apps/api`, e.g. `python -m benchmarks.bench_llm_client`)."""
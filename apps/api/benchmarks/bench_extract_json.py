@@ -0,0 +1,124 @@
+"""`_extract_json_obj` over synthetic engineer outputs: previous scanner vs. the current one.
+
+The current implementation is timed with orjson (when installed) and with the stdlib decoder.
+
+    python -m benchmarks.bench_extract_json --kb 300 --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from collections.abc import Callable
+
+from app.langgraph import workflow
+
+
+def _previous_extract_json_obj(text: str) -> dict | None:
+    # The character-by-character scanner this replaced, kept verbatim for comparison.
+    t = (text or "").strip()
+    if not t:
+        return None
+    start = t.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_str = False
+    esc = False
+    for i in range(start, len(t)):
+        ch = t[i]
+        if in_str:
+            if esc:
+                esc = False
+                continue
+            if ch == "\\":
+                esc = True
+                continue
+            if ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+            continue
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                candidate = t[start : i + 1]
+                try:
+                    obj = json.loads(candidate)
+                except Exception:
+                    nxt = t.find("{", i + 1)
+                    if nxt < 0:
+                        return None
+                    start = nxt
+                    depth = 0
+                    in_str = False
+                    esc = False
+                    continue
+                return obj if isinstance(obj, dict) else None
+    return None
+
+
+def _outputs(kb: int) -> dict[str, str]:
+    line = "function step(state) { return { ...state, tick: state.tick + 1, label: \"a \\\"b\\\" c\" }; }\n"
+    per_file = max(1, kb * 1024 // 3 // len(line))
+    files = [{"path": p, "content": line * per_file} for p in ("index.html", "app.js", "style.css")]
+    body = json.dumps({"summary": "Generated a demo.", "files": files}, ensure_ascii=False)
+    noise = "Use {placeholders} like {name} in templates. " * 500
+    return {
+        "json only": body,
+        "prose around": f"Here is the result:\n{body}\nLet me know if you need changes.",
+        "fenced": f"Sure!\n```json\n{body}\n```\n",
+        "brace noise first": f"{noise}\n{body}",
+        "unclosed brace first": "Note: the { in the header is intentional.\n" + body,
+    }
+
+
+def _time(fn: Callable[[str], dict | None], text: str, repeat: int) -> tuple[float, bool]:
+    samples = []
+    found = False
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        found = fn(text) is not None
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000, found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kb", type=int, default=300, help="approximate size of the generated files")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    orjson_loads = workflow._ORJSON_LOADS
+
+    def stdlib_only(text: str) -> dict | None:
+        workflow._ORJSON_LOADS = None
+        try:
+            return workflow._extract_json_obj(text)
+        finally:
+            workflow._ORJSON_LOADS = orjson_loads
+
+    impls: list[tuple[str, Callable[[str], dict | None]]] = [
+        ("previous", _previous_extract_json_obj),
+        ("current/stdlib", stdlib_only),
+    ]
+    if orjson_loads is not None:
+        impls.append(("current/orjson", workflow._extract_json_obj))
+
+    print(f"{'output':<22}{'KB':>6}" + "".join(f"{name:>18}" for name, _ in impls))
+    for label, text in _outputs(args.kb).items():
+        cells = []
+        for _, fn in impls:
+            ms, found = _time(fn, text, args.repeat)
+            cells.append(f"{ms:>12.2f} ms{'' if found else ' ✗':>4}")
+        print(f"{label:<22}{len(text) // 1024:>6}" + "".join(f"{c:>18}" for c in cells))
+    print("✗ = no JSON object extracted")
+
+
+if __name__ == "__main__":
+    main()
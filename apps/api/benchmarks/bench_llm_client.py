@@ -0,0 +1,62 @@
+"""Connection reuse in `app.llm.client.chat`: pooled client vs. a new client per call.
+
+A team run makes one LLM call per role, so `--calls-per-run 7` approximates a full team run.
+
+    python -m benchmarks.bench_llm_client --runs 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import httpx
+
+from benchmarks.llm_stub import LLMStub
+
+
+def _per_call_client(base_url: str, payload: dict) -> None:
+    # Pre-pooling behaviour: every call paid connection setup again.
+    with httpx.Client(timeout=60) as client:
+        client.post(f"{base_url}/chat/completions", json=payload).raise_for_status()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--calls-per-run", type=int, default=7)
+    args = parser.parse_args()
+
+    with LLMStub() as stub:
+        os.environ.update(DEEPSEEK_API_KEY="bench", DEEPSEEK_API_BASE=stub.base_url, DEEPSEEK_MODEL="stub")
+        from app.llm.client import ChatMessage, chat, close_http_client
+
+        messages = [ChatMessage(role="user", content="hello")]
+        payload = {"model": "stub", "messages": [{"role": "user", "content": "hello"}]}
+        total = args.runs * args.calls_per_run
+
+        conns0 = stub.connections
+        t0 = time.perf_counter()
+        for _ in range(total):
+            _per_call_client(stub.base_url, payload)
+        per_call_s = time.perf_counter() - t0
+        per_call_conns = stub.connections - conns0
+
+        conns0 = stub.connections
+        t0 = time.perf_counter()
+        for _ in range(total):
+            chat(messages=messages)
+        pooled_s = time.perf_counter() - t0
+        pooled_conns = stub.connections - conns0
+        close_http_client()
+
+    print(f"{args.runs} runs x {args.calls_per_run} calls")
+    print(
+        f"  client per call: {per_call_s / args.runs * 1000:8.2f} ms/run, {per_call_conns / args.runs:6.2f} conns/run"
+    )
+    print(f"  pooled client:   {pooled_s / args.runs * 1000:8.2f} ms/run, {pooled_conns / args.runs:6.2f} conns/run")
+
+
+if __name__ == "__main__":
+    main()
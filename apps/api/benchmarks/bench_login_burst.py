@@ -0,0 +1,81 @@
+"""Latency of unrelated requests while a burst of logins is in flight.
+
+Fires `--logins` concurrent logins and, at the same time, a steady stream of `/api/auth/me`
+requests, then reports p50/p99 for both. bcrypt runs on the password-hasher pool, so `/me` latency
+should stay close to its idle baseline.
+
+    python -m benchmarks.bench_login_burst --logins 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import httpx
+
+
+def _pct(samples: list[float], p: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(p) - 1] * 1000 if len(samples) > 1 else 0.0
+
+
+async def _timed(coro) -> float:  # type: ignore[no-untyped-def]
+    t0 = time.perf_counter()
+    r = await coro
+    r.raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.db.base import Base
+    from app.db.session import engine
+    from app.main import create_app
+
+    Base.metadata.create_all(bind=engine)
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        suffix = uuid.uuid4().hex[:8]
+        creds = {"email": f"bench{suffix}@example.com", "password": "password123"}
+        r = await client.post("/api/auth/signup", json={"username": f"bench{suffix}", **creds})
+        r.raise_for_status()
+
+        async def probe(n: int) -> list[float]:
+            out = []
+            for _ in range(n):
+                out.append(await _timed(client.get("/api/auth/me")))
+                await asyncio.sleep(0.005)
+            return out
+
+        idle = await probe(args.probes)
+        logins = asyncio.gather(
+            *(_timed(client.post("/api/auth/login", json=creds)) for _ in range(args.logins)),
+            return_exceptions=True,
+        )
+        busy, login_results = await asyncio.gather(probe(args.probes), logins)
+
+    login_s = [r for r in login_results if isinstance(r, float)]
+    print(f"{args.logins} concurrent logins ({args.logins - len(login_s)} rejected or failed)")
+    print(f"  login:      p50 {_pct(login_s, 50):8.2f} ms   p99 {_pct(login_s, 99):8.2f} ms")
+    print(f"  /me idle:   p50 {_pct(idle, 50):8.2f} ms   p99 {_pct(idle, 99):8.2f} ms")
+    print(f"  /me busy:   p50 {_pct(busy, 50):8.2f} ms   p99 {_pct(busy, 99):8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=100)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="bench-login-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{db_dir}/bench.db")
+    os.environ.setdefault("TEST_MODE", "true")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
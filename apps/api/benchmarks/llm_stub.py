@@ -0,0 +1,158 @@
+"""Minimal local OpenAI-compatible `/chat/completions` stub for benchmarks.
+
+Speaks HTTP/1.1 with keep-alive so connection reuse by clients is observable via
+`LLMStub.connections`. Latency (`delay` before the first byte, `tokens_per_second` while
+streaming), chunk sizes and failures (`fail_rate` error responses, `drop_rate` streams cut off
+mid-reply) are configurable so end-to-end runs can be benchmarked without a real provider.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LLMStub:
+    def __init__(
+        self,
+        *,
+        reply: str = '{"summary": "ok", "files": []}',
+        delay: float = 0.0,
+        chunk_size: int | tuple[int, int] = 16,
+        chunk_delay: float = 0.0,
+        tokens_per_second: float = 0.0,
+        fail_rate: float = 0.0,
+        fail_status: int = 500,
+        retry_after: float | None = None,
+        drop_rate: float = 0.0,
+        seed: int | None = None,
+        host: str = "127.0.0.1",
+    ) -> None:
+        self.reply = reply
+        self.delay = delay
+        # A fixed size, or a (min, max) range drawn per chunk.
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        # Streaming pace (~4 characters per token); 0 streams as fast as the socket allows.
+        self.tokens_per_second = tokens_per_second
+        # Share of requests answered with `fail_status` (and `Retry-After` if set) instead of a reply.
+        self.fail_rate = fail_rate
+        # The next N requests fail regardless of `fail_rate` (deterministic failures for tests).
+        self.fail_next = 0
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        # Share of streamed replies whose connection is closed halfway through.
+        self.drop_rate = drop_rate
+        self.connections = 0
+        self.requests = 0
+        self.failures = 0
+        self.drops = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *_args: object) -> None:
+                return
+
+            def do_POST(self) -> None:  # noqa: N802
+                length = int(self.headers.get("content-length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub.fail_next > 0 or stub._random.random() < stub.fail_rate
+                    stub.fail_next = max(0, stub.fail_next - 1)
+                    drop = not fail and stub._random.random() < stub.drop_rate
+                    stub.failures += fail
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if fail:
+                    self._fail()
+                elif body.get("stream"):
+                    self._stream(stub.reply, drop=drop)
+                else:
+                    self._complete(stub.reply)
+
+            def _fail(self) -> None:
+                raw = json.dumps({"error": {"message": "injected failure", "type": "stub_error"}}).encode()
+                self.send_response(stub.fail_status)
+                if stub.retry_after is not None:
+                    self.send_header("retry-after", f"{stub.retry_after:g}")
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _complete(self, text: str) -> None:
+                raw = json.dumps({"choices": [{"message": {"role": "assistant", "content": text}}]}).encode()
+                self.send_response(200)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _stream(self, text: str, *, drop: bool = False) -> None:
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("transfer-encoding", "chunked")
+                self.end_headers()
+                i = 0
+                while i < len(text):
+                    if drop and i >= len(text) // 2:
+                        with stub._lock:
+                            stub.drops += 1
+                        self.close_connection = True
+                        return
+                    piece = text[i : i + stub._next_chunk_size()]
+                    i += len(piece)
+                    delta = {"choices": [{"delta": {"content": piece}}]}
+                    try:
+                        self._chunk(f"data: {json.dumps(delta)}\n\n".encode())
+                    except OSError:
+                        return  # client went away mid-stream
+                    pause = stub.chunk_delay
+                    if stub.tokens_per_second > 0:
+                        pause += len(piece) / 4 / stub.tokens_per_second
+                    if pause:
+                        time.sleep(pause)
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+            def _chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        self._server = ThreadingHTTPServer((host, 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def _next_chunk_size(self) -> int:
+        if isinstance(self.chunk_size, tuple):
+            low, high = self.chunk_size
+            with self._lock:
+                return max(1, self._random.randint(low, high))
+        return max(1, self.chunk_size)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> LLMStub:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
 import os
 from pathlib import Path
 import sys
@@ -25,6 +27,22 @@ def _test_env(tmp_path_factory: pytest.TempPathFactory) -> None:
     os.environ["DEEPSEEK_API_KEY"] = ""
     os.environ["DEEPSEEK_API_BASE"] = ""
     os.environ["DEEPSEEK_MODEL"] = ""
+    # Cheapest bcrypt cost: password hashing dominates test time otherwise.
+    os.environ["BCRYPT_ROUNDS"] = "4"
+
+    from app.core.config import reload_settings
+
+    reload_settings()
+
+
+@pytest.fixture()
+def settings_override() -> Iterator[Callable[..., None]]:
+    """`settings_override(field=value, ...)` replaces settings fields until the test ends."""
+
+    from app.core.config import override_settings
+
+    with ExitStack() as stack:
+        yield lambda **changes: stack.enter_context(override_settings(**changes))
 
 
 @pytest.fixture()
@@ -39,3 +57,15 @@ def client() -> TestClient:
     Base.metadata.create_all(bind=engine)
     app = create_app()
     return TestClient(app)
+
+
+@pytest.fixture()
+def llm_events() -> Iterator[list[tuple[str, str, dict]]]:
+    """Events `chat()` reports (retries, failover, circuit state) as (type, message, data)."""
+
+    from app.llm.client import LLM_EVENT_EMITTER
+
+    events: list[tuple[str, str, dict]] = []
+    token = LLM_EVENT_EMITTER.set(lambda *, type, message, data: events.append((type, message, data)))
+    yield events
+    LLM_EVENT_EMITTER.reset(token)
@@ -85,3 +85,179 @@ def test_password_reset_request_unknown_email_does_not_leak(client):
 
     r = client.get("/api/auth/me")
     assert r.status_code == 200
+
+
+def test_session_lookup_is_cached_until_revoked(client):
+    from sqlalchemy import event
+
+    from app.db.session import engine
+
+    suffix = uuid.uuid4().hex[:8]
+    email = f"cache{suffix}@example.com"
+    client.post("/api/auth/signup", json={"username": f"cache{suffix}", "email": email, "password": "password123"})
+    assert client.get("/api/auth/me").status_code == 200
+
+    session_selects: list[str] = []
+
+    def _record(_conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+        if statement.lstrip().upper().startswith("SELECT") and "sessions" in statement:
+            session_selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        r = client.get("/api/auth/me")
+        assert r.status_code == 200
+        assert r.json()["user"]["email"] == email
+        assert client.get("/api/projects").status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert session_selects == []
+
+    # A password reset revokes every session of the user, cached or not.
+    token = client.post("/api/auth/password-reset/request", json={"email": email}).json()["reset_token"]
+    r = client.post("/api/auth/password-reset/confirm", json={"token": token, "new_password": "newpassword123"})
+    assert r.status_code == 200
+    assert client.get("/api/auth/me").status_code == 401
+
+
+def test_in_memory_session_cache_ttl_and_lru():
+    from datetime import UTC, datetime, timedelta
+
+    from app.services.session_cache import InMemorySessionCache, SessionSnapshot
+
+    def snap(expires_in: float) -> SessionSnapshot:
+        expires_at = datetime.now(tz=UTC) + timedelta(seconds=expires_in)
+        return SessionSnapshot(user_id=uuid.uuid4(), email=None, username=None, expires_at=expires_at)
+
+    cache = InMemorySessionCache(ttl_seconds=60, max_entries=2)
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    cache.set(a, snap(3600))
+    cache.set(b, snap(3600))
+    assert cache.get(a) is not None  # `a` is now the most recently used
+    cache.set(c, snap(3600))
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+
+    # Never cached past the session's own expiry.
+    cache.set(b, snap(-1))
+    assert cache.get(b) is None
+
+    cache.invalidate([a, c])
+    assert cache.get(a) is None and cache.get(c) is None
+
+
+def test_redis_session_cache_fails_open_to_the_db(client, settings_override, monkeypatch, caplog):
+    import sys
+    import types
+
+    from app.services import session_cache
+
+    class DownRedis:
+        def __getattr__(self, _name):
+            def fail(*_args, **_kwargs):
+                raise ConnectionError("redis is down")
+
+            return fail
+
+    fake = types.ModuleType("redis")
+    fake.Redis = types.SimpleNamespace(from_url=lambda _url: DownRedis())
+    monkeypatch.setitem(sys.modules, "redis", fake)
+    monkeypatch.setattr(session_cache, "_session_cache", None)
+    settings_override(session_cache_backend="redis")
+
+    suffix = uuid.uuid4().hex[:8]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": f"redis{suffix}", "email": f"redis{suffix}@example.com", "password": "password123"},
+    )
+    assert r.status_code == 200
+    assert isinstance(session_cache.get_session_cache(), session_cache.RedisSessionCache)
+    # Every cache call fails; requests are authenticated against the DB instead.
+    assert client.get("/api/auth/me").status_code == 200
+    assert client.post("/api/auth/logout").status_code == 200
+    assert client.get("/api/auth/me").status_code == 401
+    assert "Session cache lookup failed" in caplog.text
+
+
+def test_login_upgrades_cheaper_password_hashes(client, settings_override):
+    from sqlalchemy import select
+
+    from app.db.models.user import User
+    from app.db.session import SessionLocal
+
+    suffix = uuid.uuid4().hex[:8]
+    email = f"rehash{suffix}@example.com"
+    client.post("/api/auth/signup", json={"username": f"rehash{suffix}", "email": email, "password": "password123"})
+    with SessionLocal() as db:
+        old_hash = db.execute(select(User.password_hash).where(User.email == email)).scalar_one()
+    assert old_hash.startswith("$2b$04$")
+
+    settings_override(bcrypt_rounds=5)
+    assert client.post("/api/auth/login", json={"email": email, "password": "password123"}).status_code == 200
+    with SessionLocal() as db:
+        new_hash = db.execute(select(User.password_hash).where(User.email == email)).scalar_one()
+    assert new_hash.startswith("$2b$05$")
+    assert client.post("/api/auth/login", json={"email": email, "password": "password123"}).status_code == 200
+
+    stats = client.get("/api/health").json()["password_hasher"]
+    assert stats["pending"] == 0 and stats["completed"] >= 3
+
+
+def test_password_hasher_rejects_past_its_queue_bound():
+    import asyncio
+
+    from app.services.security import PasswordHasher, PasswordHasherBusy
+
+    hasher = PasswordHasher(workers=1, max_pending=2)
+
+    async def burst() -> list[object]:
+        return await asyncio.gather(*(hasher.hash("password123") for _ in range(3)), return_exceptions=True)
+
+    try:
+        results = asyncio.run(burst())
+    finally:
+        hasher.shutdown()
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 1
+    assert sum(isinstance(r, str) for r in results) == 2
+    assert isinstance(results[-1], PasswordHasherBusy)  # the last submission found the queue full
+    assert hasher.stats()["rejected"] == 1
+
+
+def test_password_hasher_counts_cancelled_calls_until_their_job_ends():
+    import asyncio
+    import threading
+
+    import pytest
+
+    from app.services.security import PasswordHasher, PasswordHasherBusy
+
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario() -> None:
+        # The request awaiting a running job goes away (e.g. the client disconnected)...
+        running = asyncio.ensure_future(hasher._run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        await asyncio.sleep(0)
+        # ...but bcrypt is still busy, so the call still holds its slot.
+        assert hasher.stats()["pending"] == 1
+        # A call cancelled while queued never runs and frees its slot at once.
+        queued = asyncio.ensure_future(hasher._run(release.wait, 5))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.sleep(0.05)
+        assert hasher.stats()["pending"] == 1
+        kept = asyncio.ensure_future(hasher._run(release.wait, 5))
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher._run(release.wait, 5)
+        release.set()
+        assert await kept is True
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+    stats = hasher.stats()
+    assert stats["pending"] == 0 and stats["completed"] == 2 and stats["rejected"] == 1
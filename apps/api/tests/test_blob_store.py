@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import func, select
+
+
+def _engineer_run(client, text: str) -> str:
+    run_id = client.post("/api/runs", json={"input": text, "mode": "engineer"}).json()["id"]
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "succeeded"
+    return run_id
+
+
+def test_identical_artifacts_share_one_blob(client):
+    from app.db.models.artifact_blob import ArtifactBlob
+    from app.db.models.run_artifact import RunArtifact
+    from app.db.session import SessionLocal
+
+    suffix = uuid.uuid4().hex[:8]
+    client.post(
+        "/api/auth/signup",
+        json={"username": f"b{suffix}", "email": f"b{suffix}@example.com", "password": "password123"},
+    )
+    # The snake fallback emits the same demo files every time.
+    first = _engineer_run(client, "snake game")
+    with SessionLocal() as db:
+        blobs_after_first = db.execute(select(func.count()).select_from(ArtifactBlob)).scalar_one()
+    second = _engineer_run(client, "snake game")
+    with SessionLocal() as db:
+        blobs = db.execute(select(func.count()).select_from(ArtifactBlob)).scalar_one()
+        # Only the run's own run_profile.json (timings differ per run) needs a new blob.
+        assert blobs == blobs_after_first + 1
+        runs = [uuid.UUID(first), uuid.UUID(second)]
+        index_blobs = db.execute(
+            select(RunArtifact.blob_sha256).where(RunArtifact.run_id.in_(runs), RunArtifact.name == "index.html")
+        ).scalars().all()
+        assert len(index_blobs) == 2 and len(set(index_blobs)) == 1
+
+    arts = client.get(f"/api/runs/{second}/artifacts").json()["artifacts"]
+    index = next(a for a in arts if a["name"] == "index.html")
+    detail = client.get(f"/api/runs/{second}/artifacts/{index['id']}").json()
+    assert "<canvas" in detail["content_text"]
+    first_arts = client.get(f"/api/runs/{first}/artifacts").json()["artifacts"]
+    first_index = next(a for a in first_arts if a["name"] == "index.html")
+    first_detail = client.get(f"/api/runs/{first}/artifacts/{first_index['id']}").json()
+    assert first_detail["content_text"] == detail["content_text"]
+    final = next(a for a in arts if a["name"] == "final_output.json")
+    assert client.get(f"/api/runs/{second}/artifacts/{final['id']}").json()["content_json"]["mode"] == "engineer"
+
+
+def test_garbage_collection_removes_blobs_once_their_artifacts_are_gone(client, monkeypatch, tmp_path):
+    from app.db.models.artifact_blob import ArtifactBlob
+    from app.db.models.run_artifact import RunArtifact
+    from app.db.session import SessionLocal
+    from app.services import blob_store
+    from app.services.blob_store import BlobStore, FilesystemBlobBackend
+    from app.services.run_service import RunService
+
+    store = BlobStore(FilesystemBlobBackend(tmp_path))
+    monkeypatch.setattr(blob_store, "_blob_store", store)
+    suffix = uuid.uuid4().hex[:8]
+    client.post(
+        "/api/auth/signup",
+        json={"username": f"g{suffix}", "email": f"g{suffix}@example.com", "password": "password123"},
+    )
+    run_id = uuid.UUID(_engineer_run(client, "snake game"))
+    body = f"notes {suffix}"
+    svc = RunService()
+    with SessionLocal() as db:
+        first = svc.add_artifact(db, run_id, name="notes.txt", mime_type="text/plain", content_text=body)
+        second = svc.add_artifact(db, run_id, name="copy.txt", mime_type="text/plain", content_text=body)
+        db.commit()
+        sha = first.blob_sha256
+        assert second.blob_sha256 == sha and store.get(db, sha) == body.encode()
+        store.collect_garbage(db)
+        assert db.get(ArtifactBlob, sha) is not None
+
+        # Removing one artifact keeps the blob for the other; removing both releases it.
+        db.delete(db.get(RunArtifact, first.id))
+        db.commit()
+        store.collect_garbage(db)
+        assert db.get(ArtifactBlob, sha) is not None and store.backend.path(sha).exists()
+        db.delete(db.get(RunArtifact, second.id))
+        db.commit()
+        assert store.collect_garbage(db) >= 1
+        assert db.get(ArtifactBlob, sha) is None
+    assert not store.backend.path(sha).exists()
+    # The run's other artifacts are untouched.
+    arts = client.get(f"/api/runs/{run_id}/artifacts").json()["artifacts"]
+    index = next(a for a in arts if a["name"] == "index.html")
+    assert "<canvas" in client.get(f"/api/runs/{run_id}/artifacts/{index['id']}").json()["content_text"]
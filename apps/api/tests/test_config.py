@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+import signal
+import time
+
+import pydantic
+import pytest
+
+
+def test_settings_are_cached_and_reloaded_explicitly(monkeypatch):
+    from app.core.config import get_settings, override_settings, reload_settings
+
+    settings = get_settings()
+    assert get_settings() is settings
+    with pytest.raises(pydantic.ValidationError):
+        settings.team_schedule = "parallel"
+
+    monkeypatch.setenv("TEAM_MAX_CONCURRENCY", "7")
+    assert get_settings().team_max_concurrency == settings.team_max_concurrency
+    try:
+        assert reload_settings().team_max_concurrency == 7
+        assert get_settings().team_max_concurrency == 7
+
+        with override_settings(team_max_concurrency=2) as overridden:
+            assert get_settings() is overridden
+            assert overridden.team_max_concurrency == 2
+        assert get_settings().team_max_concurrency == 7
+    finally:
+        monkeypatch.undo()
+        reload_settings()
+
+
+def test_llm_provider_settings_from_env(monkeypatch):
+    from app.core.config import load_settings
+
+    monkeypatch.setenv(
+        "LLM_PROVIDERS", '{"fast": {"api_base": ["https://a", "https://b"], "api_key": "k", "model": "m"}}'
+    )
+    monkeypatch.setenv("LLM_ROUTES", "default=deepseek, seo_expert=fast|deepseek ,engineer=")
+    settings = load_settings()
+    assert settings.llm_providers["fast"]["api_base"] == ["https://a", "https://b"]
+    assert settings.llm_routes == {"default": ["deepseek"], "seo_expert": ["fast", "deepseek"], "engineer": []}
+
+
+def test_reload_follows_dotenv_edits(tmp_path, monkeypatch):
+    from app.core import config
+
+    env_file = tmp_path / ".env"
+    env_file.write_text("LLM_MAX_RETRIES=7\nLLM_BREAKER_FAILURES=9\n")
+    monkeypatch.setattr(config, "_dotenv_path", lambda: str(env_file))
+    monkeypatch.delenv("LLM_MAX_RETRIES", raising=False)
+    monkeypatch.setenv("LLM_BREAKER_FAILURES", "4")
+    try:
+        assert config.reload_settings().llm_max_retries == 7
+        env_file.write_text("LLM_MAX_RETRIES=3\nLLM_BREAKER_FAILURES=9\n")
+        settings = config.reload_settings()
+        assert settings.llm_max_retries == 3
+        # Exported variables still win over the file.
+        assert settings.llm_breaker_failures == 4
+
+        env_file.write_text("")
+        assert config.reload_settings().llm_max_retries == 2
+        assert "LLM_MAX_RETRIES" not in os.environ
+    finally:
+        monkeypatch.undo()
+        config.reload_settings()
+
+
+def test_sighup_reloads_off_the_signal_handler(monkeypatch):
+    from app.core.config import get_settings, install_reload_signal_handler, reload_settings
+
+    previous = signal.getsignal(signal.SIGHUP)
+    try:
+        assert install_reload_signal_handler()
+
+        def wait_for(value: int) -> None:
+            deadline = time.monotonic() + 5
+            while get_settings().team_max_concurrency != value and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert get_settings().team_max_concurrency == value
+
+        monkeypatch.setenv("TEAM_MAX_CONCURRENCY", "5")
+        os.kill(os.getpid(), signal.SIGHUP)
+        wait_for(5)
+
+        # A broken environment is logged and the current settings stay in place.
+        monkeypatch.setenv("TEAM_MAX_CONCURRENCY", "lots")
+        os.kill(os.getpid(), signal.SIGHUP)
+        time.sleep(0.2)
+        monkeypatch.setenv("TEAM_MAX_CONCURRENCY", "6")
+        os.kill(os.getpid(), signal.SIGHUP)
+        wait_for(6)
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+        monkeypatch.undo()
+        reload_settings()
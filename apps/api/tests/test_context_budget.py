@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import uuid
+
+
+def test_role_context_keeps_recent_outputs_and_summarizes_older_ones(settings_override):
+    from app.langgraph.context_budget import build_role_context, estimate_tokens
+
+    settings_override(team_context_max_tokens=400, team_context_recent_outputs=1, team_context_summary_tokens=20)
+    outputs = {
+        "team_lead": "计划：先做原型\n" + "细节 " * 500,
+        "seo_expert": "Keywords first.\n" + "filler " * 500,
+        "product_manager": "MVP scope: login, dashboard.",
+    }
+    ctx = build_role_context(outputs, role="data_analyst")
+    assert ctx.tokens <= 400
+    assert ctx.unbudgeted_tokens > 1000
+    assert "product_manager: MVP scope: login, dashboard." in ctx.text
+    # Older outputs survive only as their leading lines.
+    assert "seo_expert: Keywords first." in ctx.text
+    assert "filler " * 50 not in ctx.text
+
+    settings_override(team_context_role_max_tokens={"data_analyst": 30})
+    ctx = build_role_context(outputs, role="data_analyst")
+    assert ctx.tokens <= 30
+    assert ctx.text.startswith("product_manager:")  # the oldest are dropped first
+    assert estimate_tokens("你好") == 2 and estimate_tokens("abcdefgh") == 2
+
+
+def test_team_prompts_record_budgeted_context_metrics(client):
+    from app.langgraph.context_budget import files_overview
+
+    username = f"u{uuid.uuid4().hex[:8]}"
+    client.post(
+        "/api/auth/signup", json={"username": username, "email": f"{username}@example.com", "password": "password123"}
+    )
+    r = client.post("/api/runs", json={"input": "build a landing page " * 200, "mode": "team"})
+    run_id = r.json()["id"]
+    events = client.get(f"/api/runs/{run_id}/events").json()["events"]
+    metrics = {e["data"]["node"]: e["data"] for e in events if e["type"] == "llm.prompt"}
+    assert {"team_lead", "product_manager", "architect", "engineer"} <= set(metrics)
+    pm = metrics["product_manager"]
+    assert pm["calls"] == 1 and pm["prompt_tokens"] > 0 and pm["latency_ms"] >= 0
+    assert 0 < pm["context_tokens"] <= pm["context_tokens_unbudgeted"]
+
+    assert files_overview([{"path": "a.js", "content": "x" * 10}, {"path": ""}]) == "- a.js (10 bytes)"
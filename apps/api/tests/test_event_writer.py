@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import select
+
+
+def _make_run(client) -> uuid.UUID:
+    suffix = uuid.uuid4().hex[:8]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": f"w{suffix}", "email": f"w{suffix}@example.com", "password": "password123"},
+    )
+    assert r.status_code == 200
+    from app.db.models.run import Run
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        user_id = uuid.UUID(r.json()["user"]["id"])
+        run = Run(user_id=user_id, status="running", mode="engineer", input="x")
+        db.add(run)
+        db.commit()
+        return run.id
+
+
+def _seqs(run_id: uuid.UUID) -> list[tuple[int, str]]:
+    from app.db.models.run_event import RunEvent
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        rows = db.execute(select(RunEvent).where(RunEvent.run_id == run_id).order_by(RunEvent.seq)).scalars()
+        return [(e.seq, e.type) for e in rows]
+
+
+def test_writer_buffers_and_numbers_events(client):
+    from app.services.event_writer import RunEventWriter
+
+    run_id = _make_run(client)
+    writer = RunEventWriter(run_id, flush_ms=60_000, batch_size=3)
+    writer.emit(type="a", message="", data=None)
+    writer.emit(type="b", message="", data=None)
+    assert _seqs(run_id) == []
+
+    writer.emit(type="c", message="", data=None)  # batch full -> flushed
+    assert _seqs(run_id) == [(1, "a"), (2, "b"), (3, "c")]
+
+    writer.emit(type="d", message="", data={"k": 1})
+    writer.close()
+    assert _seqs(run_id) == [(1, "a"), (2, "b"), (3, "c"), (4, "d")]
+
+
+def test_writer_reseeds_after_concurrent_insert(client):
+    from app.db.session import SessionLocal
+    from app.services.event_writer import RunEventWriter
+    from app.services.run_service import RunService
+
+    run_id = _make_run(client)
+    writer = RunEventWriter(run_id, flush_ms=60_000, batch_size=100)
+    writer.emit(type="a", message="", data=None)
+    writer.flush()
+
+    # Another writer (e.g. the cancel endpoint) takes seq=2 behind our back.
+    with SessionLocal() as db:
+        RunService().add_event(db, run_id, type="external", message="", data={})
+        db.commit()
+
+    writer.emit(type="b", message="", data=None)
+    writer.close()
+    assert _seqs(run_id) == [(1, "a"), (2, "external"), (3, "b")]
+
+
+def test_writer_seeds_once_in_callers_transactions(client):
+    from sqlalchemy import event
+
+    from app.db.session import SessionLocal, engine
+    from app.services.event_writer import RunEventWriter
+    from app.services.run_service import RunService
+
+    run_id = _make_run(client)
+    writer = RunEventWriter(run_id, flush_ms=60_000, batch_size=100)
+    max_queries: list[str] = []
+
+    def _record(_conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+        if "max(run_events.seq)" in statement.lower():
+            max_queries.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        for step in ("a", "b", "c"):
+            with SessionLocal() as db:
+                writer.emit(type=step, message="", data=None)
+                writer.flush(db)
+                db.commit()
+        assert len(max_queries) == 1
+
+        # Another writer takes seq=4: our batch lands after it without failing the transaction.
+        with SessionLocal() as db:
+            RunService().add_event(db, run_id, type="external", message="", data={})
+            db.commit()
+        with SessionLocal() as db:
+            writer.emit(type="d", message="", data=None)
+            writer.flush(db)
+            db.commit()
+
+        # A rolled-back transaction never wrote its events; the counter is re-seeded afterwards.
+        with SessionLocal() as db:
+            writer.emit(type="lost", message="", data=None)
+            writer.flush(db)
+            db.rollback()
+        max_queries.clear()
+        with SessionLocal() as db:
+            writer.emit(type="e", message="", data=None)
+            writer.flush(db)
+            db.commit()
+        assert len(max_queries) == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert _seqs(run_id) == [(1, "a"), (2, "b"), (3, "c"), (4, "external"), (5, "d"), (6, "e")]
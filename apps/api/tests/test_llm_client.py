@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+
+@pytest.fixture()
+def llm_stub(settings_override):
+    from benchmarks.llm_stub import LLMStub
+
+    with LLMStub(reply='{"summary": "streamed reply", "files": []}') as stub:
+        settings_override(deepseek_api_key="test-key", deepseek_api_base=stub.base_url, deepseek_model="stub")
+        yield stub
+    from app.llm import resilience
+    from app.llm.client import close_http_client
+
+    close_http_client()
+    # Breakers are keyed by endpoint; a later stub may get the same port.
+    resilience._breakers.clear()
+
+
+def _stream(fn):
+    from app.llm.client import LLM_STREAM_EMITTER, ChatMessage
+
+    deltas: list[str] = []
+    token = LLM_STREAM_EMITTER.set(lambda _role, d: deltas.append(d))
+    try:
+        out = fn(messages=[ChatMessage(role="user", content="hi")], stream=True, event_role="engineer")
+    finally:
+        LLM_STREAM_EMITTER.reset(token)
+    return out, deltas
+
+
+def test_chat_and_achat_agree(llm_stub):
+    from app.llm.client import ChatMessage, achat, chat
+
+    messages = [ChatMessage(role="user", content="hi")]
+    assert chat(messages=messages) == '{"summary": "streamed reply", "files": []}'
+
+    async def _async() -> str:
+        from app.llm.client import aclose_http_client
+
+        try:
+            return await achat(messages=messages)
+        finally:
+            await aclose_http_client()
+
+    assert asyncio.run(_async()) == chat(messages=messages)
+
+
+def test_streaming_parses_sse_in_both_clients(llm_stub):
+    from app.llm.client import achat, chat
+
+    out, deltas = _stream(chat)
+    assert out == '{"summary": "streamed reply", "files": []}'
+    assert "".join(deltas) == out
+
+    async def _async(**kwargs) -> str:
+        from app.llm.client import aclose_http_client
+
+        try:
+            return await achat(**kwargs)
+        finally:
+            await aclose_http_client()
+
+    aout, adeltas = _stream(lambda **kw: asyncio.run(_async(**kw)))
+    assert aout == out
+    assert "".join(adeltas) == out
+
+
+def test_stream_deltas_add_up_to_the_output(llm_stub):
+    from app.llm.client import chat
+
+    llm_stub.reply = "  \n" + " ".join(f"word{i}" for i in range(200)) + "  \n\n "
+    llm_stub.chunk_size = 3
+    out, deltas = _stream(chat)
+    assert out == llm_stub.reply.strip()
+    assert "".join(deltas) == out
+    # Coalesced: far fewer emissions than the stub's 3-character chunks.
+    assert len(deltas) < len(llm_stub.reply) // 3 // 4
+
+
+def test_delta_coalescer_flushes_by_size_and_on_finish():
+    from app.llm.client import _DeltaCoalescer
+
+    emitted: list[str] = []
+    coalescer = _DeltaCoalescer(emitted.append, min_chars=8, max_delay_s=3600)
+    for piece in [" ", "ab", "c ", " ", "defgh", "  ", "ij", " \n"]:
+        coalescer.add(piece)
+    assert emitted == ["abc  defgh"]
+    coalescer.finish()
+    assert "".join(emitted) == "abc  defgh  ij"
+
+
+def test_response_cache_memory_tier_and_stream_replay(llm_stub, settings_override):
+    from app.llm.client import ChatMessage, chat
+
+    settings_override(llm_cache="memory")
+    messages = [ChatMessage(role="user", content="hi")]
+    first = chat(messages=messages)
+    requests = llm_stub.requests
+    # Whitespace-only differences hit the same entry; another temperature does not.
+    assert chat(messages=[ChatMessage(role="user", content="  hi \n")]) == first
+    assert llm_stub.requests == requests
+
+    out, deltas = _stream(chat)
+    assert out == first and "".join(deltas) == first
+    assert llm_stub.requests == requests
+
+    chat(messages=messages, temperature=0.7)
+    assert llm_stub.requests == requests + 1
+
+
+def test_response_cache_db_tier_survives_memory_eviction(client, llm_stub, settings_override):
+    from sqlalchemy import func, select
+
+    from app.db.models.llm_cache_entry import LLMCacheEntry
+    from app.db.session import SessionLocal
+    from app.llm.cache import LLMResponseCache, get_llm_cache
+    from app.llm.client import ChatMessage, achat, chat
+
+    settings_override(llm_cache="db")
+    messages = [ChatMessage(role="user", content="persist me")]
+    first = chat(messages=messages)
+    requests = llm_stub.requests
+    get_llm_cache().clear_memory()
+
+    async def _async() -> str:
+        from app.llm.client import aclose_http_client
+
+        try:
+            return await achat(messages=messages)
+        finally:
+            await aclose_http_client()
+
+    assert asyncio.run(_async()) == first
+    assert llm_stub.requests == requests
+    with SessionLocal() as db:
+        entry = db.execute(select(LLMCacheEntry)).scalar_one()
+        assert entry.hits == 1 and entry.response_text == first
+
+    # Row-limit eviction keeps the most recently used rows.
+    small = LLMResponseCache(ttl_seconds=60, max_entries=10, persistent=True, max_rows=2, max_bytes=1 << 20)
+    for i in range(3):
+        small.set(f"k{i}", model="stub", text=f"t{i}")
+    with SessionLocal() as db:
+        small._prune(db)
+        db.commit()
+        assert db.execute(select(func.count()).select_from(LLMCacheEntry)).scalar_one() == 2
+    small.clear_memory()
+    assert small.get("k2") == "t2"
+
+
+def test_response_cache_tiers_stay_within_max_bytes(client):
+    from sqlalchemy import func, select
+
+    from app.db.models.llm_cache_entry import LLMCacheEntry
+    from app.db.session import SessionLocal
+    from app.llm.cache import LLMResponseCache
+
+    cache = LLMResponseCache(ttl_seconds=60, max_entries=100, persistent=True, max_rows=100, max_bytes=1000)
+    for i in range(5):
+        cache.set(f"k{i}", model="stub", text=str(i) * 300)
+    # The memory tier evicts least recently used entries by size, not just by count.
+    assert cache.memory_bytes <= 1000
+    assert cache.get("k4") == "4" * 300
+    cache.set("huge", model="stub", text="x" * 5000)
+    assert cache.memory_bytes <= 1000 and cache.get("k4") == "4" * 300
+
+    # The table is trimmed to the most recently used rows that fit; a reply that never fits isn't stored.
+    with SessionLocal() as db:
+        assert db.execute(select(func.sum(LLMCacheEntry.size_bytes))).scalar_one() == 1500
+        cache._prune(db)
+        db.commit()
+        keys = set(db.execute(select(LLMCacheEntry.key)).scalars())
+        assert len(keys) == 3 and "k4" in keys
+    cache.clear_memory()
+    assert cache.memory_bytes == 0
+    assert cache.get("k4") == "4" * 300
+
+
+def test_stub_injected_failures_fall_back(llm_stub, settings_override):
+    from app.llm.client import ChatMessage, chat
+
+    settings_override(llm_max_retries=0)
+    messages = [ChatMessage(role="user", content="hi")]
+    llm_stub.fail_rate = 1.0
+    assert chat(messages=messages, fallback="offline") == "offline"
+    assert llm_stub.failures == 1
+
+    # A stream cut off halfway is not passed off as a complete reply.
+    llm_stub.fail_rate, llm_stub.drop_rate, llm_stub.chunk_size = 0.0, 1.0, (1, 5)
+    out, _ = _stream(lambda **kw: chat(fallback="offline", **kw))
+    assert out == "offline"
+    assert llm_stub.drops == 1
+
+
+def test_transient_failures_are_retried_honouring_retry_after(llm_stub, llm_events, settings_override):
+    from app.llm.client import ChatMessage, chat
+
+    settings_override(llm_max_retries=2, llm_retry_base_seconds=0.001, llm_retry_max_seconds=1)
+    events = llm_events
+    llm_stub.fail_next, llm_stub.fail_status, llm_stub.retry_after = 2, 429, 0.05
+    assert chat(messages=[ChatMessage(role="user", content="hi")]) == llm_stub.reply
+    assert llm_stub.requests == 3
+    retries = [data for type, _, data in events if type == "llm.retry"]
+    assert [r["attempt"] for r in retries] == [2, 3]
+    assert all(r["reason"] == "http_429" and r["delay_s"] >= 0.05 for r in retries)
+
+    # Asked to wait longer than we are willing to: fall back right away.
+    llm_stub.fail_next, llm_stub.retry_after = 1, 30
+    assert chat(messages=[ChatMessage(role="user", content="hi")], fallback="later") == "later"
+    # Not retryable at all.
+    llm_stub.fail_next, llm_stub.fail_status, llm_stub.retry_after = 1, 400, None
+    assert chat(messages=[ChatMessage(role="user", content="hi")], fallback="bad") == "bad"
+    assert llm_stub.requests == 5
+
+
+def test_circuit_breaker_fails_fast_and_recovers(llm_stub, llm_events, settings_override):
+    from app.llm.client import ChatMessage, chat
+    from app.llm.resilience import get_circuit_breaker
+
+    settings_override(llm_max_retries=0, llm_breaker_failures=2, llm_breaker_reset_seconds=0.2)
+    events = llm_events
+    messages = [ChatMessage(role="user", content="hi")]
+    llm_stub.fail_rate = 1.0
+    assert chat(messages=messages, fallback="fb") == "fb"
+    assert chat(messages=messages, fallback="fb") == "fb"
+    assert get_circuit_breaker(llm_stub.base_url).state == "open"
+    # Open: no request is sent.
+    assert chat(messages=messages, fallback="fb") == "fb"
+    assert llm_stub.requests == 2
+    circuit = [(message, data) for type, message, data in events if type == "llm.circuit"]
+    assert [m for m, _ in circuit] == ["open", "open"]
+    assert circuit[-1][1]["retry_in_s"] > 0
+
+    time.sleep(0.25)
+    llm_stub.fail_rate = 0.0
+    assert chat(messages=messages) == llm_stub.reply
+    assert get_circuit_breaker(llm_stub.base_url).state == "closed"
+    assert events[-1][:2] == ("llm.circuit", "closed")
+
+
+def test_backoff_sleep_is_cut_short_by_cancel():
+    from app.services.run_control import RunCanceled, RunControl
+
+    ctl = RunControl(uuid.uuid4())
+    threading.Timer(0.05, ctl.set_status, args=("canceled",)).start()
+    t0 = time.monotonic()
+    with pytest.raises(RunCanceled):
+        ctl.sleep(5)
+
+    async def _async() -> None:
+        actl = RunControl(uuid.uuid4())
+        asyncio.get_running_loop().call_later(0.05, actl.set_status, "paused")
+        asyncio.get_running_loop().call_later(0.1, actl.set_status, "canceled")
+        await actl.asleep(5)
+
+    with pytest.raises(RunCanceled):
+        asyncio.run(_async())
+    assert time.monotonic() - t0 < 2
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+
+def test_requests_are_admitted_round_robin_across_users(settings_override):
+    from app.llm.limiter import LLMLimiter
+
+    settings_override(llm_max_concurrency=1, llm_tokens_per_minute=0)
+    limiter = LLMLimiter()
+    order: list[str] = []
+
+    async def request(user: str, name: str) -> None:
+        admission = await limiter.aadmit(user, 10)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        limiter.release(admission, 10)
+
+    async def burst() -> None:
+        tasks = []
+        for user, name in [("a", "a0"), ("a", "a1"), ("a", "a2"), ("b", "b1")]:
+            tasks.append(asyncio.create_task(request(user, name)))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 1 and limiter.queued == 3
+        await asyncio.gather(*tasks)
+
+    asyncio.run(burst())
+    # User "b" doesn't wait behind all of "a"'s queued requests.
+    assert order == ["a0", "a1", "b1", "a2"]
+    assert limiter.in_flight == 0 and limiter.queued == 0
+
+
+def test_token_budget_delays_requests(settings_override):
+    from app.llm.limiter import LLMLimiter
+
+    # 100 tokens per second, a bucket of 6000.
+    settings_override(llm_max_concurrency=0, llm_tokens_per_minute=6000)
+    limiter = LLMLimiter()
+    first = limiter.admit("a", 5000)
+    # The response was longer than reserved: the extra 1000 are charged on release.
+    limiter.release(first, 6000)
+    second = limiter.admit("b", 50)
+    assert second.waited >= 0.4
+    limiter.release(second, 50)
+
+
+def test_queue_wait_and_timeout_are_reported(settings_override, llm_events):
+    from app.llm.client import ChatMessage, chat, close_http_client
+    from app.llm.limiter import get_llm_limiter
+    from benchmarks.llm_stub import LLMStub
+
+    messages = [ChatMessage(role="user", content="hi")]
+    limiter = get_llm_limiter()
+    with LLMStub(reply="answer") as stub:
+        settings_override(
+            deepseek_api_key="k",
+            deepseek_api_base=stub.base_url,
+            deepseek_model="stub",
+            llm_max_concurrency=1,
+            llm_queue_timeout_seconds=0.1,
+        )
+        held = limiter.admit("other", 1)
+        try:
+            assert chat(messages=messages, fallback="busy") == "busy"
+            assert stub.requests == 0
+
+            settings_override(llm_queue_timeout_seconds=5)
+            threading.Timer(0.1, limiter.release, args=(held, 1)).start()
+            assert chat(messages=messages) == "answer"
+        finally:
+            close_http_client()
+
+    throttled = [data for type, _, data in llm_events if type == "llm.throttled"]
+    queued = [data for type, _, data in llm_events if type == "llm.queued"]
+    assert throttled and throttled[0]["timeout_s"] == 0.1
+    assert len(queued) == 1 and queued[0]["wait_ms"] >= 50
+    assert limiter.in_flight == 0
+
+
+def test_db_backend_limits_across_processes(client, settings_override):
+    from app.llm.limiter import LimiterTimeout, LLMLimiter
+
+    settings_override(llm_limiter_backend="db", llm_max_concurrency=1, llm_queue_timeout_seconds=0.3)
+    # Two limiters stand in for two processes sharing the database.
+    here, there = LLMLimiter(), LLMLimiter()
+    held = here.admit("a", 10)
+    assert held.lease_id is not None
+    t0 = time.monotonic()
+    with pytest.raises(LimiterTimeout):
+        there.admit("b", 10)
+    assert time.monotonic() - t0 >= 0.2
+    assert there.in_flight == 0
+
+    here.release(held, 10)
+    admitted = there.admit("b", 10)
+    assert admitted.lease_id is not None and admitted.waited < 0.3
+    there.release(admitted, 10)
+
+
+def test_db_backend_admits_concurrent_acquires_atomically(client, settings_override):
+    from app.llm.limiter import LLMLimiter
+
+    settings_override(llm_limiter_backend="db", llm_max_concurrency=2, llm_tokens_per_minute=0)
+    limiters = [LLMLimiter() for _ in range(8)]
+    start = threading.Barrier(len(limiters))
+    leases: list[str | bool] = []
+
+    def acquire(limiter: LLMLimiter, user: str) -> None:
+        start.wait()
+        leases.append(limiter._db_acquire(user, 10))
+
+    threads = [threading.Thread(target=acquire, args=(lim, f"u{i}")) for i, lim in enumerate(limiters)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Every attempt reached the database, and no more than the limit were admitted.
+    assert True not in leases
+    assert sum(isinstance(lease, str) for lease in leases) == 2
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+
+@pytest.fixture()
+def stubs(settings_override, monkeypatch):
+    from app.llm import providers, resilience
+    from app.llm.client import close_http_client
+    from benchmarks.llm_stub import LLMStub
+
+    monkeypatch.setattr(providers, "_EXPLORE_RATE", 0.0)
+    with LLMStub(reply="from strong") as strong, LLMStub(reply="from fast") as fast, LLMStub(
+        reply="from fast 2"
+    ) as fast2:
+        fast_spec = {"api_base": [fast.base_url, fast2.base_url], "api_key": "k", "model": "fast-model"}
+        settings_override(
+            deepseek_api_key="k",
+            deepseek_api_base=strong.base_url,
+            deepseek_model="strong-model",
+            llm_providers={"fast": fast_spec},
+            llm_routes={"seo_expert": ["fast", "deepseek"], "data_analyst": ["fast"]},
+        )
+        yield {"strong": strong, "fast": fast, "fast2": fast2}
+    close_http_client()
+    # Breakers and latency samples are keyed by endpoint; later stubs may get the same ports.
+    resilience._breakers.clear()
+    providers.LATENCY._avg.clear()
+
+
+def _chat(node: str | None = None, **kwargs) -> str:
+    from app.llm.client import ChatMessage, chat
+    from app.services.tracing import node_span
+
+    messages = [ChatMessage(role="user", content="hi")]
+    if node is None:
+        return chat(messages=messages, **kwargs)
+    with node_span(node):
+        return chat(messages=messages, **kwargs)
+
+
+def test_routes_pick_provider_per_node_and_role(stubs, settings_override):
+    from app.llm.providers import get_provider_registry
+
+    assert _chat("seo_expert") in {"from fast", "from fast 2"}
+    assert _chat("engineer_solo") == "from strong"
+    # Without a node route, the role's applies.
+    assert _chat("some_node", event_role="data_analyst") in {"from fast", "from fast 2"}
+    assert stubs["strong"].requests == 1
+
+    registry = get_provider_registry()
+    assert registry.route("seo_expert") == ["fast", "deepseek"]
+    assert registry.route("team_lead") == ["deepseek"]
+    settings_override(llm_routes={"default": ["fast", "nope"]})
+    assert get_provider_registry().route("team_lead") == ["fast"]
+
+
+def test_failover_to_the_next_provider_without_retrying_the_primary(stubs, settings_override, llm_events):
+    settings_override(llm_providers={"fast": {"api_base": stubs["fast"].base_url, "api_key": "k", "model": "m"}})
+    stubs["fast"].fail_rate = 1.0
+    assert _chat("seo_expert", fallback="fb") == "from strong"
+    assert stubs["fast"].requests == 1
+    failover = [(message, data) for type, message, data in llm_events if type == "llm.failover"]
+    assert failover == [
+        (
+            "fast -> deepseek",
+            {
+                "node": "seo_expert",
+                "role": None,
+                "from": {"provider": "fast", "api_base": stubs["fast"].base_url},
+                "to": {"provider": "deepseek", "api_base": stubs["strong"].base_url},
+                "reason": "http_500",
+            },
+        )
+    ]
+
+    # The last provider in the chain is retried before falling back.
+    settings_override(llm_max_retries=1, llm_retry_base_seconds=0.001)
+    stubs["fast"].requests = 0
+    assert _chat("data_analyst", fallback="fb") == "fb"
+    assert stubs["fast"].requests == 2
+
+
+def test_response_cached_after_a_failover_is_found_again(stubs, settings_override):
+    import asyncio
+
+    from app.llm.cache import get_llm_cache
+    from app.llm.client import ChatMessage, achat, chat
+    from app.services.tracing import node_span
+
+    settings_override(
+        llm_cache="memory",
+        llm_providers={"fast": {"api_base": stubs["fast"].base_url, "api_key": "k", "model": "m"}},
+    )
+    get_llm_cache().clear_memory()
+    stubs["fast"].fail_next = 2
+    with node_span("seo_expert"):
+        for ask in (chat, lambda **kw: asyncio.run(achat(**kw))):
+            messages = [ChatMessage(role="user", content=f"failover then cache {uuid.uuid4()}")]
+            # The primary fails, the strong model answers and its response is cached...
+            assert ask(messages=messages, fallback="fb") == "from strong"
+            requests = (stubs["fast"].requests, stubs["strong"].requests)
+            # ...and once the primary is back, the same call is served from that entry.
+            assert ask(messages=messages, fallback="fb") == "from strong"
+            assert (stubs["fast"].requests, stubs["strong"].requests) == requests
+
+
+def test_latency_aware_endpoint_selection(stubs):
+    from app.llm.providers import LATENCY, get_provider_registry
+
+    stubs["fast"].delay = 0.05
+    # Endpoints without a sample are tried first, then the faster one is preferred.
+    seen = {_chat("seo_expert") for _ in range(2)}
+    assert seen == {"from fast", "from fast 2"}
+    assert [_chat("seo_expert") for _ in range(5)] == ["from fast 2"] * 5
+    first = get_provider_registry().candidates("seo_expert")[0]
+    assert first.api_base == stubs["fast2"].base_url and LATENCY.get(first) < 0.05
+
+
+def test_run_profile_records_the_provider(stubs):
+    from app.services.tracing import CURRENT_RUN_PROFILE, RunProfile
+
+    profile = RunProfile(uuid.uuid4())
+    token = CURRENT_RUN_PROFILE.set(profile)
+    try:
+        _chat("engineer_solo")
+    finally:
+        CURRENT_RUN_PROFILE.reset(token)
+    span = profile.summary("succeeded")["spans"][0]
+    assert (span["provider"], span["model"]) == ("deepseek", "strong-model")
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+
+@contextmanager
+def _captured(engine, table: str):
+    """Collect `(sql, params)` of SELECTs against `table` issued inside the block."""
+
+    seen: list[tuple[str, object]] = []
+
+    def _record(_conn, _cursor, statement, parameters, _context, _executemany) -> None:
+        if statement.lstrip().upper().startswith("SELECT") and f"FROM {table}" in statement:
+            seen.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def _plan(engine, statement: str, parameters) -> str:
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            return "\n".join(str(r[-1]) for r in rows)
+        if engine.dialect.name == "postgresql":
+            # Tiny test tables would otherwise always be seq-scanned.
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+            return "\n".join(str(r[0]) for r in rows)
+    pytest.skip(f"no plan assertions for {engine.dialect.name}")
+
+
+def _assert_uses(engine, queries, index: str) -> None:
+    assert queries, "expected the endpoint to query the table"
+    for statement, parameters in queries:
+        plan = _plan(engine, statement, parameters)
+        assert index in plan, plan
+        if engine.dialect.name == "sqlite":
+            assert "TEMP B-TREE" not in plan, plan  # ORDER BY is served by the index
+
+
+def test_listing_queries_use_composite_indexes(client):
+    from app.db.session import engine
+
+    suffix = uuid.uuid4().hex[:8]
+    client.post(
+        "/api/auth/signup",
+        json={"username": f"q{suffix}", "email": f"q{suffix}@example.com", "password": "password123"},
+    )
+    project_id = client.post("/api/projects", json={"name": "p"}).json()["id"]
+    run_id = client.post("/api/runs", json={"input": "snake", "project_id": project_id}).json()["id"]
+    client.post("/api/runs", json={"input": "hello"})
+
+    with _captured(engine, "runs") as q:
+        client.get("/api/runs", params={"limit": 10})
+    _assert_uses(engine, q, "ix_runs_user_id_created_at")
+
+    with _captured(engine, "runs") as q:
+        client.get("/api/runs", params={"project_id": project_id, "limit": 10})
+    _assert_uses(engine, q, "ix_runs_user_id_project_id_created_at")
+
+    with _captured(engine, "run_artifacts") as q:
+        client.get(f"/api/runs/{run_id}/artifacts", params={"limit": 10})
+    _assert_uses(engine, q, "ix_run_artifacts_run_id_created_at")
+
+    with _captured(engine, "run_checkpoints") as q:
+        assert client.post(f"/api/runs/{run_id}/rerun", params={"node": "rule_node"}).status_code == 201
+    _assert_uses(engine, q[:1], "ix_run_checkpoints_run_id_node_seq")
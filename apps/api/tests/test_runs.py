@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import json
+import threading
+import time
 import uuid
 
 
@@ -80,3 +83,350 @@ def test_run_permissions(client):
 
     r = client2.get(f"/api/runs/{run_id}")
     assert r.status_code == 403
+
+
+def test_stream_replays_events_and_finishes(client):
+    _signup(client, uuid.uuid4().hex[:8])
+    run_id = client.post("/api/runs", json={"input": "hello"}).json()["id"]
+
+    with client.stream("GET", f"/api/runs/{run_id}/stream") as r:
+        assert r.status_code == 200
+        body = "".join(r.iter_text())
+
+    assert "event: run_event" in body
+    assert '"type": "run.created"' in body
+    assert body.rstrip().endswith('data: {"status": "succeeded"}')
+
+
+def test_team_mode_parallel_schedule_runs_every_role(client, settings_override):
+    settings_override(team_schedule="parallel")
+    _signup(client, uuid.uuid4().hex[:8])
+    run_id = client.post("/api/runs", json={"input": "build a landing page", "mode": "team"}).json()["id"]
+
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "succeeded"
+    nodes = [c["node"] for c in client.get(f"/api/runs/{run_id}/checkpoints").json()["checkpoints"]]
+    for role in ["team_lead", "seo_expert", "product_manager", "architect", "engineer", "data_analyst"]:
+        assert role in nodes
+    # Dependencies hold even though advisory roles share a step.
+    assert nodes.index("team_lead") < nodes.index("architect") < nodes.index("task_view") < nodes.index("engineer")
+    assert nodes[-1] == "team_finalize"
+    # The build chain's subgraph node is reported through its own nodes only.
+    assert "team_build" not in nodes and nodes.count("engineer") == 1
+    events = client.get(f"/api/runs/{run_id}/events").json()["events"]
+    outputs = [e["data"]["role"] for e in events if e["type"] == "agent.output"]
+    assert sorted(outputs) == sorted(set(outputs))
+
+
+def test_parallel_build_chain_does_not_wait_for_advisory_roles(settings_override, monkeypatch):
+    from app.langgraph import workflow
+    from app.services.tracing import CURRENT_NODE
+
+    settings_override(team_schedule="parallel")
+    started: dict[str, float] = {}
+    finished: dict[str, float] = {}
+
+    def fake_chat(*, fallback: str = "", **_kwargs) -> str:
+        node = CURRENT_NODE.get() or ""
+        started[node] = time.monotonic()
+        if node == "seo_expert":
+            time.sleep(0.5)
+        finished[node] = time.monotonic()
+        return fallback
+
+    monkeypatch.setattr(workflow, "chat", fake_chat)
+    roles = ["team_lead", "seo_expert", "architect", "engineer"]
+    state = workflow.WORKFLOW.invoke({"run_id": "r", "input": "build a landing page", "mode": "team", "roles": roles})
+
+    assert state["final"]["mode"] == "team" and set(state["roles_done"]) >= {*roles, "task_view"}
+    # The engineer only waits for its own chain, not for the slow advisory role next to it...
+    assert started["engineer"] < finished["seo_expert"]
+    assert started["architect"] < started["engineer"]
+    # ...and the team only finalizes once every branch is done.
+    assert set(state["final"]["outputs"]) >= {*roles, "task_view"}
+
+    # A rerun of a team role re-schedules it from the router with whatever else is pending.
+    seed, goto = workflow.resume_target({**state, "roles_done": ["team_lead", "seo_expert"]}, "seo_expert")
+    assert goto == "team_router" and seed["roles_done"] == ["team_lead"]
+
+
+def test_checkpoints_are_stored_as_diffs_and_rebuilt(client, settings_override):
+    from sqlalchemy import select
+
+    from app.db.models.run_checkpoint import RunCheckpoint
+    from app.db.session import SessionLocal
+
+    settings_override(checkpoint_full_every=4)
+    _signup(client, uuid.uuid4().hex[:8])
+    run_id = client.post("/api/runs", json={"input": "build a landing page", "mode": "team"}).json()["id"]
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "succeeded"
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(RunCheckpoint).where(RunCheckpoint.run_id == uuid.UUID(run_id)).order_by(RunCheckpoint.seq)
+        ).scalars().all()
+        kinds = [(r.seq, r.kind) for r in rows]
+    assert len(kinds) > 5
+    assert all(kind == ("full" if seq % 4 == 1 else "delta") for seq, kind in kinds)
+
+    cps = client.get(f"/api/runs/{run_id}/checkpoints").json()["checkpoints"]
+    last = cps[-1]["state"]
+    assert last["final"]["mode"] == "team" and last["input"] == "build a landing page"
+    assert set(cps[-2]["state"]["outputs"]) <= set(last["outputs"])
+
+    # Rerunning from a delta checkpoint seeds the reconstructed state.
+    mid = next(c for c in cps if c["seq"] % 4 == 3)
+    r = client.post(f"/api/runs/{run_id}/rerun", params={"checkpoint_seq": mid["seq"]})
+    assert r.status_code == 201
+    with SessionLocal() as db:
+        from app.db.models.run import Run
+
+        assert db.get(Run, uuid.UUID(r.json()["id"])).seed_state == mid["state"]
+    assert client.get(f"/api/runs/{r.json()['id']}").json()["status"] == "succeeded"
+
+
+def test_workspace_zip_streams_every_artifact(client, monkeypatch):
+    import io
+    import zipfile
+
+    from app.api.routes import runs as runs_routes
+
+    monkeypatch.setattr(runs_routes, "_ZIP_BATCH_SIZE", 2)  # force several artifact batches
+    _signup(client, uuid.uuid4().hex[:8])
+    run_id = client.post("/api/runs", json={"input": "snake game"}).json()["id"]
+    arts = client.get(f"/api/runs/{run_id}/artifacts").json()["artifacts"]
+    assert len(arts) > 2
+
+    r = client.get(f"/api/runs/{run_id}/workspace.zip")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/zip"
+    zf = zipfile.ZipFile(io.BytesIO(r.content))
+    assert zf.testzip() is None
+    assert sorted(zf.namelist()) == sorted([a["name"] for a in arts] + ["run_meta.json"])
+    assert "<canvas" in zf.read("index.html").decode()
+    assert json.loads(zf.read("run_meta.json"))["id"] == run_id
+
+
+def test_listings_support_keyset_pagination(client):
+    _signup(client, uuid.uuid4().hex[:8])
+    run_ids = [client.post("/api/runs", json={"input": f"snake {i}"}).json()["id"] for i in range(3)]
+
+    def collect(path: str, key: str, cursor_keys: tuple[str, ...], params: dict) -> list[dict]:
+        items, params = [], dict(params)
+        while True:
+            body = client.get(path, params=params).json()
+            items += body[key]
+            if body[f"next_{cursor_keys[0]}"] is None:
+                return items
+            params.update({k: body[f"next_{k}"] for k in cursor_keys})
+
+    runs = collect("/api/runs", "runs", ("before_created_at", "before_id"), {"limit": 2})
+    assert [r["id"] for r in runs] == run_ids[::-1]
+
+    run_id = run_ids[0]
+    events = collect(f"/api/runs/{run_id}/events", "events", ("after_seq",), {"limit": 3})
+    assert events == client.get(f"/api/runs/{run_id}/events").json()["events"]
+    newer = client.get(f"/api/runs/{run_id}/events", params={"after_seq": events[-2]["seq"]}).json()["events"]
+    assert newer == events[-1:]
+
+    cps = collect(f"/api/runs/{run_id}/checkpoints", "checkpoints", ("after_seq",), {"limit": 1})
+    assert cps == client.get(f"/api/runs/{run_id}/checkpoints").json()["checkpoints"]
+    meta = client.get(f"/api/runs/{run_id}/checkpoints", params={"include_state": "false"}).json()["checkpoints"]
+    assert [(c["seq"], c["node"], c["state"]) for c in meta] == [(c["seq"], c["node"], None) for c in cps]
+
+    arts = collect(f"/api/runs/{run_id}/artifacts", "artifacts", ("after_created_at", "after_id"), {"limit": 2})
+    assert arts == client.get(f"/api/runs/{run_id}/artifacts").json()["artifacts"]
+    assert len(arts) > 2
+
+
+def _events(client, run_id: str) -> list[str]:
+    return [e["type"] for e in client.get(f"/api/runs/{run_id}/events").json()["events"]]
+
+
+def test_cancel_aborts_an_in_flight_llm_stream(client, settings_override):
+    from app.langgraph.executor import execute_run
+    from app.llm.client import close_http_client
+    from benchmarks.llm_stub import LLMStub
+
+    # ~10 s of streaming unless the run stops reading.
+    with LLMStub(reply="x " * 2000, chunk_size=4, chunk_delay=0.01) as stub:
+        settings_override(
+            run_dispatch="queue", deepseek_api_key="k", deepseek_api_base=stub.base_url, deepseek_model="stub"
+        )
+        _signup(client, uuid.uuid4().hex[:8])
+        run_id = client.post("/api/runs", json={"input": "hello", "mode": "engineer"}).json()["id"]
+        worker = threading.Thread(target=execute_run, args=(uuid.UUID(run_id),))
+        worker.start()
+        try:
+            deadline = time.monotonic() + 10
+            while "agent.delta" not in _events(client, run_id) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            t0 = time.monotonic()
+            assert client.post(f"/api/runs/{run_id}/cancel").status_code == 200
+            worker.join(timeout=5)
+            assert not worker.is_alive()
+            assert time.monotonic() - t0 < 1.5
+        finally:
+            worker.join()
+            close_http_client()
+
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "canceled"
+    assert "run.canceled" in _events(client, run_id)
+    assert "run.failed" not in _events(client, run_id)
+
+
+def test_run_control_signals_wake_waiters_after_commit():
+    import asyncio
+
+    from app.db.session import SessionLocal
+    from app.services.run_control import RUN_CONTROLS
+
+    run_id = uuid.uuid4()
+    ctl = RUN_CONTROLS.open(run_id)
+    try:
+        with SessionLocal() as db:
+            RUN_CONTROLS.signal_on_commit(db, run_id, "paused")
+            db.rollback()
+        assert ctl.status == "running"
+        with SessionLocal() as db:
+            RUN_CONTROLS.signal_on_commit(db, run_id, "paused")
+            db.commit()
+        assert ctl.status == "paused"
+
+        threading.Timer(0.05, RUN_CONTROLS.signal, args=(run_id, "running")).start()
+        assert ctl.wait_while_paused(timeout=5) == "running"
+
+        ctl.set_status("paused")
+
+        async def _await() -> str:
+            asyncio.get_running_loop().call_later(0.05, RUN_CONTROLS.signal, run_id, "canceled")
+            return await ctl.await_while_paused(timeout=5)
+
+        assert asyncio.run(_await()) == "canceled"
+        ctl.set_status("running")
+        assert ctl.canceled  # cancellation is final
+    finally:
+        RUN_CONTROLS.close(run_id)
+
+
+def test_file_stream_parser_handles_any_chunking():
+    import random
+
+    from app.langgraph.file_stream import FileStreamParser
+
+    doc = {
+        "summary": "two files {not json}",
+        "files": [
+            {"path": "index.html", "content": '<p class="a">\\ é 😀\n</p>'},
+            {"content": "content before path", "path": " app.js "},
+            {"path": "", "content": "dropped"},
+            {"path": "style.css", "content": "", "meta": [1, {"x": None}], "n": -1.5e3},
+        ],
+    }
+    expected = [("index.html", doc["files"][0]["content"]), ("app.js", "content before path"), ("style.css", "")]
+    rng = random.Random(7)
+    for ensure_ascii in (True, False):
+        raw = "Sure:\n" + json.dumps(doc, ensure_ascii=ensure_ascii, indent=1)
+        for _ in range(50):
+            parser = FileStreamParser()
+            files: dict[int, list[str]] = {}
+            completed: list[tuple[str, str]] = []
+            i = 0
+            while i < len(raw):
+                step = rng.randint(1, 9)
+                for ev in parser.feed(raw[i : i + step]):
+                    if ev.kind == "started":
+                        files[ev.index] = [ev.path, ""]
+                    elif ev.kind == "delta":
+                        files[ev.index][1] += ev.text
+                    else:
+                        completed.append((ev.path, ev.text))
+                i += step
+            assert completed == expected
+            assert [tuple(f) for f in files.values()] == expected
+            assert parser.done
+
+
+def test_extract_json_obj_fast_paths_and_fallbacks():
+    from app.langgraph.workflow import _extract_json_obj
+
+    obj = {"summary": "s", "files": [{"path": "a.js", "content": 'const s = "{ not } json";'}]}
+    body = json.dumps(obj)
+    assert _extract_json_obj(body) == obj
+    assert _extract_json_obj(f"Here you go:\n```json\n{body}\n```\nDone.") == obj
+    assert _extract_json_obj(f"Use {{name}} placeholders.\n{body}\ntrailing {{x}}") == obj
+    # A stray, never closed brace doesn't hide the object after it.
+    assert _extract_json_obj(f"The {{ is intentional.\n{body}") == obj
+    # Large integers and NaN parse like the stdlib, with or without orjson.
+    assert _extract_json_obj('{"n": 123456789012345678901234567890, "x": NaN}')["n"] == 123456789012345678901234567890
+    assert _extract_json_obj("no json {here}") is None
+    assert _extract_json_obj("") is None
+
+
+def test_streamed_files_are_surfaced_and_persisted_once(client, settings_override):
+    from app.langgraph.executor import execute_run
+    from app.llm.client import close_http_client
+    from benchmarks.llm_stub import LLMStub
+
+    files = [
+        {"path": "index.html", "content": "<html>" + "x" * 600 + "</html>"},
+        {"path": "app.js", "content": "console.log('hi');\n" * 40},
+    ]
+    reply = json.dumps({"summary": "two files", "files": files})
+    with LLMStub(reply=reply, chunk_size=7) as stub:
+        settings_override(
+            run_dispatch="queue", deepseek_api_key="k", deepseek_api_base=stub.base_url, deepseek_model="stub"
+        )
+        _signup(client, uuid.uuid4().hex[:8])
+        run_id = client.post("/api/runs", json={"input": "hello", "mode": "engineer"}).json()["id"]
+        try:
+            execute_run(uuid.UUID(run_id))
+        finally:
+            close_http_client()
+
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "succeeded"
+    events = [e for e in client.get(f"/api/runs/{run_id}/events").json()["events"] if e["type"].startswith("file.")]
+    for index, f in enumerate(files):
+        own = [e for e in events if e["data"]["index"] == index]
+        assert own[0]["type"] == "file.started" and own[-1]["type"] == "file.completed"
+        assert {e["data"]["path"] for e in own} == {f["path"]}
+        assert "".join(e["data"]["delta"] for e in own if e["type"] == "file.delta") == f["content"]
+        assert own[-1]["data"]["bytes"] == len(f["content"])
+    assert [e["type"] for e in events].index("file.completed") < [e["type"] for e in events].index("file.started", 1)
+
+    arts = client.get(f"/api/runs/{run_id}/artifacts").json()["artifacts"]
+    names = [a["name"] for a in arts]
+    assert sorted(n for n in names if n in {"index.html", "app.js"}) == ["app.js", "index.html"]
+    manifest_id = next(a["id"] for a in arts if a["name"] == "files_manifest.json")
+    manifest = client.get(f"/api/runs/{run_id}/artifacts/{manifest_id}").json()["content_json"]
+    assert [m["path"] for m in manifest["files"]] == ["index.html", "app.js"]
+
+
+def test_streamed_files_the_final_set_replaces_are_not_kept(client, settings_override):
+    from app.langgraph.executor import execute_run
+    from app.llm.client import close_http_client
+    from benchmarks.llm_stub import LLMStub
+
+    # A partial snake reply: the runnable demo files are merged in over the streamed index.html.
+    streamed = "<html>" + "partial " * 80 + "</html>"
+    reply = json.dumps({"summary": "snake", "files": [{"path": "index.html", "content": streamed}]})
+    with LLMStub(reply=reply, chunk_size=7) as stub:
+        settings_override(
+            run_dispatch="queue", deepseek_api_key="k", deepseek_api_base=stub.base_url, deepseek_model="stub"
+        )
+        _signup(client, uuid.uuid4().hex[:8])
+        run_id = client.post("/api/runs", json={"input": "snake game", "mode": "engineer"}).json()["id"]
+        try:
+            execute_run(uuid.UUID(run_id))
+        finally:
+            close_http_client()
+
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "succeeded"
+    events = client.get(f"/api/runs/{run_id}/events").json()["events"]
+    assert any(e["type"] == "file.completed" and e["data"]["path"] == "index.html" for e in events)
+    arts = client.get(f"/api/runs/{run_id}/artifacts").json()["artifacts"]
+    names = [a["name"] for a in arts]
+    assert sorted(names) == sorted(set(names))
+    assert {"index.html", "app.js", "style.css"} <= set(names)
+    index = next(a for a in arts if a["name"] == "index.html")
+    content = client.get(f"/api/runs/{run_id}/artifacts/{index['id']}").json()["content_text"]
+    assert "<canvas" in content and "partial" not in content
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from app.services.state_diff import apply_state_diff, diff_state
+
+
+def test_diff_round_trips_nested_changes():
+    old = {
+        "input": "x",
+        "outputs": {"team_lead": "plan", "seo_expert": "kw"},
+        "files": [{"path": "a.py", "content": "1"}],
+        "task_view": {"goal": "g"},
+        "final": None,
+    }
+    new = {
+        "input": "x",
+        "outputs": {"team_lead": "plan", "seo_expert": "kw2", "architect": "arch"},
+        "files": [{"path": "a.py", "content": "2"}],
+        "final": {"summary": "done"},
+    }
+    diff = diff_state(old, new)
+    assert diff == {
+        "set": {"files": new["files"], "final": {"summary": "done"}},
+        "unset": ["task_view"],
+        "patch": {"outputs": {"set": {"seo_expert": "kw2", "architect": "arch"}}},
+    }
+    assert apply_state_diff(old, diff) == new
+    assert old["outputs"] == {"team_lead": "plan", "seo_expert": "kw"}
+    assert diff_state(new, new) == {}
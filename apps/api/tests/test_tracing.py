@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+import uuid
+
+import pytest
+
+
+def test_run_profile_artifact_and_metrics_endpoint(client, settings_override):
+    from app.langgraph.executor import execute_run
+    from app.llm.client import close_http_client
+    from benchmarks.llm_stub import LLMStub
+
+    reply = json.dumps({"summary": "ok", "files": [{"path": "index.html", "content": "<p>hi</p>"}]})
+    with LLMStub(reply=reply, chunk_size=8) as stub:
+        settings_override(
+            run_dispatch="queue", deepseek_api_key="k", deepseek_api_base=stub.base_url, deepseek_model="stub"
+        )
+        username = f"t{uuid.uuid4().hex[:8]}"
+        client.post(
+            "/api/auth/signup",
+            json={"username": username, "email": f"{username}@example.com", "password": "password123"},
+        )
+        run_id = client.post("/api/runs", json={"input": "hello", "mode": "engineer"}).json()["id"]
+        try:
+            execute_run(uuid.UUID(run_id))
+        finally:
+            close_http_client()
+
+    arts = client.get(f"/api/runs/{run_id}/artifacts").json()["artifacts"]
+    profile_id = next(a["id"] for a in arts if a["name"] == "run_profile.json")
+    profile = client.get(f"/api/runs/{run_id}/artifacts/{profile_id}").json()["content_json"]
+    assert profile["status"] == "succeeded"
+    assert profile["db"]["queries"] > 0
+    node = profile["nodes"]["engineer_solo"]
+    assert node["runs"] == 1 and node["llm_calls"] == 1 and node["retries"] == 0
+    assert node["tokens_in"] > 0 and node["tokens_out"] > 0
+    assert 0 < node["ttft_ms_max"] <= node["llm_ms"] <= node["ms"]
+    assert {"init", "rule_node", "engineer_solo"} <= {s["name"] for s in profile["spans"] if s["kind"] == "node"}
+    chat = next(s for s in profile["spans"] if s["kind"] == "llm")
+    assert chat["node"] == "engineer_solo" and chat["outcome"] == "ok"
+
+    body = client.get("/api/metrics").text
+    assert 'atoms_workflow_node_duration_seconds_count{node="engineer_solo"}' in body
+    assert 'atoms_llm_call_duration_seconds_bucket{node="engineer_solo",outcome="ok",le="+Inf"}' in body
+    assert "# TYPE atoms_run_db_queries histogram" in body
+
+
+def test_failed_queries_leave_no_timing_state_behind():
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    from app.db.session import engine
+    from app.services.tracing import CURRENT_RUN_PROFILE, RunProfile
+
+    profile = RunProfile(uuid.uuid4())
+    token = CURRENT_RUN_PROFILE.set(profile)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM no_such_table"))
+                conn.rollback()
+            conn.execute(text("SELECT 1"))
+            info = dict(conn.info)
+    finally:
+        CURRENT_RUN_PROFILE.reset(token)
+    assert profile.db_queries == 1
+    assert not any("tracing" in str(key) for key in info)
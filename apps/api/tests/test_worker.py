@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import uuid
+from datetime import UTC, datetime, timedelta
+
+
+def _signup(client) -> None:
+    suffix = uuid.uuid4().hex[:8]
+    r = client.post(
+        "/api/auth/signup",
+        json={"username": f"k{suffix}", "email": f"k{suffix}@example.com", "password": "password123"},
+    )
+    assert r.status_code == 200
+
+
+def test_queue_dispatch_leaves_run_for_worker(client, settings_override):
+    from app.worker import RunWorkerPool
+
+    settings_override(run_dispatch="queue")
+    _signup(client)
+    run_id = client.post("/api/runs", json={"input": "hello"}).json()["id"]
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "queued"
+
+    pool = RunWorkerPool(concurrency=1, worker_id="w1")
+    assert str(pool.claim_once()) == run_id
+    pool.stop()
+    pool.serve_forever()  # drains the in-flight run
+
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "succeeded"
+
+
+def test_claim_is_exclusive_and_reclaims_stale_leases(client, settings_override):
+    from app.db.models.run import Run
+    from app.db.session import SessionLocal
+    from app.services.run_service import RunService
+
+    settings_override(run_dispatch="queue")
+    _signup(client)
+    run_id = uuid.UUID(client.post("/api/runs", json={"input": "hello"}).json()["id"])
+    svc = RunService()
+
+    with SessionLocal() as db:
+        run = svc.claim_next_run(db, "w1", lease_seconds=60)
+        assert run is not None and run.id == run_id and run.claimed_by == "w1"
+    with SessionLocal() as db:
+        assert svc.claim_next_run(db, "w2", lease_seconds=60) is None
+
+    # w1 dies: its heartbeat goes stale and another worker takes over.
+    with SessionLocal() as db:
+        run = db.get(Run, run_id)
+        run.heartbeat_at = datetime.now(tz=UTC) - timedelta(minutes=5)
+        db.commit()
+    with SessionLocal() as db:
+        run = svc.claim_next_run(db, "w2", lease_seconds=60)
+        assert run is not None and run.id == run_id and run.claimed_by == "w2"
+
+
+def test_async_worker_runs_on_event_loop(client, settings_override):
+    from app.worker import RunWorkerPool
+
+    settings_override(run_dispatch="queue")
+    _signup(client)
+    run_ids = [client.post("/api/runs", json={"input": f"hello {i}"}).json()["id"] for i in range(3)]
+
+    pool = RunWorkerPool(concurrency=3, worker_id="w-async", use_async=True)
+    assert {str(pool.claim_once()) for _ in run_ids} == set(run_ids)
+    pool.stop()
+    pool.serve_forever()
+
+    for run_id in run_ids:
+        assert client.get(f"/api/runs/{run_id}").json()["status"] == "succeeded"
+        types = [e["type"] for e in client.get(f"/api/runs/{run_id}/events").json()["events"]]
+        assert "run.started" in types and types[-1] == "run.succeeded"
+
+
+def _events(client, run_id) -> list[dict]:
+    return client.get(f"/api/runs/{run_id}/events").json()["events"]
+
+
+def _go_stale(run_id: uuid.UUID) -> None:
+    from app.db.models.run import Run
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        run = db.get(Run, run_id)
+        run.heartbeat_at = datetime.now(tz=UTC) - timedelta(minutes=5)
+        db.commit()
+
+
+def test_reclaimed_run_stops_on_the_old_worker(client, settings_override):
+    import threading
+    import time
+
+    from app.db.session import SessionLocal
+    from app.langgraph.executor import execute_run
+    from app.llm.client import close_http_client
+    from app.services.run_control import RUN_CONTROLS
+    from app.services.run_service import RunService
+    from benchmarks.llm_stub import LLMStub
+
+    svc = RunService()
+    # ~10 s of streaming unless the run stops reading.
+    with LLMStub(reply="x " * 2000, chunk_size=4, chunk_delay=0.01) as stub:
+        settings_override(
+            run_dispatch="queue", deepseek_api_key="k", deepseek_api_base=stub.base_url, deepseek_model="stub"
+        )
+        _signup(client)
+        run_id = uuid.UUID(client.post("/api/runs", json={"input": "hello"}).json()["id"])
+        with SessionLocal() as db:
+            assert svc.claim_next_run(db, "w1", lease_seconds=60).id == run_id
+        old = threading.Thread(target=execute_run, args=(run_id,), kwargs={"worker_id": "w1"})
+        old.start()
+        try:
+            deadline = time.monotonic() + 10
+            while not any(e["type"] == "agent.delta" for e in _events(client, run_id)):
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+
+            # w1 stalls long enough for w2 to reclaim the run; w1's next heartbeat finds out.
+            _go_stale(run_id)
+            with SessionLocal() as db:
+                assert svc.claim_next_run(db, "w2", lease_seconds=60).id == run_id
+            with SessionLocal() as db:
+                assert svc.heartbeat(db, "w1", [run_id]) == set()
+                assert svc.heartbeat(db, "w2", [run_id]) == {run_id}
+                db.commit()
+            seen = len(_events(client, run_id))
+            RUN_CONTROLS.revoke(run_id)
+            old.join(timeout=5)
+            assert not old.is_alive()
+        finally:
+            old.join()
+            close_http_client()
+
+    # The old execution wrote nothing after losing the run, and the run is still w2's to finish.
+    events = _events(client, run_id)
+    assert [e["type"] for e in events[seen:]] == []
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "running"
+
+
+def test_reclaimed_run_resumes_after_its_last_checkpoint(client, settings_override):
+    from app.db.models.run import Run
+    from app.db.session import SessionLocal
+    from app.langgraph.executor import execute_run
+    from app.services.run_service import RunService
+
+    _signup(client)
+    done = client.post("/api/runs", json={"input": "build a landing page", "mode": "team"}).json()["id"]
+    checkpoints = client.get(f"/api/runs/{done}/checkpoints").json()["checkpoints"]
+    after_pm = next(c for c in checkpoints if c["node"] == "product_manager")
+
+    settings_override(run_dispatch="queue")
+    run_id = uuid.UUID(client.post("/api/runs", json={"input": "build a landing page", "mode": "team"}).json()["id"])
+    svc = RunService()
+    with SessionLocal() as db:
+        assert svc.claim_next_run(db, "w1", lease_seconds=60).id == run_id
+        # w1 got as far as the product manager, then died.
+        svc.add_checkpoint(db, run_id, node="product_manager", state={**after_pm["state"], "run_id": str(run_id)})
+        db.commit()
+    _go_stale(run_id)
+    with SessionLocal() as db:
+        assert svc.claim_next_run(db, "w2", lease_seconds=60).id == run_id
+    execute_run(run_id, worker_id="w2")
+
+    with SessionLocal() as db:
+        run = db.get(Run, run_id)
+        assert run.status == "succeeded" and run.claimed_by == "w2", run.error
+    started = [e for e in _events(client, run_id) if e["type"] == "run.started"]
+    assert started[-1]["data"]["resumed_from"] == {"seq": 1, "node": "product_manager"}
+    nodes = [c["node"] for c in client.get(f"/api/runs/{run_id}/checkpoints").json()["checkpoints"]]
+    # Nothing up to the product manager ran again; the remaining roles did.
+    assert nodes[0] == "product_manager" and "team_lead" not in nodes and "seo_expert" not in nodes[1:]
+    assert {"architect", "engineer", "team_finalize"} <= set(nodes)
+
+
+def test_reclaimed_paused_run_stays_paused_until_resumed(client, settings_override):
+    import threading
+    import time
+
+    from app.db.models.run import Run
+    from app.db.session import SessionLocal
+    from app.langgraph.executor import execute_run
+    from app.services.run_service import RunService
+
+    settings_override(run_dispatch="queue")
+    _signup(client)
+    run_id = uuid.UUID(client.post("/api/runs", json={"input": "hello"}).json()["id"])
+    svc = RunService()
+    with SessionLocal() as db:
+        assert svc.claim_next_run(db, "w1", lease_seconds=60).id == run_id
+    # The user pauses the run, then w1 dies.
+    assert client.post(f"/api/runs/{run_id}/pause").status_code == 200
+    _go_stale(run_id)
+    with SessionLocal() as db:
+        run = svc.claim_next_run(db, "w2", lease_seconds=60)
+        assert run.id == run_id and run.claimed_by == "w2" and run.status == "paused"
+
+    worker = threading.Thread(target=execute_run, args=(run_id,), kwargs={"worker_id": "w2"})
+    worker.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not any(e["type"] == "run.paused" for e in _events(client, run_id)):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        with SessionLocal() as db:
+            assert db.get(Run, run_id).status == "paused"
+        assert not any(e["type"] == "agent.output" for e in _events(client, run_id))
+    finally:
+        assert client.post(f"/api/runs/{run_id}/resume").status_code == 200
+        worker.join(timeout=30)
+    assert not worker.is_alive()
+    assert client.get(f"/api/runs/{run_id}").json()["status"] == "succeeded"
@@ -94,7 +94,7 @@ export default function WorkspacePage() {
       return null;
     }
   });
-  const runs = useRunsFiltered({ projectId: activeProjectId });
+  const runs = useRunsFiltered({ projectId: activeProjectId, limit: 3 });
   const createRun = useCreateRun();
 
   const [prompt, setPrompt] = useState("");
@@ -327,6 +327,27 @@ export default function RunDetailPage() {
     [checkpoints.data?.checkpoints],
   );
 
+  // Files of a reply that is still streaming (file.started / file.delta events), by file index.
+  const streamedFiles = useMemo(() => {
+    const byIndex = new Map<string, { path: string; content: string }>();
+    for (const e of visibleEvents) {
+      if (e.type !== "file.started" && e.type !== "file.delta") continue;
+      const d = (e.data && typeof e.data === "object" ? e.data : {}) as {
+        role?: unknown;
+        index?: unknown;
+        path?: unknown;
+        delta?: unknown;
+      };
+      const key = `${String(d.role ?? "")}:${String(d.index ?? "")}`;
+      const path = String(d.path ?? "").trim();
+      if (!path) continue;
+      const cur = byIndex.get(key) ?? { path, content: "" };
+      if (e.type === "file.delta") cur.content += String(d.delta ?? "");
+      byIndex.set(key, cur);
+    }
+    return [...byIndex.values()];
+  }, [visibleEvents]);
+
   const liveFiles = useMemo(() => {
     for (let i = checkpointList.length - 1; i >= 0; i -= 1) {
       const st = checkpointList[i]?.state as unknown;
@@ -343,8 +364,8 @@ export default function RunDetailPage() {
       }
       if (out.length > 0) return out;
     }
-    return [];
-  }, [checkpointList]);
+    return streamedFiles;
+  }, [checkpointList, streamedFiles]);
 
   const [selectedLivePath, setSelectedLivePath] = useState<string>("");
 
@@ -1034,7 +1055,7 @@ export default function RunDetailPage() {
                 ) : liveFiles.length > 0 ? (
                   <div className="h-full">
                     <div className="rounded-xl border bg-muted/10 px-3 py-2 text-xs text-muted-foreground">
-                      Live rendering from checkpoints (artifacts will appear when run finishes).
+                      Live rendering while the run streams (artifacts appear as each file completes).
                     </div>
                     <div className="mt-3">
                       <CodeEditor
@@ -17,21 +17,48 @@ import {
 import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
 import { apiFetch, apiJson } from "@/lib/api";
 
+// Page size for incremental fetches of run events/checkpoints/artifacts.
+const PAGE_SIZE = 200;
+
 export function useRuns() {
   return useRunsFiltered({});
 }
 
-export function useRunsFiltered({ projectId }: { projectId?: string | null }) {
+export function useRunsFiltered({
+  projectId,
+  limit,
+}: {
+  projectId?: string | null;
+  // Newest `limit` runs only; use `fetchRunsPage` with the returned cursor for older ones.
+  limit?: number;
+}) {
   return useQuery({
-    queryKey: ["runs", projectId ?? ""],
-    queryFn: async (): Promise<RunList> => {
-      const qs = projectId ? `?project_id=${encodeURIComponent(projectId)}` : "";
-      const res = await apiFetch(`/api/runs${qs}`);
-      return apiJson(res, RunListSchema);
-    },
+    queryKey: ["runs", projectId ?? "", limit ?? ""],
+    queryFn: (): Promise<RunList> => fetchRunsPage({ projectId, limit }),
   });
 }
 
+export async function fetchRunsPage({
+  projectId,
+  limit,
+  before,
+}: {
+  projectId?: string | null;
+  limit?: number;
+  before?: { created_at: string; id?: string | null } | null;
+}): Promise<RunList> {
+  const qs = new URLSearchParams();
+  if (projectId) qs.set("project_id", projectId);
+  if (limit) qs.set("limit", String(limit));
+  if (before) {
+    qs.set("before_created_at", before.created_at);
+    if (before.id) qs.set("before_id", before.id);
+  }
+  const q = qs.toString();
+  const res = await apiFetch(`/api/runs${q ? `?${q}` : ""}`);
+  return apiJson(res, RunListSchema);
+}
+
 export function useRun(runId: string) {
   return useQuery({
     queryKey: ["run", runId],
@@ -49,25 +76,67 @@ export function useRun(runId: string) {
   });
 }
 
+// Fetch every item with `seq > afterSeq`, following the server's keyset cursor page by page.
+async function fetchAfterSeq<T extends { seq: number }>(
+  path: string,
+  afterSeq: number,
+  parse: (res: Response) => Promise<{ items: T[]; next: number | null | undefined }>,
+): Promise<T[]> {
+  const out: T[] = [];
+  let after = afterSeq;
+  for (;;) {
+    const sep = path.includes("?") ? "&" : "?";
+    const res = await apiFetch(
+      `${path}${sep}after_seq=${after}&limit=${PAGE_SIZE}`,
+    );
+    const page = await parse(res);
+    out.push(...page.items);
+    if (page.next == null) return out;
+    after = page.next;
+  }
+}
+
 export function useRunEvents(runId: string) {
+  const qc = useQueryClient();
+  const queryKey = ["run", runId, "events"];
   return useQuery({
-    queryKey: ["run", runId, "events"],
+    queryKey,
     enabled: runId.trim().length > 0,
+    // Polls only fetch events newer than the ones already cached.
     queryFn: async (): Promise<RunEvents> => {
-      const res = await apiFetch(`/api/runs/${runId}/events`);
-      return apiJson(res, RunEventsSchema);
+      const prev = qc.getQueryData<RunEvents>(queryKey)?.events ?? [];
+      const fresh = await fetchAfterSeq(
+        `/api/runs/${runId}/events`,
+        prev.at(-1)?.seq ?? 0,
+        async (res) => {
+          const page = await apiJson(res, RunEventsSchema);
+          return { items: page.events, next: page.next_after_seq };
+        },
+      );
+      return { events: fresh.length > 0 ? [...prev, ...fresh] : prev };
     },
     refetchInterval: 1000,
   });
 }
 
 export function useRunCheckpoints(runId: string) {
+  const qc = useQueryClient();
+  const queryKey = ["run", runId, "checkpoints"];
   return useQuery({
-    queryKey: ["run", runId, "checkpoints"],
+    queryKey,
     enabled: runId.trim().length > 0,
+    // Checkpoints are append-only, so (like events) only new ones are fetched on each poll.
     queryFn: async (): Promise<RunCheckpoints> => {
-      const res = await apiFetch(`/api/runs/${runId}/checkpoints`);
-      return apiJson(res, RunCheckpointsSchema);
+      const prev = qc.getQueryData<RunCheckpoints>(queryKey)?.checkpoints ?? [];
+      const fresh = await fetchAfterSeq(
+        `/api/runs/${runId}/checkpoints`,
+        prev.at(-1)?.seq ?? 0,
+        async (res) => {
+          const page = await apiJson(res, RunCheckpointsSchema);
+          return { items: page.checkpoints, next: page.next_after_seq };
+        },
+      );
+      return { checkpoints: fresh.length > 0 ? [...prev, ...fresh] : prev };
     },
     refetchInterval: 1000,
   });
@@ -78,8 +147,19 @@ export function useRunArtifacts(runId: string, status?: string) {
     queryKey: ["run", runId, "artifacts", status ?? ""],
     enabled: runId.trim().length > 0,
     queryFn: async (): Promise<RunArtifacts> => {
-      const res = await apiFetch(`/api/runs/${runId}/artifacts`);
-      return apiJson(res, RunArtifactsSchema);
+      const artifacts: RunArtifacts["artifacts"] = [];
+      let cursor = "";
+      for (;;) {
+        const res = await apiFetch(
+          `/api/runs/${runId}/artifacts?limit=${PAGE_SIZE}${cursor}`,
+        );
+        const page = await apiJson(res, RunArtifactsSchema);
+        artifacts.push(...page.artifacts);
+        if (!page.next_after_created_at) return { artifacts };
+        cursor =
+          `&after_created_at=${encodeURIComponent(page.next_after_created_at)}` +
+          (page.next_after_id ? `&after_id=${encodeURIComponent(page.next_after_id)}` : "");
+      }
     },
     refetchInterval: (q) => {
       if (status === "queued" || status === "running" || status === "paused")
@@ -33,6 +33,8 @@ export type RunDetail = z.infer<typeof RunDetailSchema>;
 
 export const RunListSchema = z.object({
   runs: z.array(RunPublicSchema),
+  next_before_created_at: z.string().nullable().optional(),
+  next_before_id: z.string().nullable().optional(),
 });
 export type RunList = z.infer<typeof RunListSchema>;
 
@@ -47,19 +49,22 @@ export type RunEvent = z.infer<typeof RunEventSchema>;
 
 export const RunEventsSchema = z.object({
   events: z.array(RunEventSchema),
+  next_after_seq: z.number().int().nullable().optional(),
 });
 export type RunEvents = z.infer<typeof RunEventsSchema>;
 
 export const RunCheckpointSchema = z.object({
   seq: z.number().int(),
   node: z.string(),
-  state: z.record(z.string(), z.any()),
+  // Null when requested with `include_state=false`.
+  state: z.record(z.string(), z.any()).nullable().optional(),
   created_at: z.string(),
 });
 export type RunCheckpoint = z.infer<typeof RunCheckpointSchema>;
 
 export const RunCheckpointsSchema = z.object({
   checkpoints: z.array(RunCheckpointSchema),
+  next_after_seq: z.number().int().nullable().optional(),
 });
 export type RunCheckpoints = z.infer<typeof RunCheckpointsSchema>;
 
@@ -79,6 +84,8 @@ export type ArtifactDetail = z.infer<typeof ArtifactDetailSchema>;
 
 export const RunArtifactsSchema = z.object({
   artifacts: z.array(ArtifactSchema),
+  next_after_created_at: z.string().nullable().optional(),
+  next_after_id: z.string().nullable().optional(),
 });
 export type RunArtifacts = z.infer<typeof RunArtifactsSchema>;
 